@@ -1,26 +1,76 @@
 from flask import Flask
 from flask_cors import CORS
 from config import Config
+import db
+import query_plans
+from utils import analytics, cache, catalog, events, forms, instrumentation, json_provider, log, org, passwords, profiler, token, workflow
 from routes.approval.approvals import approvals
 from routes.approval.approve import approve
 from routes.approval.reject import reject
 from routes.authentication.login import login
 from routes.tickets.open_ticket import open_tickets
+from routes.tickets.queue_counts import queue_counts
+from routes.tickets.queue_events import queue_events
 from routes.tickets.search_tickets import search_tickets
+from routes.tickets.ticket_history import ticket_history
+from routes.tickets.ticket_stats import ticket_stats
 from routes.tickets.ticket_types import ticket_types
 from routes.treatment.processing import processing
 from routes.treatment.treat import treat
 from routes.treatment.cancel import cancel
+from routes.monitoring.status import status
 
 # Criação do aplicativo Flask
 app = Flask(__name__)
 
 # Configuração do CORS (permitindo requisições de qualquer origem)
-CORS(app)
+CORS(app, expose_headers=["X-Next-Cursor"])
 
 # Carregar as configurações do arquivo config.py
 app.config.from_object(Config)
 
+# Log estruturado (substitui os prints) antes de abrir o banco
+log.init_app(app)
+
+# Serialização JSON com orjson (antes do catálogo, que guarda as respostas já serializadas)
+json_provider.init_app(app)
+
+# Inicializar o pool de conexões com o banco
+db.init_app(app)
+
+# Carregar o catálogo de chamados e motivos em memória
+catalog.init_app(app, db.pool)
+
+# Compilar os fluxos de aprovação e tratamento
+workflow.init_app(app, db.pool, catalog.catalog)
+
+# Tempo das requisições e dos comandos SQL (registrado antes da autenticação para medir também os 401)
+instrumentation.init_app(app)
+
+# Autenticação por token antes de cada requisição
+token.init_app(app)
+
+# Profiler por requisição (X-Profile), se habilitado
+profiler.init_app(app)
+
+# Verificação de senhas do login
+passwords.init_app(app)
+
+# Notificações das filas publicadas após cada transação confirmada
+events.init_app(app)
+
+# Cache dos chamados e das filas, invalidado após cada transação confirmada
+cache.init_app(app)
+
+# Hierarquia de gestores (visibilidade dos chamados do gerente)
+org.init_app(app)
+
+# Formulários dos chamados (tamanho a partir do qual são comprimidos)
+forms.init_app(app)
+
+# Agregados do painel (/stats) e comando de reconstrução
+analytics.init_app(app, db.pool)
+
 # Registrar os Blueprints para as rotas
 # Aprovações
 app.register_blueprint(approvals)
@@ -32,7 +82,11 @@ app.register_blueprint(login)
 
 # Tickets
 app.register_blueprint(open_tickets)
+app.register_blueprint(queue_counts)
+app.register_blueprint(queue_events)
 app.register_blueprint(search_tickets)
+app.register_blueprint(ticket_history)
+app.register_blueprint(ticket_stats)
 app.register_blueprint(ticket_types)
 
 # Tratamento
@@ -40,6 +94,12 @@ app.register_blueprint(processing)
 app.register_blueprint(treat)
 app.register_blueprint(cancel)
 
+# Monitoramento
+app.register_blueprint(status)
+
+# Verificação dos planos das consultas das rotas (flask --app app check-query-plans)
+query_plans.init_app(app, db.pool)
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,210 @@
+# asgi.py
+# Modo de produção assíncrono (ASGI), executado lado a lado com o modo WSGI (app.py):
+#
+#   uvicorn asgi:application --host 0.0.0.0 --port 5000
+#
+# - /events é servido diretamente no laço asyncio: milhares de clientes ociosos não ocupam threads
+# - As demais rotas (chamados, aprovações, tratamento...) são os mesmos Blueprints do Flask,
+#   executados em um pool limitado de threads; o laço nunca bloqueia no sqlite3
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import db
+from app import app
+from routes.tickets.queue_events import RETRY_MS
+from utils.events import broker, format_event, has_queue
+from utils.token import decode_token
+
+# Rotas atendidas nativamente pelo laço asyncio
+EVENTS_PATH = "/events"
+
+executor = ThreadPoolExecutor(
+    max_workers=app.config.get("ASGI_THREADS", 32),
+    thread_name_prefix="asgi-wsgi",
+)
+
+
+# Corpo completo da requisição (as rotas do Flask leem o corpo de uma vez)
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+# Ambiente WSGI (PEP 3333) a partir do escopo ASGI
+def wsgi_environ(scope, body):
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        if name == "CONTENT_TYPE":
+            key = "CONTENT_TYPE"
+        elif name == "CONTENT_LENGTH":
+            key = "CONTENT_LENGTH"
+        else:
+            key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+# Executa a rota do Flask em uma thread do pool: requisição, iteração da resposta e close()
+# acontecem na mesma thread (o contexto do Flask e as respostas em stream dependem disso)
+async def call_flask(scope, receive, send):
+    body = await read_body(receive)
+    if body is None:
+        return
+
+    loop = asyncio.get_running_loop()
+    environ = wsgi_environ(scope, body)
+
+    def send_from_thread(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def run():
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            response_start["status"] = int(status.split(" ", 1)[0])
+            response_start["headers"] = [
+                (name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers
+            ]
+
+        def send_start():
+            send_from_thread({"type": "http.response.start", **response_start})
+
+        result = app.wsgi_app(environ, start_response)
+        try:
+            started = False
+            for chunk in result:
+                if not started:
+                    send_start()
+                    started = True
+                if chunk:
+                    send_from_thread({"type": "http.response.body", "body": chunk, "more_body": True})
+            if not started:
+                send_start()
+            send_from_thread({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+    await loop.run_in_executor(executor, run)
+
+
+async def send_json(send, payload, status):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+# Token do cabeçalho Authorization ou de ?token= (EventSource não envia cabeçalhos)
+def request_token(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            return value.decode("latin1").replace("Bearer ", "")
+    values = parse_qs(scope.get("query_string", b"").decode("latin1")).get("token")
+    return values[0] if values else None
+
+
+# Canal /events servido no laço asyncio: mesma autenticação e mesmas notificações da rota WSGI
+async def stream_events(scope, receive, send):
+    token = request_token(scope)
+    if not token:
+        return await send_json(send, {"error": "Token não fornecido"}, 401)
+
+    with app.app_context():
+        identity = decode_token(token)
+    if not identity:
+        return await send_json(send, {"error": "Token inválido ou expirado"}, 401)
+    if not has_queue(identity):
+        return await send_json(send, {"error": "Usuário sem fila de aprovação ou tratamento"}, 404)
+
+    subscription = broker.subscribe(identity, loop=asyncio.get_running_loop())
+    if subscription is None:
+        return await send_json(send, {"error": "Limite de conexões atingido, tente novamente"}, 503)
+
+    heartbeat = app.config.get("EVENTS_HEARTBEAT", 15.0)
+
+    # Encerra o stream assim que o cliente desconecta
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        subscription.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        chunk = f"retry: {RETRY_MS}\n\n" + format_event({"event": "ready"})
+        while not subscription.closed:
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+            message = await subscription.get(heartbeat)
+            # Comentário periódico mantém a conexão aberta em proxies
+            chunk = format_event(message) if message else ": heartbeat\n\n"
+    except OSError:
+        # Cliente desconectou durante o envio
+        pass
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscription)
+
+
+# Inicialização e desligamento do servidor (o pool de conexões é fechado ao final)
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=True)
+            db.pool.close_all()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    if scope["path"] == EVENTS_PATH and scope["method"] == "GET":
+        return await stream_events(scope, receive, send)
+    return await call_flask(scope, receive, send)
@@ -0,0 +1,7 @@
+# benchmarks/__init__.py
+# Benchmarks do ServiceDesk (execução local, sem serviços externos):
+#
+#   python -m benchmarks.synthetic --tickets 100000 --output /tmp/bench.db   # banco sintético
+#   python -m benchmarks.endpoints --db /tmp/bench.db                        # latência por endpoint
+#
+# Os scripts avulsos (login_latency, transition_stress, serving_modes) continuam executáveis diretamente
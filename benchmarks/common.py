@@ -0,0 +1,63 @@
+# benchmarks/common.py
+# Utilidades compartilhadas pelos benchmarks: percentis, resumo das medições, memória e revisões do git
+import os
+import resource
+import statistics
+import subprocess
+import tempfile
+from collections import Counter
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DATABASE = os.path.join(REPO_DIR, "bdservicedesk.db")
+
+# Senha gravada para todos os usuários dos bancos de benchmark
+PASSWORD = "benchmark"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Resumo de uma medição: vazão, percentis de latência (ms) e contagem por status HTTP
+def summarize(latencies, elapsed, statuses):
+    report = {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "statuses": {str(status): count for status, count in sorted(Counter(statuses).items())},
+    }
+    if latencies:
+        report.update({
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        })
+    return report
+
+
+# Pico de memória residente (KB) deste processo
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# Pico de memória residente (KB) de outro processo (servidor HTTP), lido de /proc no Linux
+def process_peak_rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+# Extrai uma revisão do git em um diretório temporário (comparação entre commits)
+def export_revision(revision):
+    target = tempfile.mkdtemp(prefix="bench_rev_")
+    archive = subprocess.Popen(["git", "-C", REPO_DIR, "archive", revision], stdout=subprocess.PIPE)
+    subprocess.check_call(["tar", "-x", "-C", target], stdin=archive.stdout)
+    archive.wait()
+    return target
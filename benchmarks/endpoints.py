@@ -0,0 +1,373 @@
+# benchmarks/endpoints.py
+# Latência e vazão de cada endpoint sobre um banco sintético (benchmarks/synthetic.py)
+#
+# - client: cada cenário roda em um processo próprio com o test client do Flask (custo das rotas,
+#   sem rede); o pico de memória (ru_maxrss) é o do processo que atendeu o cenário
+# - http: um servidor real (wsgi = werkzeug com threads, asgi = uvicorn, gunicorn = serve.py)
+#   recebe os cenários em sequência; o pico de memória é o do servidor (VmHWM, somando os workers)
+# - Os cenários de escrita consomem chamados das filas: o banco é copiado antes de cada execução
+# - --baseline <revisão> repete a medição com o app extraído dessa revisão do git (mesmo banco)
+#
+# Uso:
+#   python -m benchmarks.synthetic --output /tmp/bench.db --tickets 100000
+#   python -m benchmarks.endpoints --db /tmp/bench.db --mode client --concurrency 8 --requests 500
+#   python -m benchmarks.endpoints --db /tmp/bench.db --mode http --server asgi --output result.json
+#   python -m benchmarks.endpoints --db /tmp/bench.db --scenarios list_tickets,approve_ticket --baseline HEAD~3
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import PASSWORD, REPO_DIR, export_revision, peak_rss_kb, process_peak_rss_kb, summarize
+
+HOST = "127.0.0.1"
+
+# Usuários do banco de exemplo (mantidos pelo gerador sintético)
+MANAGER = 1001        # GERENTE, aprovador 1 (equipe da GABI)
+DIRECTOR = 100000     # primeiro gerente sintético: todos os gerentes gerados estão abaixo dele
+REQUESTER = 1002      # USUARIO
+FIELDSERVICE = 1003   # aprovador 2, tratador 1
+ADM = 1006            # aprovador 3, tratador 2
+
+# Cenário: usuário autenticado, método, caminho ({ticket} = chamado sorteado), corpo JSON
+# e a consulta que escolhe os chamados (None = número aleatório entre os chamados existentes)
+Scenario = namedtuple("Scenario", ["user", "method", "path", "body", "tickets"])
+
+SCENARIOS = {
+    "login": Scenario(None, "POST", "/login", None, None),
+    "ticket_types": Scenario(REQUESTER, "GET", "/ticket_types", None, None),
+    "get_rejection_reasons": Scenario(None, "GET", "/get_rejection_reasons", None, None),
+    "list_tickets": Scenario(ADM, "GET", "/list_tickets?limit=20", None, None),
+    "list_tickets_manager": Scenario(MANAGER, "GET", "/list_tickets?limit=20", None, None),
+    "list_tickets_department": Scenario(DIRECTOR, "GET", "/list_tickets?limit=20", None, None),
+    "list_tickets_requester": Scenario(REQUESTER, "GET", "/list_tickets?limit=20", None, None),
+    "list_tickets_search": Scenario(ADM, "GET", "/list_tickets?limit=20&search=monitor", None, None),
+    "export": Scenario(REQUESTER, "GET", "/tickets/export", None, None),
+    "ticket_detail": Scenario(ADM, "GET", "/ticket_detail/{ticket}", None, "random"),
+    "ticket_history": Scenario(ADM, "GET", "/ticket_history/{ticket}", None, "random"),
+    "pending_approvals": Scenario(FIELDSERVICE, "GET", "/pending_approvals?limit=20", None, None),
+    "processing_tickets": Scenario(FIELDSERVICE, "GET", "/processing_tickets?limit=20", None, None),
+    "queue_counts": Scenario(ADM, "GET", "/queue_counts", None, None),
+    "stats": Scenario(ADM, "GET", "/stats", None, None),
+    "open_ticket": Scenario(REQUESTER, "POST", "/open_ticket", {
+        "ticket_type": "Hardware", "submotive": "Manutenção", "motive_submotive": "Hardware/Manutenção",
+        "form": {"Equipamento": "CPU", "Descrição": "benchmark computador lento"},
+    }, None),
+    "approve_ticket": Scenario(FIELDSERVICE, "POST", "/approve_ticket/{ticket}", {},
+                               "SELECT ticket_number FROM approval_queue WHERE approver_id = 2 ORDER BY ticket_number LIMIT ?"),
+    "reject_ticket": Scenario(ADM, "POST", "/reject_ticket/{ticket}", {"rejection_reason": "Benchmark"},
+                              "SELECT ticket_number FROM approval_queue WHERE approver_id = 3 ORDER BY ticket_number LIMIT ?"),
+    "treat_ticket": Scenario(FIELDSERVICE, "POST", "/treat_ticket/{ticket}", {"observation": "Benchmark"},
+                             "SELECT ticket_number FROM treatment_queue WHERE treatment_id = 1 ORDER BY ticket_number LIMIT ?"),
+    "cancel_ticket": Scenario(ADM, "POST", "/cancel_ticket/{ticket}", {"cancelReason": "Benchmark"},
+                              "SELECT ticket_number FROM treatment_queue WHERE treatment_id = 2 ORDER BY ticket_number LIMIT ?"),
+}
+
+# Comandos dos servidores HTTP (executados com o app de app_dir)
+SERVER_COMMANDS = {
+    "wsgi": lambda app_dir, port: [sys.executable, "-c", (
+        "import sys; from werkzeug.serving import run_simple; from app import app; "
+        "run_simple(sys.argv[1], int(sys.argv[2]), app, threaded=True)"
+    ), HOST, str(port)],
+    "asgi": lambda app_dir, port: [sys.executable, "-m", "uvicorn", "asgi:application", "--log-level", "warning",
+                                   "--app-dir", app_dir, "--host", HOST, "--port", str(port)],
+    "gunicorn": lambda app_dir, port: [sys.executable, os.path.join(app_dir, "serve.py"), "--bind", f"{HOST}:{port}"],
+}
+
+
+# Requisições do cenário: [(usuário, método, caminho, corpo), ...]
+def build_requests(database, name, count, seed):
+    scenario = SCENARIOS[name]
+    rng = random.Random(seed)
+    connection = sqlite3.connect(database)
+    try:
+        if name == "login":
+            # Alterna entre usuários do banco (parte das verificações cai no cache de senhas)
+            users = [row[0] for row in connection.execute("SELECT user FROM users ORDER BY user LIMIT 1000")]
+            return [(None, "POST", "/login", {"username": rng.choice(users), "password": PASSWORD}) for _ in range(count)]
+
+        if scenario.tickets == "random":
+            last = connection.execute("SELECT max(ticket_number) FROM tickets").fetchone()[0] or 1
+            tickets = [rng.randint(1, last) for _ in range(count)]
+        elif scenario.tickets:
+            tickets = [row[0] for row in connection.execute(scenario.tickets, (count,))]
+        else:
+            tickets = [None] * count
+    finally:
+        connection.close()
+
+    return [
+        (scenario.user, scenario.method, scenario.path.format(ticket=ticket), scenario.body)
+        for ticket in tickets
+    ]
+
+
+def scenario_users(names):
+    return sorted({SCENARIOS[name].user for name in names} - {None})
+
+
+# Executa as requisições com `concurrency` threads; send(item) -> status HTTP
+def drive(send, items, concurrency):
+    def timed(item):
+        started = time.perf_counter()
+        status = send(item)
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, items))
+    elapsed = time.perf_counter() - started
+    return summarize([latency for _, latency in results], elapsed, [status for status, _ in results])
+
+
+# Cópia de trabalho do banco e do config.env do app medido
+def prepare(database, app_dir):
+    work_dir = tempfile.mkdtemp(prefix="bench_endpoints_")
+    for suffix in ("", "-wal"):
+        if os.path.exists(database + suffix):
+            shutil.copy(database + suffix, os.path.join(work_dir, "bdservicedesk.db" + suffix))
+    if os.path.exists(os.path.join(app_dir, "config.env")):
+        shutil.copy(os.path.join(app_dir, "config.env"), work_dir)
+    return work_dir
+
+
+def app_environment(work_dir, requests):
+    return {
+        "DATABASE_URI": "sqlite:///" + os.path.join(work_dir, "bdservicedesk.db"),
+        "LOGIN_RATE_LIMIT": str(requests * 10 + 1000),
+    }
+
+
+# Modo client: um cenário no processo atual, com o app importado de app_dir
+def run_client_scenario(app_dir, work_dir, name, requests, concurrency, warmup, seed):
+    os.chdir(work_dir)
+    os.environ.update(app_environment(work_dir, requests))
+    sys.path.insert(0, app_dir)
+    from app import app
+
+    local = threading.local()
+
+    def send(item):
+        user, method, path, body = item
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        headers = {"Authorization": f"Bearer {tokens[user]}"} if user else {}
+        response = client.open(path, method=method, json=body, headers=headers)
+        # Consome o corpo (respostas em stream, como a exportação)
+        response.get_data()
+        return response.status_code
+
+    tokens = {}
+    client = app.test_client()
+    for user in scenario_users([name]):
+        response = client.post("/login", json={"username": user, "password": PASSWORD})
+        tokens[user] = response.get_json()["token"]
+
+    items = build_requests("bdservicedesk.db", name, warmup + requests, seed)
+    for item in items[:warmup]:
+        send(item)
+    report = drive(send, items[warmup:], concurrency)
+    report["peak_rss_kb"] = peak_rss_kb()
+    return report
+
+
+# Cada cenário em um processo novo: memória e caches do app não vazam entre cenários
+def run_client(app_dir, database, names, requests, concurrency, warmup, seed):
+    work_dir = prepare(database, app_dir)
+    report = {}
+    try:
+        for name in names:
+            output = subprocess.check_output([
+                sys.executable, "-m", "benchmarks.endpoints", "--worker", app_dir, "--work-dir", work_dir,
+                "--scenarios", name, "--requests", str(requests), "--concurrency", str(concurrency),
+                "--warmup", str(warmup), "--seed", str(seed),
+            ], cwd=REPO_DIR, stderr=subprocess.DEVNULL)
+            report[name] = json.loads(output.decode().strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(server, app_dir, work_dir, port, requests):
+    env = dict(os.environ)
+    env.update(app_environment(work_dir, requests))
+    env["PYTHONPATH"] = app_dir
+    process = subprocess.Popen(
+        SERVER_COMMANDS[server](app_dir, port), cwd=work_dir, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Servidor {server} encerrou na inicialização (código {process.returncode})")
+        try:
+            urllib.request.urlopen(f"http://{HOST}:{port}/get_rejection_reasons", timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Servidor {server} não respondeu na porta {port}")
+
+
+# Pico de memória do servidor e dos processos filhos (workers do gunicorn)
+def server_peak_rss_kb(pid):
+    total = process_peak_rss_kb(pid) or 0
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            total += sum(process_peak_rss_kb(int(child)) or 0 for child in children.read().split())
+    except OSError:
+        pass
+    return total or None
+
+
+def http_request(port, method, path, body=None, token=None):
+    connection = http.client.HTTPConnection(HOST, port, timeout=60)
+    try:
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+# Modo http: um servidor real para todos os cenários, na ordem informada
+def run_http(app_dir, database, names, requests, concurrency, warmup, seed, server):
+    work_dir = prepare(database, app_dir)
+    port = free_port()
+    process = None
+    report = {}
+    try:
+        process = start_server(server, app_dir, work_dir, port, requests)
+        tokens = {}
+        for user in scenario_users(names):
+            status, body = http_request(port, "POST", "/login", {"username": user, "password": PASSWORD})
+            tokens[user] = json.loads(body)["token"]
+
+        def send(item):
+            user, method, path, body = item
+            try:
+                return http_request(port, method, path, body, tokens.get(user))[0]
+            except OSError:
+                return 0
+
+        for name in names:
+            items = build_requests(os.path.join(work_dir, "bdservicedesk.db"), name, warmup + requests, seed)
+            for item in items[:warmup]:
+                send(item)
+            report[name] = drive(send, items[warmup:], concurrency)
+            report[name]["server_peak_rss_kb"] = server_peak_rss_kb(process.pid)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def database_info(database):
+    connection = sqlite3.connect(database)
+    try:
+        return {
+            "path": os.path.abspath(database),
+            "tickets": connection.execute("SELECT count(*) FROM tickets").fetchone()[0],
+            "users": connection.execute("SELECT count(*) FROM users").fetchone()[0],
+            "ticket_types": connection.execute("SELECT count(*) FROM ticket_types").fetchone()[0],
+        }
+    finally:
+        connection.close()
+
+
+def git_revision(app_dir):
+    try:
+        return subprocess.check_output(["git", "-C", app_dir, "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(app_dir, args, names):
+    if args.mode == "client":
+        return run_client(app_dir, args.db, names, args.requests, args.concurrency, args.warmup, args.seed)
+    return run_http(app_dir, args.db, names, args.requests, args.concurrency, args.warmup, args.seed, args.server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência, vazão e memória de cada endpoint do ServiceDesk")
+    parser.add_argument("--db", help="banco gerado por benchmarks.synthetic")
+    parser.add_argument("--mode", choices=("client", "http"), default="client")
+    parser.add_argument("--server", choices=sorted(SERVER_COMMANDS), default="wsgi")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="cenários separados por vírgula")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="revisão do git usada como referência (antes)")
+    parser.add_argument("--output", help="arquivo JSON do resultado (padrão: saída padrão)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(unknown)}")
+
+    # Processo filho do modo client: mede um cenário e imprime o resultado na última linha
+    if args.worker:
+        report = run_client_scenario(args.worker, args.work_dir, names[0], args.requests, args.concurrency, args.warmup, args.seed)
+        print(json.dumps(report))
+        return
+
+    if not args.db:
+        parser.error("--db é obrigatório")
+
+    report = {
+        "settings": {
+            "mode": args.mode,
+            "server": args.server if args.mode == "http" else None,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "database": database_info(args.db),
+        "current": {"revision": git_revision(REPO_DIR), "scenarios": run(REPO_DIR, args, names)},
+    }
+    if args.baseline:
+        baseline_dir = export_revision(args.baseline)
+        try:
+            report["baseline"] = {"revision": args.baseline, "scenarios": run(baseline_dir, args, names)}
+        finally:
+            shutil.rmtree(baseline_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as result:
+            result.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
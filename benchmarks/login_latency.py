@@ -0,0 +1,116 @@
+# benchmarks/login_latency.py
+# Mede a latência (p50/p99) do /login, opcionalmente comparando com outra revisão do git
+#
+# Uso:
+#   python benchmarks/login_latency.py --requests 200 --concurrency 8
+#   python benchmarks/login_latency.py --baseline af96b80
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "benchmark"
+USERNAME = 1002
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Executa o benchmark sobre uma cópia do banco, importando o app de app_dir
+def run(app_dir, requests, concurrency):
+    import sqlite3
+
+    work_dir = tempfile.mkdtemp(prefix="bench_login_")
+    for name in ("bdservicedesk.db", "config.env"):
+        shutil.copy(os.path.join(app_dir, name), work_dir)
+    os.chdir(work_dir)
+    os.environ["DATABASE_URI"] = "sqlite:///" + os.path.join(work_dir, "bdservicedesk.db")
+    os.environ.setdefault("LOGIN_RATE_LIMIT", str(requests * 2))
+    sys.path.insert(0, app_dir)
+
+    from werkzeug.security import generate_password_hash
+    connection = sqlite3.connect("bdservicedesk.db")
+    connection.execute("UPDATE users SET password = ? WHERE user = ?", (generate_password_hash(PASSWORD), USERNAME))
+    connection.commit()
+    connection.close()
+
+    from app import app
+
+    def login(_):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post("/login", json={"username": USERNAME, "password": PASSWORD})
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"/login respondeu {response.status_code}: {response.get_data(as_text=True)}")
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(login, range(requests)))
+    total = time.perf_counter() - started
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / total, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+    }
+
+
+# Roda o benchmark em um processo separado para isolar o app importado
+def run_in_subprocess(app_dir, requests, concurrency):
+    output = subprocess.check_output([
+        sys.executable, os.path.abspath(__file__), "--worker", app_dir,
+        "--requests", str(requests), "--concurrency", str(concurrency),
+    ])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def export_revision(revision):
+    target = tempfile.mkdtemp(prefix="bench_rev_")
+    archive = subprocess.Popen(["git", "-C", REPO_DIR, "archive", revision], stdout=subprocess.PIPE)
+    subprocess.check_call(["tar", "-x", "-C", target], stdin=archive.stdout)
+    archive.wait()
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latência do /login")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--baseline", help="revisão do git usada como referência (antes)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run(args.worker, args.requests, args.concurrency)))
+        return
+
+    report = {"current": run_in_subprocess(REPO_DIR, args.requests, args.concurrency)}
+    if args.baseline:
+        baseline_dir = export_revision(args.baseline)
+        try:
+            report["baseline"] = run_in_subprocess(baseline_dir, args.requests, args.concurrency)
+            report["baseline"]["revision"] = args.baseline
+        finally:
+            shutil.rmtree(baseline_dir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
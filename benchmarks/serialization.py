@@ -0,0 +1,130 @@
+# benchmarks/serialization.py
+# Custo de montar e serializar em JSON as listagens grandes (--rows linhas por resposta, padrão 10 mil):
+# /list_tickets, /pending_approvals e /processing_tickets pelo test client do Flask, sem rede
+#
+# - O limite de página (PAGE_SIZE_MAX) é elevado para --rows; as filas do FIELDSERVICE só passam
+#   de 10 mil chamados a partir de ~100 mil chamados no banco sintético
+# - Cada revisão roda em um processo próprio, com o app importado do diretório da revisão
+# - Resultado por listagem: latência de cada resposta, linhas devolvidas e tamanho do corpo
+#
+# Uso:
+#   python -m benchmarks.synthetic --output /tmp/bench.db --tickets 100000
+#   python -m benchmarks.serialization --db /tmp/bench.db --rows 10000 --repeat 30
+#   python -m benchmarks.serialization --db /tmp/bench.db --baseline HEAD~1
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from benchmarks.common import PASSWORD, REPO_DIR, export_revision, peak_rss_kb, summarize
+from benchmarks.endpoints import ADM, FIELDSERVICE, app_environment, database_info, git_revision, prepare
+
+# Listagem: usuário autenticado e caminho
+RESPONSES = {
+    "list_tickets": (ADM, "/list_tickets?limit={rows}"),
+    "pending_approvals": (FIELDSERVICE, "/pending_approvals?limit={rows}"),
+    "processing_tickets": (FIELDSERVICE, "/processing_tickets?limit={rows}"),
+}
+
+
+# Processo filho: mede as listagens com o app de app_dir e imprime o resultado na última linha
+def run_worker(app_dir, work_dir, names, rows, repeat, warmup):
+    os.chdir(work_dir)
+    os.environ.update(app_environment(work_dir, repeat))
+    os.environ["PAGE_SIZE_MAX"] = str(rows)
+    sys.path.insert(0, app_dir)
+    from app import app
+
+    client = app.test_client()
+    tokens = {}
+    for user in sorted({RESPONSES[name][0] for name in names}):
+        response = client.post("/login", json={"username": user, "password": PASSWORD})
+        tokens[user] = response.get_json()["token"]
+
+    report = {}
+    for name in names:
+        user, path = RESPONSES[name]
+        path = path.format(rows=rows)
+        headers = {"Authorization": f"Bearer {tokens[user]}"}
+        for _ in range(warmup):
+            client.get(path, headers=headers).get_data()
+
+        latencies, statuses = [], []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            request_started = time.perf_counter()
+            response = client.get(path, headers=headers)
+            body = response.get_data()
+            latencies.append(time.perf_counter() - request_started)
+            statuses.append(response.status_code)
+        report[name] = summarize(latencies, time.perf_counter() - started, statuses)
+        report[name]["rows"] = len(json.loads(body)) if response.status_code == 200 else 0
+        report[name]["bytes"] = len(body)
+    report["peak_rss_kb"] = peak_rss_kb()
+    return report
+
+
+def run(app_dir, database, names, rows, repeat, warmup):
+    work_dir = prepare(database, app_dir)
+    try:
+        output = subprocess.check_output([
+            sys.executable, "-m", "benchmarks.serialization", "--worker", app_dir, "--work-dir", work_dir,
+            "--responses", ",".join(names), "--rows", str(rows), "--repeat", str(repeat), "--warmup", str(warmup),
+        ], cwd=REPO_DIR, stderr=subprocess.DEVNULL)
+        return json.loads(output.decode().strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialização JSON das listagens grandes do ServiceDesk")
+    parser.add_argument("--db", help="banco gerado por benchmarks.synthetic")
+    parser.add_argument("--responses", default=",".join(RESPONSES), help="listagens separadas por vírgula")
+    parser.add_argument("--rows", type=int, default=10000, help="linhas por resposta")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--baseline", help="revisão do git usada como referência (antes)")
+    parser.add_argument("--output", help="arquivo JSON do resultado (padrão: saída padrão)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.responses.split(",") if name.strip()]
+    unknown = [name for name in names if name not in RESPONSES]
+    if unknown:
+        parser.error(f"listagens desconhecidas: {', '.join(unknown)}")
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.work_dir, names, args.rows, args.repeat, args.warmup)))
+        return
+
+    if not args.db:
+        parser.error("--db é obrigatório")
+
+    report = {
+        "settings": {"rows": args.rows, "repeat": args.repeat, "warmup": args.warmup},
+        "database": database_info(args.db),
+        "current": {"revision": git_revision(REPO_DIR), "responses": run(REPO_DIR, args.db, names, args.rows, args.repeat, args.warmup)},
+    }
+    if args.baseline:
+        baseline_dir = export_revision(args.baseline)
+        try:
+            report["baseline"] = {
+                "revision": args.baseline,
+                "responses": run(baseline_dir, args.db, names, args.rows, args.repeat, args.warmup),
+            }
+        finally:
+            shutil.rmtree(baseline_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as result:
+            result.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# benchmarks/serving_modes.py
+# Compara a vazão dos modos de execução: WSGI (servidor com threads do werkzeug) e ASGI (uvicorn asgi:application)
+# Cada modo recebe a mesma carga nas listagens enquanto mantém clientes ociosos conectados em /events
+#
+# Uso:
+#   python benchmarks/serving_modes.py --duration 10 --concurrency 32 --idle-clients 500
+#   python benchmarks/serving_modes.py --mode asgi --idle-clients 2000
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "benchmark"
+HOST = "127.0.0.1"
+
+# Rotas consultadas pelo front-end a cada poucos segundos (usuário que faz a requisição)
+ENDPOINTS = [
+    ("/pending_approvals?limit=20", 1001),
+    ("/processing_tickets?limit=20", 1003),
+    ("/queue_counts", 1006),
+    ("/list_tickets?limit=20", 1002),
+]
+# Usuários com fila (aprovador/tratador) que mantêm o /events aberto
+EVENT_USERS = (1001, 1003, 1006)
+
+SERVER_COMMANDS = {
+    "wsgi": [sys.executable, "-c", (
+        "import sys; from werkzeug.serving import run_simple; from app import app; "
+        "run_simple(sys.argv[1], int(sys.argv[2]), app, threaded=True)"
+    )],
+    "asgi": [sys.executable, "-m", "uvicorn", "asgi:application", "--log-level", "warning", "--app-dir", REPO_DIR, "--host"],
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+# Cópia do banco com senha conhecida para todos os usuários
+def prepare(work_dir):
+    from werkzeug.security import generate_password_hash
+
+    for name in ("bdservicedesk.db", "config.env"):
+        shutil.copy(os.path.join(REPO_DIR, name), work_dir)
+    connection = sqlite3.connect(os.path.join(work_dir, "bdservicedesk.db"))
+    connection.execute("UPDATE users SET password = ?", (generate_password_hash(PASSWORD),))
+    connection.commit()
+    connection.close()
+
+
+def start_server(mode, work_dir, port, idle_clients):
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": REPO_DIR,
+        "DATABASE_URI": "sqlite:///" + os.path.join(work_dir, "bdservicedesk.db"),
+        "LOGIN_RATE_LIMIT": "1000",
+        "EVENTS_MAX_SUBSCRIBERS": str(idle_clients + 100),
+    })
+    if mode == "wsgi":
+        command = SERVER_COMMANDS[mode] + [HOST, str(port)]
+    else:
+        command = SERVER_COMMANDS[mode] + [HOST, "--port", str(port)]
+    server = subprocess.Popen(command, cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://{HOST}:{port}/get_rejection_reasons", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"Servidor {mode} não respondeu na porta {port}")
+
+
+def login(port, user):
+    request = urllib.request.Request(
+        f"http://{HOST}:{port}/login",
+        data=json.dumps({"username": user, "password": PASSWORD}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    return json.loads(urllib.request.urlopen(request).read())["token"]
+
+
+# Uma requisição GET em uma conexão nova; retorna (status, segundos)
+async def fetch(port, path, token):
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write((
+        f"GET {path} HTTP/1.1\r\nHost: {HOST}:{port}\r\n"
+        f"Authorization: Bearer {token}\r\nConnection: close\r\n\r\n"
+    ).encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b" ", 2)[1]) if response else 0
+    return status, time.perf_counter() - started
+
+
+# Cliente ocioso do /events: conecta, lê o cabeçalho e permanece aberto até o fim da medição
+async def idle_client(port, token, connected, stop):
+    try:
+        reader, writer = await asyncio.open_connection(HOST, port)
+        writer.write(f"GET /events?token={token} HTTP/1.1\r\nHost: {HOST}:{port}\r\n\r\n".encode())
+        await writer.drain()
+        status = await asyncio.wait_for(reader.readline(), 10)
+        if b" 200 " in status:
+            connected.append(1)
+        await stop.wait()
+        writer.close()
+    except (OSError, asyncio.TimeoutError):
+        pass
+
+
+async def load(port, tokens, duration, concurrency, idle_clients):
+    stop = asyncio.Event()
+    connected = []
+    idle = [
+        asyncio.create_task(idle_client(port, tokens[EVENT_USERS[i % len(EVENT_USERS)]], connected, stop))
+        for i in range(idle_clients)
+    ]
+    # Aguarda os clientes ociosos conectarem antes de medir
+    await asyncio.sleep(min(10, 1 + idle_clients / 500))
+
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        index = offset
+        while time.perf_counter() < deadline:
+            path, user = ENDPOINTS[index % len(ENDPOINTS)]
+            index += 1
+            try:
+                status, elapsed = await fetch(port, path, tokens[user])
+            except OSError as e:
+                errors.append(type(e).__name__)
+                continue
+            if status >= 500 or status == 0:
+                errors.append(status)
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await asyncio.gather(*idle)
+    return latencies, errors, len(connected), elapsed
+
+
+def run_mode(mode, duration, concurrency, idle_clients):
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{mode}_")
+    server = None
+    try:
+        prepare(work_dir)
+        port = free_port()
+        server = start_server(mode, work_dir, port, idle_clients)
+        tokens = {user: login(port, user) for user in {user for _, user in ENDPOINTS} | set(EVENT_USERS)}
+        latencies, errors, connected, elapsed = asyncio.run(load(port, tokens, duration, concurrency, idle_clients))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "idle_clients_connected": connected,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão dos modos WSGI e ASGI com clientes ociosos em /events")
+    parser.add_argument("--mode", choices=("wsgi", "asgi", "both"), default="both")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--idle-clients", type=int, default=500)
+    args = parser.parse_args()
+
+    # Cada cliente ocioso usa um descritor de arquivo no benchmark e outro no servidor
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, args.idle_clients * 2 + 1024)), hard))
+
+    modes = ("wsgi", "asgi") if args.mode == "both" else (args.mode,)
+    report = {mode: run_mode(mode, args.duration, args.concurrency, args.idle_clients) for mode in modes}
+    report["settings"] = {"duration": args.duration, "concurrency": args.concurrency, "idle_clients": args.idle_clients}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
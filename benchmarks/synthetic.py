@@ -0,0 +1,350 @@
+# benchmarks/synthetic.py
+# Gera um bdservicedesk.db sintético em escala configurável para os benchmarks
+#
+# - Esquema criado pelas próprias migrações (mesmos índices, gatilhos de busca e filas do banco real)
+# - Tabelas de referência (perfis, páginas, motivos, tipos de chamado) copiadas do banco de exemplo
+# - Gerentes e usuários com a mesma distribuição de perfis de produção; todos com a senha PASSWORD
+# - Chamados percorrem o fluxo real (utils.workflow) até um ponto sorteado: aguardando aprovação,
+#   em tratamento, concluídos, reprovados ou cancelados, com aprovações e histórico coerentes
+#
+# Uso:
+#   python -m benchmarks.synthetic --output /tmp/bench.db --tickets 100000
+#   python -m benchmarks.synthetic --output /tmp/bench.db --tickets 10000000 --users 50000 --managers 2000
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from werkzeug.security import generate_password_hash
+
+import migrations
+import query_plans
+from benchmarks.common import PASSWORD, SAMPLE_DATABASE
+from utils import analytics, forms, history, search, timestamps
+from utils.workflow import STATUS_DONE, Workflow
+
+# Tabelas copiadas do banco de exemplo sem alteração
+REFERENCE_TABLES = ("profile_config", "pages_roles", "hardware_type", "rejection_reasons", "cancellation_reasons")
+
+# Cargo de cada perfil (profile_config.position) e participação no quadro de usuários
+POSITION_MIX = [
+    ("SUPERVISOR", 0.85),
+    ("ANALISTA", 0.10),
+    ("ANALISTA ADM", 0.05),
+]
+MANAGER_POSITION = "GERENTE"
+
+# Primeiras matrículas geradas (as do banco de exemplo, 1001-1006, são mantidas)
+FIRST_MANAGER_REGISTER = 100000
+FIRST_USER_REGISTER = 200000
+
+# Gerentes subordinados a cada gerente (o primeiro gerente gerado fica no topo da hierarquia)
+MANAGER_SPAN = 8
+
+# Chance de o chamado parar em cada passo do fluxo, ou de ser reprovado/cancelado nele
+STOP_CHANCE = 0.25
+REJECT_CHANCE = 0.08
+CANCEL_CHANCE = 0.05
+
+# Palavras dos formulários (alimentam a busca de texto completo)
+WORDS = (
+    "computador monitor teclado mouse impressora notebook rede cabo energia tela quebrado lento "
+    "travando troca instalação urgente sala andar filial estoque garantia memória disco fonte"
+).split()
+LOCATIONS = ("Matriz", "Filial Norte", "Filial Sul", "Depósito", "Loja Centro")
+
+BATCH_SIZE = 10000
+
+insert_ticket_query = """
+INSERT INTO tickets (
+    ticket_number, ticket_type, submotive, motive_submotive, form_schema, form_data, user, name, manager,
+    ticket_open_date_time, opened_at, ticket_status, next_approver, approval_sequence, rejection_reason,
+    treatment_sequence, next_treatment, cancellation_reason, close_date_time, closed_at, version
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+insert_approval_query = """
+INSERT INTO tickets_approvals (ticket_number, approver_id, approver_profile, date_time_approval, approved_at)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+insert_rejection_query = """
+INSERT INTO tickets_approvals (ticket_number, rejected_id, repprover_profile, date_time_rejection, rejected_at)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def stamp(moment):
+    return timestamps.Timestamp(moment.strftime(timestamps.DISPLAY_FORMAT), moment.strftime(timestamps.ISO_FORMAT))
+
+
+def create_schema(connection):
+    # Banco novo: a migração 0 cria as tabelas base; as demais, índices, busca, histórico e filas
+    migrations.run_migrations(connection)
+    connection.execute("ATTACH DATABASE ? AS sample", (SAMPLE_DATABASE,))
+    for table in REFERENCE_TABLES:
+        connection.execute(f"INSERT INTO main.{table} SELECT * FROM sample.{table}")
+    connection.commit()
+
+
+# Tipos de chamado: os do exemplo e, se pedido, cópias com outros submotivos (mesmos fluxos)
+def create_ticket_types(connection, count):
+    sample = connection.execute(
+        "SELECT ticket_type, submotive, motive_submotive, form, approval_sequence, treatment_sequence, profile, treatment_form "
+        "FROM sample.ticket_types ORDER BY id"
+    ).fetchall()
+    rows = list(sample)
+    index = 0
+    while len(rows) < count:
+        ticket_type, _, _, form, approval_sequence, treatment_sequence, profile, treatment_form = sample[index % len(sample)]
+        submotive = f"Sintético {index // len(sample) + 1}"
+        rows.append((ticket_type, submotive, f"{ticket_type}/{submotive}", form, approval_sequence, treatment_sequence, profile, treatment_form))
+        index += 1
+    connection.executemany(
+        "INSERT INTO ticket_types (ticket_type, submotive, motive_submotive, form, approval_sequence, treatment_sequence, profile, treatment_form) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    connection.commit()
+
+
+# Pessoas do exemplo + gerentes + usuários; retorna [(matrícula, nome, gerente, perfil), ...]
+def create_people(connection, rng, managers, users):
+    people = [tuple(row) for row in connection.execute(
+        "SELECT register, name, position, manager FROM sample.general_data ORDER BY register"
+    )]
+    sample_size = len(people)
+    manager_names = [name for _, name, position, _ in people if position == MANAGER_POSITION]
+    for index in range(managers):
+        name = f"GERENTE {index + 1:05d}"
+        manager = f"GERENTE {(index - 1) // MANAGER_SPAN + 1:05d}" if index else "DIRETORIA"
+        people.append((FIRST_MANAGER_REGISTER + index, name, MANAGER_POSITION, manager))
+        manager_names.append(name)
+
+    positions = [position for position, _ in POSITION_MIX]
+    weights = [weight for _, weight in POSITION_MIX]
+    for index in range(users):
+        register = FIRST_USER_REGISTER + index
+        position = rng.choices(positions, weights)[0]
+        people.append((register, f"USUARIO {register}", position, rng.choice(manager_names)))
+
+    profiles = dict(connection.execute("SELECT position, profile FROM profile_config"))
+    connection.execute(
+        "INSERT INTO main.general_data (register, name, position, manager, profile) "
+        "SELECT register, name, position, manager, profile FROM sample.general_data"
+    )
+    connection.executemany(
+        "INSERT INTO general_data (register, name, position, manager, profile) VALUES (?, ?, ?, ?, ?)",
+        [(register, name, position, manager, profiles[position]) for register, name, position, manager in people[sample_size:]],
+    )
+
+    # Uma única senha conhecida: o hash é calculado uma vez
+    password_hash = generate_password_hash(PASSWORD)
+    connection.executemany(
+        "INSERT INTO users (user, password) VALUES (?, ?)",
+        [(register, password_hash) for register, _, _, _ in people],
+    )
+    connection.commit()
+    return [(register, name, manager, profiles.get(position)) for register, name, position, manager in people]
+
+
+def random_form(rng, template, choices):
+    form = {}
+    for field in json.loads(template):
+        if field == "Equipamento":
+            form[field] = rng.choice(choices["hardware"])
+        elif field == "Local":
+            form[field] = rng.choice(LOCATIONS)
+        else:
+            form[field] = " ".join(rng.choices(WORDS, k=rng.randint(3, 40)))
+    return form
+
+
+# Percorre o fluxo do chamado até um ponto sorteado; retorna as linhas a gravar
+def simulate(rng, ticket_number, person, ticket_type, workflow, approver_profiles, choices, opened_at):
+    register, name, manager, profile = person
+    ticket_type_name, submotive, motive_submotive, form, approval_sequence, treatment_sequence = ticket_type
+    moment = opened_at
+    opened = stamp(moment)
+
+    events = [history.event(ticket_number, history.EVENT_OPEN, opened, user=register, profile=profile)]
+    approvals = []
+    rejections = []
+    next_approver, ticket_status, next_treatment = workflow.opening
+    rejection_reason = cancellation_reason = None
+    closed = None
+    version = 0
+
+    while closed is None and (next_approver or next_treatment) and rng.random() >= STOP_CHANCE:
+        moment += datetime.timedelta(minutes=rng.randint(5, 2880))
+        step_stamp = stamp(moment)
+        version += 1
+
+        if next_approver:
+            actor_profile = approver_profiles.get(next_approver)
+            if rng.random() < REJECT_CHANCE:
+                rejection_reason = rng.choice(choices["rejection"])
+                rejections.append((ticket_number, next_approver, actor_profile, step_stamp.display, step_stamp.iso))
+                events.append(history.event(ticket_number, history.EVENT_REJECTION, step_stamp, actor_id=next_approver, profile=actor_profile, message=rejection_reason))
+                next_approver, ticket_status, next_treatment = Workflow.reject()
+                closed = step_stamp
+                continue
+            approvals.append((ticket_number, next_approver, actor_profile, step_stamp.display, step_stamp.iso))
+            events.append(history.event(ticket_number, history.EVENT_APPROVAL, step_stamp, actor_id=next_approver, profile=actor_profile))
+            next_approver, ticket_status, next_treatment = workflow.approve(next_approver)
+            continue
+
+        if rng.random() < CANCEL_CHANCE:
+            cancellation_reason = rng.choice(choices["cancellation"])
+            events.append(history.event(ticket_number, history.EVENT_CANCEL, step_stamp, actor_id=next_treatment, message=cancellation_reason))
+            next_approver, ticket_status, next_treatment = Workflow.cancel()
+            closed = step_stamp
+            continue
+        events.append(history.event(ticket_number, history.EVENT_OBSERVATION, step_stamp, actor_id=next_treatment, message=" ".join(rng.choices(WORDS, k=5))))
+        step = workflow.treat(next_treatment)
+        next_treatment = step.next_treatment
+        if step.closes:
+            ticket_status = STATUS_DONE
+            closed = step_stamp
+
+    ticket = (
+        ticket_number, ticket_type_name, submotive, motive_submotive, random_form(rng, form, choices), register, name, manager,
+        opened.display, opened.iso, ticket_status, str(next_approver), approval_sequence, rejection_reason,
+        treatment_sequence, next_treatment, cancellation_reason,
+        closed.display if closed else None, closed.iso if closed else None, version,
+    )
+    return ticket, approvals, rejections, events
+
+
+def create_tickets(connection, rng, people, count, days):
+    approver_profiles = {}
+    for approver_id, profile in connection.execute("SELECT approver_id, profile FROM profile_config ORDER BY id_profile_config"):
+        approver_profiles.setdefault(approver_id, profile)
+
+    # Tipos de chamado e fluxo compilado por perfil do solicitante
+    by_profile = {}
+    workflows = {}
+    for row in connection.execute(
+        "SELECT ticket_type, submotive, motive_submotive, form, approval_sequence, treatment_sequence, profile FROM ticket_types ORDER BY id"
+    ):
+        ticket_type = tuple(row[:6])
+        key = (ticket_type[4], ticket_type[5])
+        if key not in workflows:
+            workflows[key] = Workflow(key[0], key[1], approver_profiles)
+        by_profile.setdefault(row[6], []).append((ticket_type, workflows[key]))
+    requesters = [person for person in people if person[3] in by_profile]
+
+    # Valores sorteados nos formulários e nas reprovações/cancelamentos
+    choices = {
+        "hardware": [row[0] for row in connection.execute("SELECT equipamento FROM hardware_type")] or ["CPU"],
+        "rejection": [row[0] for row in connection.execute("SELECT reason FROM rejection_reasons")] or ["Sem motivo"],
+        "cancellation": [row[0] for row in connection.execute("SELECT cancel_reasons FROM cancellation_reasons")] or ["Sem motivo"],
+    }
+
+    # Aberturas distribuídas nos últimos `days` dias, em ordem crescente como em produção
+    start = datetime.datetime.now().replace(microsecond=0) - datetime.timedelta(days=days)
+    spacing = days * 86400 / max(count, 1)
+
+    started = time.perf_counter()
+    for batch_start in range(0, count, BATCH_SIZE):
+        tickets, approvals, rejections, events = [], [], [], []
+        for ticket_number in range(batch_start + 1, min(count, batch_start + BATCH_SIZE) + 1):
+            person = rng.choice(requesters)
+            ticket_type, workflow = rng.choice(by_profile[person[3]])
+            opened_at = start + datetime.timedelta(seconds=int(ticket_number * spacing))
+            ticket, ticket_approvals, ticket_rejections, ticket_events = simulate(
+                rng, ticket_number, person, ticket_type, workflow, approver_profiles, choices, opened_at,
+            )
+            tickets.append(ticket)
+            approvals.extend(ticket_approvals)
+            rejections.extend(ticket_rejections)
+            events.extend(ticket_events)
+
+        # Os gatilhos mantêm a busca de texto completo e as filas de aprovação/tratamento
+        connection.execute("BEGIN")
+        # Formulário compacto como em open_ticket (o esquema de campos é criado na transação)
+        encoded = [forms.encode(connection, ticket[4]) for ticket in tickets]
+        tickets = [ticket[:4] + (form_schema, form_data) + ticket[5:] for ticket, (_, form_schema, form_data) in zip(tickets, encoded)]
+        connection.executemany(insert_ticket_query, tickets)
+        # Formulários comprimidos entram no índice de busca pelo texto, como em open_ticket
+        search.index_forms(connection, [
+            (ticket[0], form_text) for ticket, (form_text, form_schema, _) in zip(tickets, encoded) if form_schema is not None
+        ])
+        connection.executemany(insert_approval_query, approvals)
+        connection.executemany(insert_rejection_query, rejections)
+        history.record(connection, events)
+        connection.commit()
+
+        done = batch_start + len(tickets)
+        elapsed = time.perf_counter() - started
+        print(f"{done}/{count} chamados ({done / elapsed:.0f}/s)", file=sys.stderr)
+
+
+# Resumo do banco gerado (também verificado pelos benchmarks antes de medir)
+def summary(connection):
+    statuses = dict(connection.execute("SELECT ticket_status, count(*) FROM tickets GROUP BY ticket_status"))
+    return {
+        "people": connection.execute("SELECT count(*) FROM general_data").fetchone()[0],
+        "ticket_types": connection.execute("SELECT count(*) FROM ticket_types").fetchone()[0],
+        "tickets": sum(statuses.values()),
+        "statuses": statuses,
+        "approval_queue": connection.execute("SELECT count(*) FROM approval_queue").fetchone()[0],
+        "treatment_queue": connection.execute("SELECT count(*) FROM treatment_queue").fetchone()[0],
+        "ticket_events": connection.execute("SELECT count(*) FROM ticket_events").fetchone()[0],
+        "size_mb": round(os.path.getsize(connection.execute("PRAGMA database_list").fetchone()[2]) / 1048576, 1),
+    }
+
+
+def generate(output, tickets, users, managers, ticket_types, days, seed):
+    if os.path.exists(output):
+        raise SystemExit(f"{output} já existe")
+
+    rng = random.Random(seed)
+    connection = sqlite3.connect(output)
+    # Carga inicial: sem fsync nem diário de reversão (o arquivo é descartável até o fim)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute("PRAGMA cache_size = -262144")
+
+    create_schema(connection)
+    create_ticket_types(connection, ticket_types)
+    people = create_people(connection, rng, managers, users)
+    create_tickets(connection, rng, people, tickets, days)
+
+    # Chamados inseridos já no estado final: os agregados do painel (/stats) são recalculados de uma vez
+    connection.execute("BEGIN")
+    analytics.rebuild(connection)
+    connection.commit()
+
+    # Estatísticas do planejador com o volume real e o mesmo modo de diário da aplicação
+    # (o banco de exemplo é desanexado antes: o PRAGMA sem esquema alteraria os dois arquivos)
+    connection.execute("DETACH DATABASE sample")
+    connection.execute("ANALYZE")
+    connection.execute("PRAGMA main.journal_mode = WAL")
+    report = summary(connection)
+    report["query_plan_failures"] = [f"{name}: {detail}" for name, detail in query_plans.check_query_plans(connection)]
+    connection.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um banco sintético do ServiceDesk para benchmarks")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--tickets", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--managers", type=int, default=100)
+    parser.add_argument("--ticket-types", type=int, default=8)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    report = generate(args.output, args.tickets, args.users, args.managers, args.ticket_types, args.days, args.seed)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
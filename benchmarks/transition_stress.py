@@ -0,0 +1,169 @@
+# benchmarks/transition_stress.py
+# Teste de estresse das transições: vários workers disputam o mesmo chamado (aprovar, tratar, cancelar)
+# e ao final o estado gravado precisa ser consistente com o histórico e a versão do chamado
+#
+# Uso:
+#   python benchmarks/transition_stress.py --tickets 20 --workers 16
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "benchmark"
+
+# Solicitante, aprovadores (GERENTE, FIELDSERVICE, ADM) e tratadores do banco de exemplo
+REQUESTER = 1002
+APPROVERS = (1001, 1003, 1006)
+TREATERS = (1003, 1006)
+TICKET = {
+    "ticket_type": "Hardware",
+    "submotive": "Movimentação",
+    "motive_submotive": "Hardware/Movimentação",
+    "form": {"Equipamento": "CPU", "Descrição": "Teste de concorrência"},
+}
+FINAL_STATUSES = ("Concluído", "Cancelado")
+
+
+def prepare(work_dir, workers):
+    for name in ("bdservicedesk.db", "config.env"):
+        shutil.copy(os.path.join(REPO_DIR, name), work_dir)
+    os.chdir(work_dir)
+    os.environ["DATABASE_URI"] = "sqlite:///" + os.path.join(work_dir, "bdservicedesk.db")
+    os.environ["DB_POOL_SIZE"] = str(workers + 2)
+    os.environ.setdefault("LOGIN_RATE_LIMIT", "1000")
+    sys.path.insert(0, REPO_DIR)
+
+    from werkzeug.security import generate_password_hash
+    connection = sqlite3.connect("bdservicedesk.db")
+    connection.execute("UPDATE users SET password = ?", (generate_password_hash(PASSWORD),))
+    connection.commit()
+    connection.close()
+
+
+# Uma ação aleatória sobre o chamado: aprovar, tratar ou cancelar com um usuário qualquer
+def random_action(client, headers, ticket_number):
+    action = random.choice(("approve", "treat", "cancel"))
+    if action == "approve":
+        user = random.choice(APPROVERS)
+        response = client.post(f"/approve_ticket/{ticket_number}", headers=headers[user])
+    elif action == "treat":
+        user = random.choice(TREATERS)
+        response = client.post(f"/treat_ticket/{ticket_number}", headers=headers[user], json={"observation": f"tratado por {user}"})
+    else:
+        user = random.choice(TREATERS)
+        response = client.post(f"/cancel_ticket/{ticket_number}", headers=headers[user], json={"cancelReason": "Outras razões"})
+    return action, response.status_code
+
+
+# Vários workers disputam o mesmo chamado até ele ser encerrado
+def hammer(app, headers, ticket_number, workers, max_rounds):
+    closed = threading.Event()
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def worker(_):
+        client = app.test_client()
+        for _ in range(max_rounds):
+            if closed.is_set():
+                return
+            action, status = random_action(client, headers, ticket_number)
+            with lock:
+                outcomes[(action, status)] += 1
+            if status == 200 and action in ("cancel", "treat"):
+                state = client.get(f"/ticket_detail/{ticket_number}", headers=headers[REQUESTER]).get_json()
+                if state and state.get("ticket_status") in FINAL_STATUSES:
+                    closed.set()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(worker, range(workers)))
+    return outcomes
+
+
+# Confere o estado final do chamado com o histórico gravado
+def check_ticket(connection, ticket_number, outcomes):
+    status, version, next_approver, next_treatment = connection.execute(
+        "SELECT ticket_status, version, next_approver, next_treatment FROM tickets WHERE ticket_number = ?",
+        (ticket_number,),
+    ).fetchone()
+    events = [row[0] for row in connection.execute(
+        "SELECT event_type FROM ticket_events WHERE ticket_number = ? AND event_type <> 'open' ORDER BY id",
+        (ticket_number,),
+    )]
+    approvals = [row[0] for row in connection.execute(
+        "SELECT actor_id FROM ticket_events WHERE ticket_number = ? AND event_type = 'approval' ORDER BY id",
+        (ticket_number,),
+    )]
+    successes = sum(count for (_, code), count in outcomes.items() if code == 200)
+
+    errors = []
+    if status not in FINAL_STATUSES:
+        errors.append(f"status final inesperado: {status}")
+    if version != len(events) or version != successes:
+        errors.append(f"versão {version}, eventos {len(events)}, transições aceitas {successes}")
+    if events.count("cancel") + (status == "Concluído") != 1:
+        errors.append(f"encerramentos registrados: {events}")
+    if approvals != [1, 3, 2][:len(approvals)]:
+        errors.append(f"aprovações fora de ordem: {approvals}")
+    if str(next_approver) != "0" or next_treatment != 0:
+        errors.append(f"chamado encerrado com próximo passo: {next_approver}/{next_treatment}")
+    unexpected = {key: count for key, count in outcomes.items() if key[1] not in (200, 400, 409)}
+    if unexpected:
+        errors.append(f"respostas inesperadas: {unexpected}")
+    return status, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de estresse das transições de chamados")
+    parser.add_argument("--tickets", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--max-rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="stress_transitions_")
+    try:
+        prepare(work_dir, args.workers)
+        from app import app
+
+        client = app.test_client()
+        headers = {}
+        for user in {REQUESTER, *APPROVERS, *TREATERS}:
+            token = client.post("/login", json={"username": user, "password": PASSWORD}).get_json()["token"]
+            headers[user] = {"Authorization": f"Bearer {token}"}
+
+        connection = sqlite3.connect("bdservicedesk.db")
+        totals = Counter()
+        final_statuses = Counter()
+        failures = {}
+        for _ in range(args.tickets):
+            ticket_number = client.post("/open_ticket", headers=headers[REQUESTER], json=TICKET).get_json()["ticket_number"]
+            outcomes = hammer(app, headers, ticket_number, args.workers, args.max_rounds)
+            totals.update(outcomes)
+            status, errors = check_ticket(connection, ticket_number, outcomes)
+            final_statuses[status] += 1
+            if errors:
+                failures[ticket_number] = errors
+        connection.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps({
+        "tickets": args.tickets,
+        "workers": args.workers,
+        "final_statuses": dict(final_statuses),
+        "responses": {f"{action} {status}": count for (action, status), count in sorted(totals.items())},
+        "failures": failures,
+    }, indent=2, ensure_ascii=False))
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,95 @@ load_dotenv('config.env')
 
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')
-    DATABASE_URI = os.getenv('DATABASE_URI')
\ No newline at end of file
+
+    # Banco de dados (URI do SQLAlchemy); sem DATABASE_URI usa o arquivo SQLite de DATABASE_PATH
+    # sqlite:// (em memória) cria um banco vazio com o esquema base, útil para testes
+    DATABASE_PATH = os.getenv('DATABASE_PATH', 'bdservicedesk.db')
+    DATABASE_URI = os.getenv('DATABASE_URI') or f'sqlite:///{DATABASE_PATH}'
+
+    # Pool de conexões
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5.0))
+    DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', 30.0))
+    DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL')
+    DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+    DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 268435456))
+    DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', -65536))
+    DB_AUTO_MIGRATE = os.getenv('DB_AUTO_MIGRATE', 'true').lower() == 'true'
+    DB_BUSY_RETRIES = int(os.getenv('DB_BUSY_RETRIES', 3))
+    DB_BUSY_BACKOFF = float(os.getenv('DB_BUSY_BACKOFF', 0.05))
+    DB_BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', 5.0))
+    # Fila única de escrita entre processos (padrão: <banco>.write.lock; vazio desativa)
+    DB_WRITE_LOCK = os.getenv('DB_WRITE_LOCK')
+    DB_WRITE_LOCK_TIMEOUT = float(os.getenv('DB_WRITE_LOCK_TIMEOUT', 10.0))
+
+    # Autenticação
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 4096))
+
+    # Paginação das listagens
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 100))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 1000))
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 500))
+
+    # Catálogo em cache (intervalo entre verificações da versão no banco)
+    CATALOG_CHECK_INTERVAL = float(os.getenv('CATALOG_CHECK_INTERVAL', 5.0))
+
+    # Login
+    LOGIN_RATE_LIMIT = int(os.getenv('LOGIN_RATE_LIMIT', 10))
+    LOGIN_RATE_WINDOW = float(os.getenv('LOGIN_RATE_WINDOW', 60.0))
+    LOGIN_RATE_MAX_KEYS = int(os.getenv('LOGIN_RATE_MAX_KEYS', 10000))
+    LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', 4))
+    LOGIN_HASH_MAX_PENDING = int(os.getenv('LOGIN_HASH_MAX_PENDING', 32))
+    LOGIN_HASH_TIMEOUT = float(os.getenv('LOGIN_HASH_TIMEOUT', 10.0))
+    LOGIN_HASH_CACHE_SIZE = int(os.getenv('LOGIN_HASH_CACHE_SIZE', 1024))
+    LOGIN_HASH_CACHE_TTL = float(os.getenv('LOGIN_HASH_CACHE_TTL', 300.0))
+
+    # Operações em lote
+    BULK_MAX_TICKETS = int(os.getenv('BULK_MAX_TICKETS', 500))
+
+    # Notificações das filas (/events)
+    EVENTS_BUFFER_SIZE = int(os.getenv('EVENTS_BUFFER_SIZE', 100))
+    EVENTS_MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', 1000))
+    EVENTS_HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT', 15.0))
+
+    # Modo ASGI (asgi.py): threads que executam as rotas do Flask
+    ASGI_THREADS = int(os.getenv('ASGI_THREADS', 32))
+
+    # Log estruturado (stderr): DEBUG, INFO, WARNING, ERROR; formato text ou json
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+
+    # Métricas (GET /metrics) e tempo de cada comando SQL por rota
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    SQL_SLOW_THRESHOLD = float(os.getenv('SQL_SLOW_THRESHOLD', 0.1))
+
+    # Profiler por requisição (cabeçalho X-Profile: 1), desligado por padrão
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_DIR = os.getenv('PROFILER_DIR', 'profiles')
+    PROFILER_TOP = int(os.getenv('PROFILER_TOP', 20))
+
+    # Hierarquia de gestores: equipes a partir deste tamanho usam o plano de equipe grande na listagem;
+    # os subordinados de até ORG_CACHE_SIZE gestores ficam em cache (validado pela versão da hierarquia)
+    ORG_LARGE_DEPARTMENT = int(os.getenv('ORG_LARGE_DEPARTMENT', 500))
+    ORG_CACHE_SIZE = int(os.getenv('ORG_CACHE_SIZE', 1024))
+
+    # Cache de leitura dos chamados (/ticket_detail) e das primeiras páginas das filas, invalidado
+    # pelas escritas; CACHE_BACKEND: "memory" (por processo) ou "pacote.módulo:Classe" de um backend compartilhado
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_SIZE = int(os.getenv('CACHE_SIZE', 4096))
+    CACHE_TTL = float(os.getenv('CACHE_TTL', 30.0))
+
+    # Formulários dos chamados: JSON a partir deste tamanho (bytes) é gravado comprimido
+    FORM_COMPRESS_MIN_SIZE = int(os.getenv('FORM_COMPRESS_MIN_SIZE', 256))
+
+    # Painel de estatísticas (/stats): dias da série diária quando o período não é informado
+    STATS_DAYS_DEFAULT = int(os.getenv('STATS_DAYS_DEFAULT', 30))
+
+    # Servidor de produção (serve.py)
+    SERVE_BIND = os.getenv('SERVE_BIND', '0.0.0.0:5000')
+    SERVE_WORKERS = int(os.getenv('SERVE_WORKERS', min(os.cpu_count() or 1, 4)))
+    SERVE_THREADS = int(os.getenv('SERVE_THREADS', 4))
+    SERVE_TIMEOUT = int(os.getenv('SERVE_TIMEOUT', 30))
+    SERVE_GRACEFUL_TIMEOUT = int(os.getenv('SERVE_GRACEFUL_TIMEOUT', 30))
+    SERVE_MAX_REQUESTS = int(os.getenv('SERVE_MAX_REQUESTS', 0))
\ No newline at end of file
@@ -1,12 +1,349 @@
+import logging
+import os
+import random
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, g
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+import migrations
+from utils import forms, instrumentation, search
 
-# Conexão SQLite
-def create_connection():
-    try:
-        connection = sqlite3.connect("bdservicedesk.db")
-        connection.row_factory = sqlite3.Row  # Retorna resultados como dicionário
-        print("Conexão SQLite foi bem-sucedida!")
+logger = logging.getLogger(__name__)
+
+# Banco de dados padrão da aplicação
+DATABASE = "bdservicedesk.db"
+DATABASE_URI = f"sqlite:///{DATABASE}"
+
+# Backends aceitos em DATABASE_URI (sqlite:///arquivo.db ou sqlite:// em memória)
+SUPPORTED_BACKENDS = {"sqlite"}
+
+
+# Bloqueio de arquivo entre processos (indisponível fora de sistemas POSIX)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Fila única de escrita: uma transação de escrita por vez entre as threads do processo
+# e, com um arquivo de bloqueio, entre os processos (workers) que usam o mesmo banco.
+# Os escritores esperam a vez aqui em vez de disputar o bloqueio do SQLite ("database is locked")
+class WriteLane:
+    def __init__(self, lock_path=None, timeout=10.0):
+        self.lock_path = lock_path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+        # Estatísticas da fila
+        self._acquisitions = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    # Arquivo de bloqueio aberto por processo (reaberto no worker após o fork)
+    def _lock_file(self):
+        if self._pid != os.getpid():
+            self._file = open(self.lock_path, "a+")
+            self._pid = os.getpid()
+        return self._file
+
+    def _acquire_file(self, deadline):
+        lock_file = self._lock_file()
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError("Tempo esgotado aguardando a vez de escrita no banco")
+                time.sleep(0.002)
+
+    @contextmanager
+    def hold(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        if not self._lock.acquire(timeout=self.timeout):
+            raise TimeoutError("Tempo esgotado aguardando a vez de escrita no banco")
+        try:
+            if self.lock_path and fcntl:
+                self._acquire_file(deadline)
+            self._record_acquisition(time.monotonic() - started)
+            try:
+                yield
+            finally:
+                if self.lock_path and fcntl:
+                    fcntl.flock(self._file, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        return {
+            "cross_process": bool(self.lock_path and fcntl),
+            "acquisitions": self._acquisitions,
+            "waits": self._waits,
+            "wait_time_total_ms": round(self._wait_time_total * 1000, 3),
+            "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+        }
+
+    # Chamado com a vez de escrita já obtida
+    def _record_acquisition(self, waited):
+        self._acquisitions += 1
+        if waited > 0.001:
+            self._waits += 1
+            self._wait_time_total += waited
+            self._wait_time_max = max(self._wait_time_max, waited)
+
+
+# Pool de conexões do banco definido em DATABASE_URI (SQLAlchemy), entregando às rotas a conexão
+# DB-API do driver: as consultas continuam em SQL puro com placeholders "?"
+class ConnectionPool:
+    def __init__(self, uri=DATABASE_URI, max_size=8, timeout=5.0, ping_interval=30.0,
+                 journal_mode="WAL", synchronous="NORMAL", mmap_size=268435456, cache_size=-65536,
+                 busy_timeout=5.0):
+        self.url = make_url(uri)
+        if self.url.get_backend_name() not in SUPPORTED_BACKENDS:
+            # As migrações e as rotas usam recursos do SQLite (FTS5, gatilhos, json_each,
+            # PRAGMA user_version, BEGIN IMMEDIATE)
+            raise RuntimeError(
+                f"DATABASE_URI com backend não suportado: {self.url.get_backend_name()} "
+                f"(suportados: {', '.join(sorted(SUPPORTED_BACKENDS))})"
+            )
+
+        self.database = self.url.database or ":memory:"
+        self.in_memory = self.database == ":memory:" or self.url.query.get("mode") == "memory"
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.busy_timeout = busy_timeout
+        self.pragmas = {
+            # Banco em memória não usa WAL
+            "journal_mode": "MEMORY" if self.in_memory else journal_mode,
+            # Espera pelo bloqueio de outra conexão (ms) antes de falhar com "database is locked"
+            "busy_timeout": int(busy_timeout * 1000),
+            "synchronous": synchronous,
+            "mmap_size": mmap_size,
+            "cache_size": cache_size,
+        }
+
+        connect_args = {"check_same_thread": False, "timeout": busy_timeout}
+        if self.in_memory:
+            # Uma única conexão compartilhada (cada nova conexão abriria um banco vazio), emprestada
+            # a uma requisição por vez: a transação de uma não pode ser desfeita ao devolver a outra
+            self.engine = create_engine(self.url, poolclass=StaticPool, connect_args=connect_args)
+            self._exclusive = threading.Lock()
+        else:
+            self.engine = create_engine(
+                self.url,
+                poolclass=QueuePool,
+                pool_size=max_size,
+                max_overflow=0,
+                pool_timeout=timeout,
+                # Reaproveita a conexão devolvida mais recentemente (cache mais quente)
+                pool_use_lifo=True,
+                connect_args=connect_args,
+            )
+            self._exclusive = None
+        event.listen(self.engine, "connect", self._on_connect)
+        event.listen(self.engine, "checkin", self._on_checkin)
+        event.listen(self.engine, "checkout", self._on_checkout)
+        event.listen(self.engine, "invalidate", self._on_invalidate)
+
+        self._lock = threading.Lock()
+
+        # Estatísticas do pool
+        self._created = 0
+        self._discarded = 0
+        self._acquisitions = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    # Ajustes aplicados uma única vez por conexão
+    def _on_connect(self, dbapi_connection, connection_record):
+        dbapi_connection.row_factory = sqlite3.Row  # Retorna resultados como dicionário
+        forms.register(dbapi_connection)
+        for pragma, value in self.pragmas.items():
+            dbapi_connection.execute(f"PRAGMA {pragma} = {value}")
+        with self._lock:
+            self._created += 1
+        logger.debug("Conexão com o banco foi bem-sucedida!")
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        if connection_record is not None:
+            connection_record.info["idle_since"] = time.monotonic()
+
+    # Só testa a conexão se ela ficou ociosa por muito tempo; falhando, o pool abre outra
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        idle_since = connection_record.info.get("idle_since")
+        if idle_since is None or time.monotonic() - idle_since < self.ping_interval:
+            return
+        try:
+            dbapi_connection.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            raise exc.DisconnectionError("Conexão ociosa não responde")
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self._discarded += 1
+
+    def acquire(self):
+        started = time.monotonic()
+        if self._exclusive:
+            waited = self._exclusive.locked()
+            if not self._exclusive.acquire(timeout=self.timeout):
+                raise TimeoutError("Tempo esgotado aguardando uma conexão livre no pool")
+        else:
+            waited = self.engine.pool.checkedout() >= self.max_size
+        try:
+            connection = self.engine.raw_connection()
+        except exc.TimeoutError:
+            raise TimeoutError("Tempo esgotado aguardando uma conexão livre no pool")
+        except BaseException:
+            if self._exclusive:
+                self._exclusive.release()
+            raise
+        self._record_acquisition(started, waited)
         return connection
-    except Exception as e:
-        print(f"Erro na conexão SQLite: {e}")
-        return None
\ No newline at end of file
+
+    def release(self, connection):
+        # Descarta qualquer transação que a requisição não confirmou
+        try:
+            try:
+                if connection.in_transaction:
+                    connection.rollback()
+            except sqlite3.Error:
+                connection.invalidate()
+            connection.close()
+        finally:
+            if self._exclusive:
+                self._exclusive.release()
+
+    def close_all(self):
+        self.engine.dispose()
+
+    # No processo filho (fork) as conexões herdadas são abandonadas sem fechar as do pai
+    def after_fork(self):
+        self.engine.dispose(close=False)
+
+    def stats(self):
+        pool = self.engine.pool
+        with self._lock:
+            return {
+                "backend": self.url.get_backend_name(),
+                "pool_class": type(pool).__name__,
+                "max_size": 1 if self.in_memory else self.max_size,
+                "in_use": int(self._exclusive.locked()) if self.in_memory else pool.checkedout(),
+                "idle": int(not self._exclusive.locked()) if self.in_memory else pool.checkedin(),
+                "created": self._created,
+                "discarded": self._discarded,
+                "acquisitions": self._acquisitions,
+                "waits": self._waits,
+                "wait_time_total_ms": round(self._wait_time_total * 1000, 3),
+                "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+            }
+
+    def _record_acquisition(self, started, waited):
+        with self._lock:
+            self._acquisitions += 1
+            if waited:
+                elapsed = time.monotonic() - started
+                self._waits += 1
+                self._wait_time_total += elapsed
+                self._wait_time_max = max(self._wait_time_max, elapsed)
+
+
+pool = None
+write_lane = None
+
+
+# Inicializa o pool a partir das configurações do app
+def init_app(app):
+    global pool, write_lane
+    pool = ConnectionPool(
+        uri=app.config.get("DATABASE_URI") or f"sqlite:///{app.config.get('DATABASE_PATH', DATABASE)}",
+        max_size=app.config.get("DB_POOL_SIZE", 8),
+        timeout=app.config.get("DB_POOL_TIMEOUT", 5.0),
+        ping_interval=app.config.get("DB_POOL_PING_INTERVAL", 30.0),
+        journal_mode=app.config.get("DB_JOURNAL_MODE", "WAL"),
+        synchronous=app.config.get("DB_SYNCHRONOUS", "NORMAL"),
+        mmap_size=app.config.get("DB_MMAP_SIZE", 268435456),
+        cache_size=app.config.get("DB_CACHE_SIZE", -65536),
+        busy_timeout=app.config.get("DB_BUSY_TIMEOUT", 5.0),
+    )
+
+    # Arquivo de bloqueio ao lado do banco (vazio desativa o bloqueio entre processos)
+    lock_path = app.config.get("DB_WRITE_LOCK")
+    if lock_path is None and not pool.in_memory:
+        lock_path = f"{pool.database}.write.lock"
+    write_lane = WriteLane(lock_path or None, timeout=app.config.get("DB_WRITE_LOCK_TIMEOUT", 10.0))
+
+    # Aplica as migrações pendentes na inicialização
+    if app.config.get("DB_AUTO_MIGRATE", True):
+        connection = pool.acquire()
+        try:
+            migrations.run_migrations(connection)
+        finally:
+            pool.release(connection)
+    migrations.init_app(app, pool)
+    search.init_app(app, pool)
+
+    # Devolve a conexão ao pool ao final de cada requisição
+    app.teardown_appcontext(release_connection)
+
+
+# Conexão SQLite da requisição atual (emprestada do pool, com os comandos medidos por rota)
+def get_connection():
+    if "db_connection" not in g:
+        try:
+            g.db_connection = instrumentation.wrap(pool.acquire())
+        except Exception as e:
+            logger.error("Erro na conexão SQLite: %s", e)
+            return None
+    return g.db_connection
+
+
+def release_connection(exception=None):
+    connection = g.pop("db_connection", None)
+    if connection is not None:
+        pool.release(instrumentation.unwrap(connection))
+
+
+# Banco ocupado/travado por outra conexão (vale uma nova tentativa)
+def is_busy(error):
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return "database is locked" in message or "database is busy" in message
+
+
+# Executa work(cursor) em uma transação BEGIN IMMEDIATE (leitura e escrita sob o mesmo bloqueio)
+# e confirma ao final; se o banco estiver ocupado, tenta novamente algumas vezes com espera crescente
+# As transações passam pela fila única de escrita, então só disputam o banco com escritores externos
+def run_transaction(connection, work):
+    retries = current_app.config.get("DB_BUSY_RETRIES", 3)
+    backoff = current_app.config.get("DB_BUSY_BACKOFF", 0.05)
+
+    for attempt in range(retries + 1):
+        try:
+            with write_lane.hold():
+                try:
+                    connection.execute("BEGIN IMMEDIATE")
+                    result = work(connection.cursor())
+                    connection.commit()
+                    return result
+                except BaseException:
+                    # Desfaz ainda com a vez de escrita, antes de liberar o próximo escritor
+                    connection.rollback()
+                    raise
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == retries:
+                raise
+            logger.warning("Banco ocupado, nova tentativa (%s/%s)", attempt + 1, retries)
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
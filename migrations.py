@@ -0,0 +1,180 @@
+import logging
+import sqlite3
+import click
+from utils import analytics, catalog, forms, history, org, queues, search, timestamps
+
+logger = logging.getLogger(__name__)
+
+# Esquema base (tabelas anteriores às migrações), criado somente em bancos novos
+# como o sqlite:// em memória; bancos existentes já têm essas tabelas
+BASE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS hardware_type (equipamento TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS general_data (register INTEGER PRIMARY KEY NOT NULL, name TEXT NOT NULL, position TEXT NOT NULL, manager TEXT NOT NULL, profile TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS pages_roles (id INTEGER PRIMARY KEY AUTOINCREMENT, profile TEXT NOT NULL, allowed_page TEXT NOT NULL, page_id INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS rejection_reasons (reason TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS profile_config (id_profile_config INTEGER PRIMARY KEY NOT NULL, position TEXT NOT NULL, profile TEXT NOT NULL, approver_id INTEGER NOT NULL, treatment_id INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS tickets_approvals (id_tickets_approvals INTEGER PRIMARY KEY NOT NULL, ticket_number INTEGER NOT NULL, approver_id INTEGER, approver_profile TEXT, date_time_approval TEXT, rejected_id INTEGER, repprover_profile TEXT, date_time_rejection TEXT)",
+    "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY AUTOINCREMENT, user INTEGER NOT NULL, password TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS ticket_types (id INTEGER PRIMARY KEY AUTOINCREMENT, ticket_type TEXT NOT NULL, submotive TEXT NOT NULL, motive_submotive TEXT NOT NULL, form JSON NOT NULL, approval_sequence TEXT, treatment_sequence TEXT, profile TEXT, treatment_form TEXT)",
+    "CREATE TABLE IF NOT EXISTS cancellation_reasons (cancel_reasons TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS tickets (ticket_number INTEGER PRIMARY KEY NOT NULL, ticket_type TEXT NOT NULL, submotive TEXT NOT NULL, motive_submotive TEXT NOT NULL, form TEXT NOT NULL, user INTEGER NOT NULL, name TEXT, manager TEXT, ticket_open_date_time TEXT NOT NULL, ticket_status TEXT NOT NULL, next_approver TEXT NOT NULL, approval_sequence TEXT NOT NULL, rejection_reason TEXT, treatment_sequence TEXT, next_treatment INTEGER, treatment_observation TEXT, cancellation_reason TEXT, close_date_time TEXT)",
+]
+
+# Migrações versionadas do banco
+# A versão aplicada fica registrada em PRAGMA user_version e cada migração roda em uma transação
+MIGRATIONS = [
+    # Roda apenas enquanto user_version é 0
+    (0, "Esquema base (tabelas anteriores às migrações)", BASE_SCHEMA),
+    (1, "Índices secundários para o fluxo de chamados", [
+        # Fila de aprovação (/pending_approvals)
+        "CREATE INDEX IF NOT EXISTS idx_tickets_next_approver_manager ON tickets (next_approver, manager)",
+        # Fila de tratamento (/processing_tickets)
+        "CREATE INDEX IF NOT EXISTS idx_tickets_next_treatment ON tickets (next_treatment)",
+        # Chamados do solicitante (/list_tickets)
+        "CREATE INDEX IF NOT EXISTS idx_tickets_user ON tickets (user)",
+        # Aprovações e reprovações já registradas (approve_ticket / reject_ticket)
+        "CREATE INDEX IF NOT EXISTS idx_tickets_approvals_approver ON tickets_approvals (ticket_number, approver_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_approvals_rejected ON tickets_approvals (ticket_number, rejected_id, date_time_rejection)",
+        # Catálogo de chamados por perfil (/ticket_types e open_ticket)
+        "CREATE INDEX IF NOT EXISTS idx_ticket_types_profile ON ticket_types (profile, motive_submotive)",
+        # Subordinados do gerente (/list_tickets para GERENTE)
+        "CREATE INDEX IF NOT EXISTS idx_general_data_manager ON general_data (manager)",
+        # Login
+        "CREATE INDEX IF NOT EXISTS idx_users_user ON users (user)",
+        "CREATE INDEX IF NOT EXISTS idx_profile_config_position ON profile_config (position)",
+        "CREATE INDEX IF NOT EXISTS idx_profile_config_approver ON profile_config (approver_id, profile)",
+        "CREATE INDEX IF NOT EXISTS idx_pages_roles_profile ON pages_roles (profile, page_id)",
+    ]),
+    (2, "Índice de texto completo para a busca de chamados", [
+        search.CREATE_INDEX,
+        *search.CREATE_TRIGGERS,
+        search.rebuild_index,
+    ]),
+    (3, "Versão do catálogo (tipos de chamado e motivos) para invalidar o cache", [
+        *catalog.CREATE_VERSION_TABLE,
+        *catalog.CREATE_TRIGGERS,
+    ]),
+    (4, "Alterações em profile_config também invalidam o catálogo (fluxos compilados)", [
+        *catalog.version_triggers(("profile_config",)),
+    ]),
+    (5, "Datas em ISO-8601 (ordenáveis e indexadas) para filtros de período", [
+        "ALTER TABLE tickets ADD COLUMN opened_at TEXT",
+        "ALTER TABLE tickets ADD COLUMN closed_at TEXT",
+        "ALTER TABLE tickets_approvals ADD COLUMN approved_at TEXT",
+        "ALTER TABLE tickets_approvals ADD COLUMN rejected_at TEXT",
+        timestamps.backfill,
+        # Filtros ?opened_from/?opened_to/?closed_from e ?order= das listagens
+        "CREATE INDEX IF NOT EXISTS idx_tickets_opened_at ON tickets (opened_at)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_closed_at ON tickets (closed_at)",
+    ]),
+    (6, "Histórico de eventos dos chamados (substitui a concatenação de treatment_observation)", [
+        history.CREATE_TABLE,
+        history.CREATE_INDEX,
+        history.backfill,
+        *search.EVENT_TRIGGERS,
+        search.rebuild_event_index,
+    ]),
+    (7, "Versão dos chamados para controle otimista de concorrência", [
+        "ALTER TABLE tickets ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ]),
+    (8, "Filas de aprovação e tratamento materializadas (mantidas por gatilhos) com contadores", [
+        # As filas substituem os índices de next_approver/next_treatment, que só encareciam as escritas
+        "DROP INDEX IF EXISTS idx_tickets_next_approver_manager",
+        "DROP INDEX IF EXISTS idx_tickets_next_treatment",
+        *queues.CREATE_TABLES,
+        *queues.COUNT_TRIGGERS,
+        *queues.BACKFILL,
+        *queues.TICKET_TRIGGERS,
+    ]),
+    (9, "Agregados do painel (/stats) mantidos por gatilhos: status, série diária e tempos de ciclo", [
+        *analytics.CREATE_TABLES,
+        *analytics.TRIGGERS,
+        analytics.rebuild,
+    ]),
+    (10, "Hierarquia de gestores por matrícula (org_closure) para a visibilidade e a aprovação do gerente", [
+        "ALTER TABLE general_data ADD COLUMN manager_register INTEGER",
+        *org.CREATE_TABLES,
+        org.rebuild,
+        *org.TRIGGERS,
+        # A fila de aprovação do gerente passa do nome gravado no chamado para a matrícula do gestor direto
+        "DROP TRIGGER IF EXISTS tickets_queue_insert",
+        "DROP TRIGGER IF EXISTS tickets_queue_approval_update",
+        *queues.APPROVAL_REBUILD,
+        *queues.entry_triggers(queues.MANAGER_BY_REGISTER),
+    ]),
+    (11, "Formulários compactos: JSON compacto em form_data, os maiores comprimidos com dicionário por esquema (form_schemas)", [
+        *forms.CREATE_TABLES,
+        "ALTER TABLE tickets ADD COLUMN form_schema INTEGER",
+        "ALTER TABLE tickets ADD COLUMN form_data BLOB",
+        forms.backfill,
+        # O form em texto sai da tabela: o índice de busca já tem as palavras dos formulários existentes
+        # e os novos gatilhos leem form_data (comprimidos são indexados pelo app, search.index_forms)
+        "DROP TRIGGER IF EXISTS tickets_fts_insert",
+        "DROP TRIGGER IF EXISTS tickets_fts_update",
+        "ALTER TABLE tickets DROP COLUMN form",
+        *search.FORM_TRIGGERS,
+    ]),
+    (12, "Troca de gestor pelo RH move as aprovações pendentes; versão da hierarquia para o cache de subordinados", [
+        *org.CREATE_VERSION_TABLE,
+        *org.VERSION_TRIGGERS,
+        *queues.MANAGER_TRIGGERS,
+        # Pendências gravadas com um gestor que já mudou voltam para o gestor direto atual
+        *queues.APPROVAL_REBUILD,
+    ]),
+]
+
+
+def current_version(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+# A migração 0 (esquema base) só roda em bancos sem nenhuma migração aplicada
+def pending(version, current):
+    return version > current or version == current == 0
+
+
+# Aplica as migrações pendentes, em ordem, sem recriar tabelas existentes
+def run_migrations(connection):
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if not pending(version, current_version(connection)):
+            continue
+
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            # Outro processo (worker) pode ter aplicado a migração enquanto aguardávamos o bloqueio
+            if not pending(version, current_version(connection)):
+                connection.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(connection)
+                else:
+                    connection.execute(step)
+            connection.execute(f"PRAGMA user_version = {version}")
+            connection.commit()
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+
+        logger.info("Migração %s aplicada: %s", version, description)
+        applied.append(version)
+
+    if applied:
+        # Atualiza as estatísticas usadas pelo planejador de consultas
+        connection.execute("PRAGMA optimize")
+    return applied
+
+
+# Comandos de linha de comando (flask --app app <comando>)
+def init_app(app, pool):
+    @app.cli.command("migrate")
+    def migrate_command():
+        """Aplica as migrações pendentes do banco."""
+        connection = pool.acquire()
+        try:
+            applied = run_migrations(connection)
+            click.echo(f"Versão do banco: {current_version(connection)} (aplicadas: {applied or 'nenhuma'})")
+        finally:
+            pool.release(connection)
+
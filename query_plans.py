@@ -0,0 +1,137 @@
+import contextlib
+import click
+from routes.approval.approvals import APPROVAL_COLUMNS, approval_query
+from routes.approval.approve import approval_tickets_query
+from routes.approval.reject import rejection_tickets_query
+from routes.authentication.login import LOGIN_QUERY
+from routes.tickets.search_tickets import DETAIL_QUERY, LIST_COLUMNS, listing_query
+from routes.tickets.ticket_history import HISTORY_COLUMNS, history_query, ticket_query
+from routes.treatment.processing import PROCESSING_COLUMNS, processing_query
+from routes.treatment.treat import treatment_tickets_query
+from utils import analytics, events, forms, history, org, queues, workflow
+from utils.pagination import ORDER_COLUMNS, period_filter
+
+# Verificação dos planos das consultas das rotas (EXPLAIN QUERY PLAN): as consultas são montadas
+# pelas mesmas funções e constantes que as rotas usam, com ORDER BY e LIMIT, e nenhuma pode fazer
+# varredura completa de tabela
+
+# Página e cursor usados nas consultas paginadas
+LIMIT = 101
+AFTER = [100]
+
+# Perfis da listagem de chamados (identidade do token)
+USER = {"user": 1002, "profile": "USUARIO"}
+ADM = {"user": 1006, "profile": "ADM"}
+MANAGER = {"user": 1001, "profile": "GERENTE"}
+
+
+# Plano de equipe grande na visibilidade do gerente, qualquer que seja o tamanho da equipe
+@contextlib.contextmanager
+def large_department():
+    threshold = org.large_department
+    org.large_department = 0
+    try:
+        yield
+    finally:
+        org.large_department = threshold
+
+
+# Listagem paginada como na rota: (SQL com LIMIT, parâmetros)
+def listing(identity, cursor, search_query="", period=None, order=None, after=AFTER):
+    sql_query, params, _ = listing_query(identity, cursor, list(LIST_COLUMNS), search_query, after, period, order)
+    return sql_query + " LIMIT ?", params + [LIMIT]
+
+
+def paged(build):
+    sql_query, params, _ = build
+    return sql_query + " LIMIT ?", params + [LIMIT]
+
+
+# Consultas das rotas que não podem fazer varredura completa de tabela: [(nome, SQL, parâmetros)]
+def query_plan_checks(cursor):
+    checks = []
+
+    def check(name, sql_query, params=()):
+        checks.append((name, sql_query, tuple(params)))
+
+    january = period_filter({"opened_from": "2025-01-01T00:00:00", "opened_to": "2025-01-31T23:59:59"})
+    closed = period_filter({"closed_from": "2025-01-22T00:00:00"})
+    by_opening = (ORDER_COLUMNS["opened_at"], False)
+
+    # Filas materializadas
+    check("pending_approvals (gerente)", *paged(approval_query(queues.MANAGER_APPROVER, 1001, list(APPROVAL_COLUMNS), ([], []), after=AFTER)))
+    check("pending_approvals", *paged(approval_query(2, 1003, list(APPROVAL_COLUMNS), ([], []), after=AFTER)))
+    check("pending_approvals (período, por abertura)",
+          *paged(approval_query(2, 1003, list(APPROVAL_COLUMNS), january, by_opening, ["2025-01-21T10:30:00", 3])))
+    check("processing_tickets", *paged(processing_query(1, list(PROCESSING_COLUMNS), ([], []), after=AFTER)))
+    check("queue_counts (aprovação)", queues.approval_count_query, (1, "1001", "1001"))
+    check("queue_counts (tratamento)", queues.treatment_count_query, (1,))
+
+    # Listagem de chamados por perfil
+    check("list_tickets (usuário)", *listing(USER, cursor))
+    check("list_tickets (usuário, primeira página)", *listing(USER, cursor, after=None))
+    check("list_tickets (fieldservice/adm)", *listing(ADM, cursor))
+    check("list_tickets (gerente)", *listing(MANAGER, cursor))
+    with large_department():
+        check("list_tickets (gerente, equipe grande)", *listing(MANAGER, cursor))
+    check("list_tickets (busca)", *listing(USER, cursor, "manut", after=None))
+    check("list_tickets (busca numérica)", *listing(USER, cursor, "15"))
+    check("list_tickets (busca por data)", *listing(USER, cursor, "manut", order=by_opening, after=None))
+    check("list_tickets (período)", *listing(ADM, cursor, period=january, order=by_opening, after=["2025-01-21T10:30:00", 3]))
+    check("list_tickets (encerrados a partir de)", *listing(ADM, cursor, period=closed))
+
+    # Detalhamento e histórico
+    check("ticket_detail", DETAIL_QUERY, (1,))
+    check("ticket_detail (observações)", history.observations_query, (1, *history.OBSERVATION_EVENTS))
+    for name, identity in (("usuário", USER), ("gerente", MANAGER)):
+        sql_query, params = ticket_query(identity, cursor)
+        check(f"ticket_history (chamado, {name})", sql_query, [1] + params)
+    check("ticket_history", history_query(list(HISTORY_COLUMNS)), (1, 0, LIMIT))
+    check("stats (série diária)", analytics.daily_query, ("2025-01-01", "2025-01-31", None, None))
+
+    # Transições
+    check("approve_ticket", approval_tickets_query, (1, "[1, 2]"))
+    check("reject_ticket", rejection_tickets_query, (1, "[1, 2]"))
+    check("treat_ticket", treatment_tickets_query, ("[1, 2]",))
+    check("transições (estado atual)", workflow.current_state_query, (1,))
+    check("transições (filas antes e depois)", events.queue_membership_query, ("[1, 2]", "[1, 2]"))
+
+    # Login
+    check("login", LOGIN_QUERY, (1002,))
+    return checks
+
+
+# Retorna as consultas cujo plano faz varredura completa de alguma tabela
+def check_query_plans(connection):
+    # Projeções do formulário chamam form_text (conexões abertas fora do pool também)
+    forms.register(connection)
+    failures = []
+    for name, sql, params in query_plan_checks(connection.cursor()):
+        plan = connection.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        for row in plan:
+            detail = row[3]
+            # Tabelas virtuais (FTS5, json_each) são consultadas pelo próprio índice
+            if "VIRTUAL TABLE" in detail:
+                continue
+            if detail.startswith("SCAN ") and "USING INTEGER PRIMARY KEY" not in detail:
+                failures.append((name, detail))
+    return failures
+
+
+# Comando de linha de comando (flask --app app check-query-plans)
+def init_app(app, pool):
+    @app.cli.command("check-query-plans")
+    def check_query_plans_command():
+        """Falha se alguma consulta das rotas fizer varredura completa de tabela."""
+        connection = pool.acquire()
+        try:
+            checks = len(query_plan_checks(connection.cursor()))
+            failures = check_query_plans(connection)
+        finally:
+            pool.release(connection)
+
+        for name, detail in failures:
+            click.echo(f"{name}: {detail}", err=True)
+        if failures:
+            raise SystemExit(1)
+        click.echo(f"{checks} consultas verificadas, nenhuma varredura completa")
@@ -1,105 +1,118 @@
-from flask import Blueprint, jsonify, request, current_app
-from utils.token import decode_token
-from db import create_connection
-import json
+import logging
+from flask import Blueprint, jsonify, g
+from db import get_connection
+from utils import cache, forms, org
+from utils.queues import MANAGER_APPROVER, QUEUE_APPROVAL
+from utils.pagination import (
+    PaginationError, keyset_order, paginate, parse_fields, parse_order, parse_page, parse_period,
+    rows_to_json, select_list, with_next_cursor,
+)
+
+logger = logging.getLogger(__name__)
 
 # Criando o Blueprint
 approvals = Blueprint('approvals', __name__)
 
 
 
+# Campos disponíveis na fila de aprovação (campo da resposta -> coluna)
+APPROVAL_COLUMNS = {
+    "ticket": "tickets.ticket_number",
+    "user": "tickets.user",
+    "next_approver": "tickets.next_approver",
+    "manager": "tickets.manager",
+    "name": "tickets.name",
+    "motive_submotive": "tickets.motive_submotive",
+    "form": forms.FORM_JSON.format(row="tickets"),
+    "ticket_status": "tickets.ticket_status",
+}
+
+# Chave da paginação: a fila materializada já está ordenada por aprovador e número do chamado
+QUEUE_KEY = "approval_queue.ticket_number"
+
+
+# Consulta da fila de aprovação do aprovador: período, ordenação e início da página
+# Retorna também a função que extrai o cursor de uma linha
+def approval_query(approver_id, user, fields, period, order=None, after=None):
+    order_key, keyset_conditions, keyset_params, order_by, cursor_values = keyset_order(order, after, key=QUEUE_KEY)
+
+    # Definição do filtro pelo profile
+    if approver_id == MANAGER_APPROVER:
+        # Gerente: chamados dos subordinados diretos (matrícula do gestor gravada na fila)
+        conditions = ["approval_queue.approver_id = ?", "approval_queue.manager = ?"]
+        params = [approver_id, str(user)]
+    else:
+        conditions = ["approval_queue.approver_id = ?"]
+        params = [approver_id]
+
+    # Filtros de período e continuação a partir do último chamado da página anterior
+    conditions += period[0] + keyset_conditions
+    params += period[1] + keyset_params
+
+    sql_query = f"""
+        SELECT {select_list(APPROVAL_COLUMNS, fields, key=QUEUE_KEY)}{order_key}
+        FROM approval_queue
+        JOIN tickets ON tickets.ticket_number = approval_queue.ticket_number
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {order_by}
+        """
+    return sql_query, params, cursor_values
+
+
 # Endpoint para listar todos os chamados a serem aprovados
 @approvals.route('/pending_approvals', methods=['GET'])
 def list_approval():
     try:
-        # Obter o token no cabeçalho
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"error": "Token não fornecido"}), 401
+        # Identidade autenticada da requisição
+        identity = g.identity
 
-        # Limpar o token do formato 'Bearer' e decodificar
-        token = token.replace("Bearer ", "")
-        decoded_token = decode_token(token)
+        # Recuperar informações do token
+        user = identity.get("user")
+        approver_id = identity.get("approver_id")
 
-        if not decoded_token:
-            return jsonify({"error": "Token inválido ou expirado"}), 401
+        # Paginação (keyset), projeção de campos, período e ordenação
+        try:
+            fields = parse_fields(APPROVAL_COLUMNS)
+            limit, after = parse_page()
+            period = parse_period()
+            order = parse_order()
+            pending_tickets_query, params, cursor_values = approval_query(approver_id, user, fields, period, order, after)
+        except PaginationError as e:
+            return jsonify({"error": str(e)}), 400
 
-        # Recuperar informações do token
-        name = decoded_token.get("name")
-        approver_id = decoded_token.get("approver_id")
-        
-        connection = create_connection()
+        # Somente os aprovadores (gerente, 2 e 3) têm fila de aprovação
+        if approver_id not in (MANAGER_APPROVER, 2, 3):
+            return jsonify({"message": "Nenhum ticket pendente de aprovação"}), 404
+
+        connection = get_connection()
         if not connection:
             return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
         
         cursor = connection.cursor()
+
+        # Primeira página já servida e ainda válida (invalidada quando um chamado entra ou sai da fila)
+        # A fila do gerente muda também com a troca de gestor pelo RH: vale só na mesma versão da hierarquia
+        cache_key = cache.queue_key(QUEUE_APPROVAL, approver_id, str(user))
+        org_version = org.current_version(cursor) if approver_id == MANAGER_APPROVER else None
+        page = cache.cached_page(cache_key, org_version)
+        if page:
+            return cache.page_response(page)
+        started = cache.response_cache.begin()
         
-        # Recupera os chamados pendentes de aprovação
-        
-        # Definição da consulta SQL pelo profile
-        if approver_id == 1:
-            pending_tickets_query = """
-            SELECT
-                ticket_number,
-                user,
-                next_approver,
-                manager,
-                name,
-                motive_submotive,
-                form,
-                ticket_status
-            FROM
-                tickets
-            WHERE
-                next_approver = ? AND
-                manager = ?
-            """
-            cursor.execute(pending_tickets_query, (approver_id, name))
-            pending_tickets_result = cursor.fetchall()
-        
-        elif approver_id == 2 or approver_id == 3:
-            pending_tickets_query = """
-            SELECT
-                ticket_number,
-                user,
-                next_approver,
-                manager,
-                name,
-                motive_submotive,
-                form,
-                ticket_status
-            FROM
-                tickets
-            WHERE
-                next_approver = ?
-            """
-            cursor.execute(pending_tickets_query, (approver_id,))
-            pending_tickets_result = cursor.fetchall()
+        # Recupera os chamados pendentes de aprovação (fila mantida por gatilhos)
+        cursor.execute(pending_tickets_query + " LIMIT ?", params + [limit + 1])
+        pending_tickets_result, next_cursor = paginate(cursor.fetchall(), limit, cursor_values)
 
         if not pending_tickets_result:
-            return jsonify({"message": "Nenhum ticket pendente de aprovação"}), 404
+            response = jsonify({"message": "Nenhum ticket pendente de aprovação"})
+            cache.store_page(cache_key, started, response, 404, None, org_version)
+            return response, 404
 
-        ticket_data_list = []  # Lista para armazenar os dados dos tickets
-
-        # Iterando sobre os resultados de approval_tickets
-        for ticket in pending_tickets_result:
-            ticket_data = {
-                "ticket": ticket[0],
-                "user": ticket[1],
-                "next_approver": ticket[2],
-                "manager": ticket[3],
-                "name": ticket[4],
-                "motive_submotive": ticket[5],
-                "form": json.loads(ticket[6]) if ticket[6] else {},
-                "ticket_status": ticket[7]
-            }
-            ticket_data_list.append(ticket_data)  # Adiciona o dicionário à lista
-
-        # Retornar todos os tickets como resposta JSON
-        return jsonify(ticket_data_list), 200
+        # Retornar os tickets da página como resposta JSON
+        response = jsonify(rows_to_json(pending_tickets_result))
+        cache.store_page(cache_key, started, response, 200, next_cursor, org_version)
+        return with_next_cursor(response, next_cursor), 200
     
-    except Exception as e:
-        print("Erro ao buscar detalhes do chamado:", e)
+    except Exception:
+        logger.exception("Erro ao buscar detalhes do chamado")
         return jsonify({"error": "Erro interno no servidor"}), 500
-    finally:
-        connection.close()
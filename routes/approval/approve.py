@@ -1,122 +1,211 @@
-from flask import Blueprint, jsonify, request
-from utils.token import decode_token
-from db import create_connection
-import json
-import datetime
+import logging
+from flask import Blueprint, jsonify, request, current_app, g
+from db import get_connection, run_transaction
+from utils.bulk import BulkError, failure, parse_ticket_numbers, success, ticket_numbers_param
+from utils.catalog import catalog
+from utils import events, history, timestamps
+from utils.workflow import TransitionConflict, check_swapped, check_version, conflict_response, engine
+
+logger = logging.getLogger(__name__)
 
 # Criando o Blueprint
 approve = Blueprint('approve', __name__)
 
 
+# Sequências dos chamados e se o aprovador já registrou aprovação neles
+approval_tickets_query = """
+SELECT
+    tickets.ticket_number,
+    tickets.approval_sequence,
+    tickets.treatment_sequence,
+    tickets.next_approver,
+    tickets.version,
+    EXISTS (
+        SELECT 1
+        FROM tickets_approvals
+        WHERE tickets_approvals.ticket_number = tickets.ticket_number AND tickets_approvals.approver_id = ?
+    ) AS already_approved
+FROM tickets
+WHERE tickets.ticket_number IN (SELECT value FROM json_each(?))
+"""
+
+insert_approval_info = """
+INSERT INTO tickets_approvals (ticket_number, approver_id, approver_profile, date_time_approval, approved_at)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+update_ticket_info = """
+UPDATE tickets
+SET next_approver = ?, 
+    ticket_status = ?,
+    next_treatment =?,
+    version = version + 1
+WHERE ticket_number = ? AND version = ?
+"""
+
+
+# Busca os chamados a aprovar indexados pelo número
+def find_approval_tickets(cursor, ticket_numbers, approver_id):
+    cursor.execute(approval_tickets_query, (approver_id, ticket_numbers_param(ticket_numbers)))
+    return {ticket["ticket_number"]: ticket for ticket in cursor.fetchall()}
+
+
+# Determina a transição de aprovação de um chamado
+# Retorna (transição, None) ou (None, (mensagem de erro, status HTTP))
+# Levanta TransitionConflict se o chamado não está aguardando este aprovador
+def plan_approval(ticket, approver_id):
+    ticket_workflow = engine.for_sequences(ticket["approval_sequence"], ticket["treatment_sequence"])
+
+    # Verificar se o aprovador atual está na sequência e determinar o próximo passo
+    transition = ticket_workflow.approve(approver_id)
+    if transition is None:
+        return None, ("Aprovador atual não está na sequência de aprovação", 400)
+    if str(ticket["next_approver"]) != str(approver_id):
+        raise TransitionConflict(ticket["ticket_number"], "Chamado não está aguardando este aprovador")
+    if not transition.ticket_status:
+        return None, ("Perfil do próximo aprovador não encontrado", 404)
+    return transition, None
+
+
+# Grava as aprovações já validadas: [(chamado, transição), ...]
+def apply_approvals(cursor, tickets, approvals, approver_id, user, profile):
+    approved = timestamps.now()
+    queues_before = events.snapshot(cursor, [ticket_number for ticket_number, _ in approvals])
+
+    # Registrar a aprovação apenas onde o aprovador ainda não aprovou
+    cursor.executemany(insert_approval_info, [
+        (ticket_number, approver_id, profile, approved.display, approved.iso)
+        for ticket_number, _ in approvals
+        if not tickets[ticket_number]["already_approved"]
+    ])
+
+    # Avançar cada chamado somente se ele não mudou desde a leitura (compare-and-swap pela versão)
+    for ticket_number, transition in approvals:
+        cursor.execute(update_ticket_info, (
+            transition.next_approver, transition.ticket_status, transition.next_treatment,
+            ticket_number, tickets[ticket_number]["version"],
+        ))
+        check_swapped(cursor, ticket_number)
+
+    # Registrar a aprovação no histórico
+    history.record(cursor, [
+        history.event(ticket_number, history.EVENT_APPROVAL, approved, actor_id=approver_id, user=user, profile=profile)
+        for ticket_number, _ in approvals
+    ])
+
+    # Notificar os aprovadores e tratadores cujas filas mudaram (após o commit)
+    events.stage(cursor, [ticket_number for ticket_number, _ in approvals], queues_before)
+
+
 # Endpoint para aprovar um chamado
 @approve.route('/approve_ticket/<int:ticket_number>', methods=['POST'])
 def approve_ticket(ticket_number):
     connection = None
     try:
         # Conexão com o banco de dados
-        connection = create_connection()
-        cursor = connection.cursor()
-
-        # Obter informações do token
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"error": "Token não fornecido"}), 401
-
-        token = token.replace("Bearer ", "")
-        decoded_token = decode_token(token)
+        connection = get_connection()
 
-        if not decoded_token:
-            return jsonify({"error": "Token inválido ou expirado"}), 401
+        # Identidade autenticada da requisição
+        identity = g.identity
 
         # Recuperar informações do token
-        approver_id = decoded_token.get("approver_id")
-        profile = decoded_token.get("profile")
+        approver_id = identity.get("approver_id")
+        user = identity.get("user")
+        profile = identity.get("profile")
         
         if not approver_id or not profile:
             return jsonify({"error": "Perfil do aprovador não encontrado"}), 404
 
-        print("Aprovador atual:", approver_id)
+        logger.debug("Aprovador atual: %s", approver_id)
 
-        # Verificar se já foi aprovado
-        approved_ticket_query = """
-        SELECT id_tickets_approvals
-        FROM tickets_approvals
-        WHERE ticket_number = ? AND approver_id = ?
-        """
-        cursor.execute(approved_ticket_query, (ticket_number, approver_id))
-        already_approved = cursor.fetchone()
-
-        # Recuperar a sequência de aprovação
-        find_next_approver_sequence_query = """
-        SELECT approval_sequence, treatment_sequence
-        FROM tickets
-        WHERE ticket_number = ?
-        """
-        cursor.execute(find_next_approver_sequence_query, (ticket_number,))
-        approver_treatment_sequence = cursor.fetchone()
-        if approver_treatment_sequence is None:
-            return jsonify({"error": "Sequência de aprovação não encontrada"}), 404
-
-        approver_sequence = json.loads(approver_treatment_sequence[0])
-        treatment_sequence = json.loads(approver_treatment_sequence[1])
-        print("Sequência de aprovação:", approver_sequence)
-        print("Sequência de tratamento:", treatment_sequence)
-
-
-        # Verificar se o aprovador atual está na sequência
-        if approver_id not in approver_sequence:
-            return jsonify({"error": "Aprovador atual não está na sequência de aprovação"}), 400
-
-
-        # Determinar próximo aprovador
-        current_index = approver_sequence.index(approver_id)
-        next_approver = approver_sequence[current_index + 1] if current_index + 1 < len(approver_sequence) else 0
-
-
-        # Recupera o perfil do próximo aprovador
-        next_approver_profile = 0
-        if next_approver != 0:
-            next_approver_profile_query = """
-            SELECT profile
-            FROM profile_config
-            WHERE approver_id = ?
-            """
-            cursor.execute(next_approver_profile_query, (next_approver,))
-            next_approver_profile = cursor.fetchone()
-            if not next_approver_profile:
-                return jsonify({"error": "Perfil do próximo aprovador não encontrado"}), 404
-            next_approver_profile = next_approver_profile[0]
-
-        # Definir status do chamado
-        ticket_status = "Aprovado" if next_approver == 0 else f"Aguardando Aprovação - {next_approver_profile.capitalize()}"
-        next_treatment = treatment_sequence[0] if next_approver == 0 else 0
-
-        # Inserir ou atualizar informações de aprovação
-        current_date_time = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        if not already_approved:
-            insert_approval_info = """
-            INSERT INTO tickets_approvals (ticket_number, approver_id, approver_profile, date_time_approval)
-            VALUES (?, ?, ?, ?)
-            """
-            cursor.execute(insert_approval_info, (ticket_number, approver_id, profile, current_date_time))
-
-        update_ticket_info = """
-        UPDATE tickets
-        SET next_approver = ?, 
-            ticket_status = ?,
-            next_treatment =?
-        WHERE ticket_number = ?
-        """
-        cursor.execute(update_ticket_info, (next_approver, ticket_status, next_treatment, ticket_number))
-
-        # Confirmar transação
-        connection.commit()
-        return {"success": True, "message": "Aprovação processada com sucesso!"}
-            
-    except Exception as e:
-        print(f"Erro ao processar aprovação: {e}")
+        # Versão do chamado vista pelo cliente (opcional)
+        expected_version = (request.get_json(silent=True) or {}).get("version")
+
+        # Fluxo compilado do chamado
+        catalog.refresh(connection, current_app.json.dumps)
+
+        # Leitura, validação e gravação sob o mesmo bloqueio de escrita
+        def approve_one(cursor):
+            # Recuperar a sequência de aprovação e verificar se já foi aprovado
+            tickets = find_approval_tickets(cursor, [ticket_number], approver_id)
+            if ticket_number not in tickets:
+                return jsonify({"error": "Sequência de aprovação não encontrada"}), 404
+            check_version(tickets[ticket_number], expected_version)
+
+            transition, error = plan_approval(tickets[ticket_number], approver_id)
+            if error:
+                return jsonify({"error": error[0]}), error[1]
+
+            # Inserir ou atualizar informações de aprovação
+            apply_approvals(cursor, tickets, [(ticket_number, transition)], approver_id, user, profile)
+            return {"success": True, "message": "Aprovação processada com sucesso!", "version": tickets[ticket_number]["version"] + 1}
+
+        return run_transaction(connection, approve_one)
+
+    except TransitionConflict as conflict:
+        return conflict_response(connection, conflict)
+    except Exception:
+        logger.exception("Erro ao processar aprovação")
         return jsonify({"error": "Erro interno no servidor"}), 500
-    
-    finally:
-        connection.close()
 
+
+# Endpoint para aprovar vários chamados em uma única transação
+@approve.route('/approve_tickets', methods=['POST'])
+def approve_tickets():
+    connection = None
+    try:
+        # Identidade autenticada da requisição
+        identity = g.identity
+
+        approver_id = identity.get("approver_id")
+        user = identity.get("user")
+        profile = identity.get("profile")
+        if not approver_id or not profile:
+            return jsonify({"error": "Perfil do aprovador não encontrado"}), 404
+
+        try:
+            ticket_numbers = parse_ticket_numbers(request.get_json(silent=True))
+        except BulkError as e:
+            return jsonify({"error": str(e)}), 400
+
+        connection = get_connection()
+        if not connection:
+            return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
+
+        catalog.refresh(connection, current_app.json.dumps)
+
+        def approve_all(cursor):
+            # Validar todas as sequências com uma única consulta
+            tickets = find_approval_tickets(cursor, ticket_numbers, approver_id)
+
+            results = []
+            approvals = []
+            for ticket_number in ticket_numbers:
+                if ticket_number not in tickets:
+                    results.append(failure(ticket_number, "Sequência de aprovação não encontrada", 404))
+                    continue
+
+                try:
+                    transition, error = plan_approval(tickets[ticket_number], approver_id)
+                except TransitionConflict as conflict:
+                    results.append(failure(ticket_number, str(conflict), 409))
+                    continue
+                if error:
+                    results.append(failure(ticket_number, *error))
+                    continue
+
+                approvals.append((ticket_number, transition))
+                results.append(success(ticket_number))
+
+            # Gravar todas as aprovações, confirmadas uma única vez ao final da transação
+            if approvals:
+                apply_approvals(cursor, tickets, approvals, approver_id, user, profile)
+            return jsonify({"approved": len(approvals), "results": results}), 200
+
+        return run_transaction(connection, approve_all)
+
+    except TransitionConflict as conflict:
+        return conflict_response(connection, conflict)
+    except Exception:
+        logger.exception("Erro ao processar aprovações em lote")
+        return jsonify({"error": "Erro interno no servidor"}), 500
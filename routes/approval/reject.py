@@ -1,7 +1,13 @@
-from flask import Blueprint, jsonify, request
-from utils.token import decode_token
-from db import create_connection
-import datetime
+import logging
+from flask import Blueprint, jsonify, request, current_app, g
+from db import get_connection, run_transaction
+from utils.token import public_endpoint
+from utils.bulk import BulkError, failure, parse_ticket_numbers, success, ticket_numbers_param
+from utils.catalog import catalog
+from utils import events, history, timestamps
+from utils.workflow import TransitionConflict, Workflow, check_swapped, check_version, conflict_response
+
+logger = logging.getLogger(__name__)
 
 # Criando o Blueprint
 reject = Blueprint('reject', __name__)
@@ -9,119 +15,207 @@ reject = Blueprint('reject', __name__)
 
 # Endpoint para listar os motivos de reprovação
 @reject.route('/get_rejection_reasons', methods=['GET'])
+@public_endpoint
 def get_rejection_reasons():
     try:
-        connection = create_connection()
-        cursor = connection.cursor()
+        connection = get_connection()
 
-        # Buscar todos os motivos de reprovação
-        cursor.execute("SELECT reason FROM rejection_reasons")
-        reasons = cursor.fetchall()
+        # Motivos em cache, já serializados (recarregados quando a tabela muda)
+        catalog.refresh(connection, current_app.json.dumps)
+        return catalog.rejection_reasons().response()
 
-        # Se não houver motivos cadastrados
-        if not reasons:
-            return jsonify({"error": "Nenhum motivo de reprovação encontrado"}), 404
+    except Exception:
+        logger.exception("Erro ao buscar motivos de reprovação")
+        return jsonify({"error": "Erro interno no servidor"}), 500
 
-        # Montar a lista de motivos com apenas o campo 'reason'
-        rejection_reasons = [reason[0] for reason in reasons]
 
-        return jsonify({"rejection_reasons": rejection_reasons}), 200
+# Chamados a reprovar e se o aprovador já registrou reprovação neles
+rejection_tickets_query = """
+SELECT
+    tickets.ticket_number,
+    tickets.next_approver,
+    tickets.version,
+    tickets_approvals.id_tickets_approvals IS NOT NULL AS already_rejected,
+    tickets_approvals.date_time_rejection,
+    tickets_approvals.rejected_at
+FROM tickets
+LEFT JOIN tickets_approvals
+    ON tickets_approvals.ticket_number = tickets.ticket_number AND tickets_approvals.rejected_id = ?
+WHERE tickets.ticket_number IN (SELECT value FROM json_each(?))
+"""
+
+reject_approvals_query = """
+    INSERT INTO tickets_approvals (ticket_number, rejected_id, repprover_profile, date_time_rejection, rejected_at)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+reject_tickets_query = """
+    UPDATE tickets
+    SET ticket_status = ?, rejection_reason = ?, next_approver = ?, next_treatment = ?, close_date_time = ?, closed_at = ?,
+        version = version + 1
+    WHERE ticket_number = ? AND version = ?
+"""
+
+
+# Busca os chamados a reprovar indexados pelo número
+def find_rejection_tickets(cursor, ticket_numbers, approver_id):
+    cursor.execute(rejection_tickets_query, (approver_id, ticket_numbers_param(ticket_numbers)))
+    tickets = {}
+    for ticket in cursor.fetchall():
+        tickets.setdefault(ticket["ticket_number"], ticket)
+    return tickets
+
+
+# Só reprova chamados aguardando este aprovador (ou já reprovados por ele, para atualizar o motivo)
+def check_rejectable(ticket, approver_id):
+    if not ticket["already_rejected"] and str(ticket["next_approver"]) != str(approver_id):
+        raise TransitionConflict(ticket["ticket_number"], "Chamado não está aguardando este aprovador")
+
+
+# Grava as reprovações dos chamados informados
+def apply_rejections(cursor, tickets, ticket_numbers, approver_id, user, profile, rejection_reason):
+    # A reprovação encerra o fluxo do chamado
+    next_approver, ticket_status, next_treatment = Workflow.reject()
+    rejected = timestamps.now()
+    queues_before = events.snapshot(cursor, ticket_numbers)
+
+    # Registrar a rejeição na tabela tickets_approvals (somente se o aprovador ainda não rejeitou)
+    cursor.executemany(reject_approvals_query, [
+        (ticket_number, approver_id, profile, rejected.display, rejected.iso)
+        for ticket_number in ticket_numbers
+        if not tickets[ticket_number]["already_rejected"]
+    ])
+
+    # Atualizar o status do ticket para "Reprovado" (mantendo a data da reprovação já registrada)
+    # somente se ele não mudou desde a leitura (compare-and-swap pela versão)
+    for ticket_number in ticket_numbers:
+        ticket = tickets[ticket_number]
+        if ticket["already_rejected"]:
+            close_date_time, closed_at = ticket["date_time_rejection"], ticket["rejected_at"]
+        else:
+            close_date_time, closed_at = rejected
+        cursor.execute(reject_tickets_query, (
+            ticket_status, rejection_reason, next_approver, next_treatment, close_date_time, closed_at,
+            ticket_number, ticket["version"],
+        ))
+        check_swapped(cursor, ticket_number)
 
-    except Exception as e:
-        print(f"Erro ao buscar motivos de reprovação: {e}")
-        return jsonify({"error": "Erro interno no servidor"}), 500
-    finally:
-        connection.close()
+    # Registrar a reprovação no histórico
+    history.record(cursor, [
+        history.event(ticket_number, history.EVENT_REJECTION, rejected, actor_id=approver_id, user=user, profile=profile, message=rejection_reason)
+        for ticket_number in ticket_numbers
+    ])
+
+    # O chamado reprovado sai da fila do aprovador (notificação após o commit)
+    events.stage(cursor, ticket_numbers, queues_before)
 
 
 # Endpoint para reprovar um chamado
 @reject.route('/reject_ticket/<int:ticket_number>', methods=['POST'])
 def reject_ticket(ticket_number):
+    connection = None
     try:
-        connection = create_connection()
-        cursor = connection.cursor()
+        connection = get_connection()
         
-        # Obter o token do cabeçalho
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"error": "Token não fornecido"}), 401
+        # Identidade autenticada da requisição
+        identity = g.identity
 
-        token = token.replace("Bearer ", "")
-        decoded_token = decode_token(token)
-
-        if not decoded_token:
-            return jsonify({"error": "Token inválido ou expirado"}), 401
-
-        approver_id = decoded_token.get("approver_id")
-        profile = decoded_token.get("profile")
+        approver_id = identity.get("approver_id")
+        user = identity.get("user")
+        profile = identity.get("profile")
         if not approver_id or not profile:
             return jsonify({"error": "Perfil não encontrado no token"}), 400
 
-        # Buscar dados do chamado
-        ticket_info_query = """
-        SELECT ticket_number, next_approver, approval_sequence, ticket_status
-        FROM tickets
-        WHERE ticket_number = ?
-        """
-        cursor.execute(ticket_info_query, (ticket_number,))
-        ticket = cursor.fetchone()
+        # Obter motivo da reprovação e a versão do chamado vista pelo cliente (opcional)
+        data = request.get_json()
+        rejection_reason = data.get("rejection_reason")
+        expected_version = data.get("version")
+
+        # Leitura, validação e gravação sob o mesmo bloqueio de escrita
+        def reject_one(cursor):
+            # Buscar dados do chamado e verificar se o usuário já rejeitou
+            tickets = find_rejection_tickets(cursor, [ticket_number], approver_id)
+            if ticket_number not in tickets:
+                return jsonify({"error": "Chamado não encontrado"}), 404
+
+            if not rejection_reason:
+                return jsonify({"error": "Motivo da reprovação é obrigatório"}), 400
+
+            ticket = tickets[ticket_number]
+            check_version(ticket, expected_version)
+            check_rejectable(ticket, approver_id)
+            apply_rejections(cursor, tickets, [ticket_number], approver_id, user, profile, rejection_reason)
+
+            # Se o chamado já estiver reprovado, apenas a tabela tickets foi atualizada
+            if ticket["already_rejected"]:
+                return jsonify({"message": "Você já rejeitou este chamado. Atualizando a tabela tickets", "version": ticket["version"] + 1}), 200
+            return jsonify({"message": "Chamado rejeitado com sucesso", "version": ticket["version"] + 1}), 200
+
+        return run_transaction(connection, reject_one)
+
+    except TransitionConflict as conflict:
+        return conflict_response(connection, conflict)
+    except Exception:
+        logger.exception("Erro ao reprovar o chamado")
+        return jsonify({"error": "Erro interno no servidor"}), 500
 
-        if not ticket:
-            return jsonify({"error": "Chamado não encontrado"}), 404
 
-        ticket_number, next_approver, approval_sequence_str, ticket_status = ticket
+# Endpoint para reprovar vários chamados em uma única transação
+@reject.route('/reject_tickets', methods=['POST'])
+def reject_tickets():
+    connection = None
+    try:
+        # Identidade autenticada da requisição
+        identity = g.identity
 
-        # Obter motivo da reprovação
-        data = request.get_json()
+        approver_id = identity.get("approver_id")
+        user = identity.get("user")
+        profile = identity.get("profile")
+        if not approver_id or not profile:
+            return jsonify({"error": "Perfil não encontrado no token"}), 400
+
+        data = request.get_json(silent=True)
+        try:
+            ticket_numbers = parse_ticket_numbers(data)
+        except BulkError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Obter motivo da reprovação (o mesmo para todos os chamados)
         rejection_reason = data.get("rejection_reason")
         if not rejection_reason:
             return jsonify({"error": "Motivo da reprovação é obrigatório"}), 400
 
-        # Verificar se o usuário já rejeitou
-        already_rejected_query = """
-        SELECT date_time_rejection FROM tickets_approvals WHERE ticket_number = ? AND rejected_id = ?
-        """
-        cursor.execute(already_rejected_query, (ticket_number, approver_id))
-        rejection = cursor.fetchone()
-
-        # Se o chamado já estiver reprovado, atualizar tickets com as infos
-        if rejection:
-            date_time_rejection = rejection[0]
-            # Atualizar o status do ticket para "Reprovado"
-            update_ticket_query = """
-                UPDATE tickets
-                SET ticket_status = 'Reprovado', rejection_reason = ?, next_approver = 0, next_treatment = 0, close_date_time = ?
-                WHERE ticket_number = ?
-            """
-            cursor.execute(update_ticket_query, (rejection_reason, date_time_rejection, ticket_number,))
-            return jsonify({"message": "Você já rejeitou este chamado. Atualizando a tabela tickets"}), 200
-        else:
-            # Registrar a rejeição na tabela tickets_approvals
-            current_date_time = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-            
-            reject_approvals_query = """
-                INSERT INTO tickets_approvals (ticket_number, rejected_id, repprover_profile, date_time_rejection)
-                VALUES (?, ?, ?, ?)
-            """
-            cursor.execute(reject_approvals_query, (ticket_number, approver_id, profile, current_date_time,))
-
-            # Atualizar o status do ticket para "Reprovado"
-            
-            
-
-            
-            reject_tickets_query = """
-                UPDATE tickets
-                SET ticket_status = 'Reprovado', rejection_reason = ?, next_approver = 0, next_treatment = 0, close_date_time = ?
-                WHERE ticket_number = ?
-            """
-            cursor.execute(reject_tickets_query, (rejection_reason, current_date_time, ticket_number))
-
-        connection.commit()
-        return jsonify({"message": "Chamado rejeitado com sucesso"}), 200
-
-    except Exception as e:
-        print(f"Erro ao reprovar o chamado: {e}")
+        connection = get_connection()
+        if not connection:
+            return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
+
+        def reject_all(cursor):
+            # Buscar todos os chamados com uma única consulta
+            tickets = find_rejection_tickets(cursor, ticket_numbers, approver_id)
+
+            results = []
+            rejected = []
+            for ticket_number in ticket_numbers:
+                if ticket_number not in tickets:
+                    results.append(failure(ticket_number, "Chamado não encontrado", 404))
+                    continue
+                try:
+                    check_rejectable(tickets[ticket_number], approver_id)
+                except TransitionConflict as conflict:
+                    results.append(failure(ticket_number, str(conflict), 409))
+                    continue
+                rejected.append(ticket_number)
+                results.append(success(ticket_number))
+
+            # Gravar todas as reprovações, confirmadas uma única vez ao final da transação
+            if rejected:
+                apply_rejections(cursor, tickets, rejected, approver_id, user, profile, rejection_reason)
+            return jsonify({"rejected": len(rejected), "results": results}), 200
+
+        return run_transaction(connection, reject_all)
+
+    except TransitionConflict as conflict:
+        return conflict_response(connection, conflict)
+    except Exception:
+        logger.exception("Erro ao reprovar chamados em lote")
         return jsonify({"error": "Erro interno no servidor"}), 500
-    finally:
-        connection.close()
@@ -1,15 +1,50 @@
 # authroutes.py
 from flask import Blueprint, jsonify, request, current_app
-from werkzeug.security import check_password_hash
 import jwt
 import datetime
-from db import create_connection
+from db import get_connection
+from utils.token import public_endpoint
+from utils.passwords import password_verifier, VerifierBusy
+from utils.rate_limit import RateLimiter
 
 # Criando o Blueprint
 login = Blueprint('login', __name__)
 
+# Limite de tentativas de login por usuário
+login_rate_limiter = RateLimiter()
+
+# Usuário, dados cadastrais, perfil e permissões das páginas
+LOGIN_QUERY = """
+SELECT
+    users.user,
+    users.password,
+    general_data.name,
+    general_data.position,
+    general_data.manager,
+    profile_config.profile,
+    profile_config.approver_id,
+    profile_config.treatment_id,
+    (SELECT group_concat(pages_roles.page_id)
+     FROM pages_roles
+     WHERE pages_roles.profile = profile_config.profile) AS page_ids
+FROM users
+LEFT JOIN general_data ON general_data.register = users.user
+LEFT JOIN profile_config ON profile_config.position = general_data.position
+WHERE users.user = ?
+"""
+
+
+# Configura o limite de tentativas a partir das configurações do app
+@login.record_once
+def configure_login(state):
+    login_rate_limiter.limit = state.app.config.get("LOGIN_RATE_LIMIT", 10)
+    login_rate_limiter.window = state.app.config.get("LOGIN_RATE_WINDOW", 60.0)
+    login_rate_limiter.max_keys = state.app.config.get("LOGIN_RATE_MAX_KEYS", 10000)
+
+
 # Endpoint para autenticar o login
 @login.route('/login', methods=['POST'])
+@public_endpoint
 def authenticate_user():
     data = request.get_json()
 
@@ -17,58 +52,56 @@ def authenticate_user():
     if not data.get('username') or not data.get('password'):
         return jsonify({"error": "Usuário e senha são obrigatórios"}), 400
 
-    connection = create_connection()
+    # Limitar as tentativas de login por usuário
+    retry_after = login_rate_limiter.hit(str(data['username']))
+    if retry_after:
+        response = jsonify({"error": "Muitas tentativas de login. Tente novamente mais tarde"})
+        response.headers["Retry-After"] = str(retry_after)
+        return response, 429
+
+    connection = get_connection()
     if not connection:
         return jsonify({"error": "Não foi possível conectar com o banco"}), 500
 
     try:
         cursor = connection.cursor()
 
-        # Consultar o usuário pelo nome de usuário
-        cursor.execute("SELECT * FROM users WHERE user = ?", (data['username'],))
+        # Recuperar usuário, dados cadastrais, perfil e permissões em uma única consulta
+        cursor.execute(LOGIN_QUERY, (data['username'],))
         user = cursor.fetchone()
 
         if not user:
             return jsonify({"error": "Usuário não encontrado"}), 404
 
-        # Verificar se a senha fornecida está correta
-        if not check_password_hash(user['password'], data['password']):
+        # Verificar se a senha fornecida está correta (fora da thread da requisição)
+        try:
+            valid_password = password_verifier.verify(user['password'], data['password'])
+        except (VerifierBusy, TimeoutError):
+            # Fila de verificação cheia ou hash demorando mais que LOGIN_HASH_TIMEOUT
+            return jsonify({"error": "Servidor ocupado. Tente novamente"}), 503
+
+        if not valid_password:
             return jsonify({"error": "Senha incorreta"}), 401
 
-        
-        # Recupera informações do usuário
-        user_info_query = "SELECT * FROM general_data WHERE register = ?"
-        cursor.execute(user_info_query, (data['username'],))
-        user_info_result = cursor.fetchone()
-        
-        # Recuperar informações de perfil, aprovação e tratamento
-        user_security_info_query = """
-        SELECT profile, approver_id, treatment_id
-        FROM profile_config
-        WHERE position =?"""
-        cursor.execute(user_security_info_query, (user_info_result['position'],))
-        user_security_info_result = cursor.fetchone()
-
-
-        # Recuperar permissões das páginas que o usuário pode acessar
-        pages_roles_query = """ SELECT page_id FROM pages_roles WHERE profile = ?"""
-        cursor.execute(pages_roles_query, (user_security_info_result['profile'],))
-        permissions = cursor.fetchall()
-        # Apenas retornar os ids das permissões
-        permission_ids = [permission['page_id'] for permission in permissions]
+        login_rate_limiter.reset(str(data['username']))
+
+        if user['position'] is None or user['profile'] is None:
+            return jsonify({"error": "Cadastro do usuário incompleto"}), 500
 
+        # Apenas retornar os ids das permissões
+        permission_ids = [int(page_id) for page_id in user['page_ids'].split(",")] if user['page_ids'] else []
 
         # Gerar token JWT
         token = jwt.encode({
             # GeneralData
             "user": user['user'],
-            "name": user_info_result['name'],
-            "position": user_info_result['position'],
-            "manager": user_info_result['manager'],
+            "name": user['name'],
+            "position": user['position'],
+            "manager": user['manager'],
             # ProfileConfig
-            "profile": user_security_info_result['profile'],
-            "approver_id": user_security_info_result['approver_id'],
-            "treatment_id": user_security_info_result['treatment_id'],
+            "profile": user['profile'],
+            "approver_id": user['approver_id'],
+            "treatment_id": user['treatment_id'],
             # IDs das páginas permitidas
             "ids": permission_ids,
             # Datas
@@ -82,5 +115,3 @@ def authenticate_user():
 
     except Exception as e:
         return jsonify({"error": f"Erro ao autenticar o usuário: {e}"}), 500
-    finally:
-        connection.close()
@@ -0,0 +1,92 @@
+import logging
+import os
+import time
+from flask import Blueprint, Response, jsonify, g
+import db
+from utils import metrics
+from utils.cache import response_cache
+from utils.events import broker
+from utils.token import public_endpoint
+
+logger = logging.getLogger(__name__)
+
+# Criando o Blueprint
+status = Blueprint('status', __name__)
+
+# Processo (worker) que atende as requisições; atualizado pelo serve.py após o fork
+worker = {"pid": os.getpid(), "index": None, "started": time.time()}
+
+
+def worker_started(index=None):
+    worker.update(pid=os.getpid(), index=index, started=time.time())
+
+
+# Endpoint para consultar as estatísticas do pool de conexões
+@status.route('/pool_stats', methods=['GET'])
+def pool_stats():
+    # Identidade autenticada da requisição
+    identity = g.identity
+
+    # Somente administradores podem consultar
+    if identity.get("profile") != "ADM":
+        return jsonify({"error": "Acesso negado"}), 403
+
+    return jsonify(db.pool.stats()), 200
+
+
+# Endpoint para consultar os assinantes e as notificações do canal /events
+@status.route('/event_stats', methods=['GET'])
+def event_stats():
+    # Somente administradores podem consultar
+    if g.identity.get("profile") != "ADM":
+        return jsonify({"error": "Acesso negado"}), 403
+
+    return jsonify(broker.stats()), 200
+
+
+# Endpoint para consultar o cache dos chamados e das filas (acertos, falhas e invalidações)
+@status.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    # Somente administradores podem consultar
+    if g.identity.get("profile") != "ADM":
+        return jsonify({"error": "Acesso negado"}), 403
+
+    return jsonify(response_cache.stats()), 200
+
+
+# Endpoint de saúde do worker (balanceador de carga e serve.py): banco acessível e estado do processo
+@status.route('/health', methods=['GET'])
+@public_endpoint
+def health():
+    report = {
+        "pid": os.getpid(),
+        "worker": worker["index"],
+        "uptime_s": round(time.time() - worker["started"], 1),
+        "pool": db.pool.stats(),
+        "write_lane": db.write_lane.stats(),
+        "event_subscribers": broker.stats()["subscribers"],
+    }
+
+    connection = db.get_connection()
+    try:
+        connection.execute("SELECT 1").fetchone()
+    except Exception as e:
+        logger.error("Erro na verificação de saúde: %s", e)
+        report["status"] = "unavailable"
+        return jsonify(report), 503
+
+    report["status"] = "ok"
+    return jsonify(report), 200
+
+
+# Endpoint de métricas no formato do Prometheus: latência das rotas, comandos SQL por rota,
+# pool de conexões, fila de escrita, assinantes do /events e cache de leitura (valores deste worker)
+@status.route('/metrics', methods=['GET'])
+@public_endpoint
+def prometheus_metrics():
+    body = metrics.registry.render()
+    body += metrics.render_gauges("servicedesk_db_pool", "Pool de conexões", db.pool.stats())
+    body += metrics.render_gauges("servicedesk_write_lane", "Fila única de escrita", db.write_lane.stats())
+    body += metrics.render_gauges("servicedesk_events", "Canal /events", broker.stats())
+    body += metrics.render_gauges("servicedesk_cache", "Cache de leitura", response_cache.stats())
+    return Response(body, content_type=metrics.CONTENT_TYPE)
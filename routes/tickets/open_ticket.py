@@ -1,10 +1,13 @@
-from flask import Blueprint, jsonify, request, current_app
-from utils.token import decode_token
-from db import create_connection
-import json
-import datetime
+import logging
+from flask import Blueprint, jsonify, request, current_app, g
+from db import get_connection, run_transaction
+from utils.catalog import catalog
+from utils import events, forms, history, search, timestamps
+from utils.workflow import engine
 
 
+logger = logging.getLogger(__name__)
+
 # Criando o Blueprint
 open_tickets = Blueprint('open_ticket', __name__)
 
@@ -12,91 +15,72 @@ open_tickets = Blueprint('open_ticket', __name__)
 # Endpoint para abrir um chamado
 @open_tickets.route('/open_ticket', methods=['POST'])
 def open_ticket():
-    # Obter o token no cabeçalho
-    token = request.headers.get("Authorization")
-    if not token:
-        return jsonify({"error": "Token não fornecido"}), 401
-
-    # Limpar o token do formato 'Bearer' e decodificar
-    token = token.replace("Bearer ", "")
-    decoded_token = decode_token(token)  # Recuperando os dados do token
-
-    if not decoded_token:
-        return jsonify({"error": "Token inválido ou expirado"}), 401
+    # Identidade autenticada da requisição
+    identity = g.identity
 
     # Recuperar informações do token
-    profile = decoded_token.get("profile")
-    user = decoded_token.get("user")
-    name = decoded_token.get("name")
-    manager = decoded_token.get("manager")
+    profile = identity.get("profile")
+    user = identity.get("user")
+    name = identity.get("name")
+    manager = identity.get("manager")
 
     # Obter dados do formulário da requisição
     data = request.get_json()
     ticket_type = data.get('ticket_type')
     submotive = data.get('submotive')
     motive_submotive = data.get('motive_submotive')
-    form = json.dumps(data.get('form'))
+    form = data.get('form')
 
     # Criar conexão com banco
-    connection = create_connection()
+    connection = get_connection()
     if not connection:
         return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
 
     try:
-        cursor = connection.cursor()
-
-        # Recupera a sequência de aprovação e tratamento do chamado
-        approval_treatment_query = """
-        SELECT approval_sequence, treatment_sequence
-        FROM ticket_types
-        WHERE profile =? AND motive_submotive =?"""
-
-        cursor.execute(approval_treatment_query, (profile, motive_submotive,))
-        approval_treatment_result = cursor.fetchone()
-        approval_sequence_str = approval_treatment_result[0]
-        approval_sequence = eval(approval_treatment_result[0])
-        treatment_sequence_str = approval_treatment_result[1]
-        treatment_sequence = eval(approval_treatment_result[1])
-
-        # Próximo aprovador
-        next_approver = approval_sequence[0]
-
-        if next_approver == 0:
-            ticket_status = "Aberto"
-            next_treatment = treatment_sequence[0]
-        else:
-            
-            # Verifica o perfil do próximo aprovador
-            profile_approver_query = """
-            SELECT profile
-            FROM profile_config
-            WHERE approver_id =?
-            """
-            cursor.execute(profile_approver_query, (next_approver,))
-            profile_approver_result = cursor.fetchone()
-            profile_approver = profile_approver_result[0]
-            ticket_status = f"Aguardando Aprovação - {profile_approver.capitalize()}"
-            next_treatment = 0
-
-
-        # Definição da data e hora de abertura do chamado
-        current_datetime = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-
-        # Inserir chamado no banco de dados
-        cursor.execute(
-            "INSERT INTO tickets (ticket_type, submotive, motive_submotive, form, user, ticket_status, ticket_open_date_time, next_approver, approval_sequence, treatment_sequence, name, manager, next_treatment) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (ticket_type, submotive, motive_submotive, form, user, ticket_status, current_datetime, next_approver, approval_sequence_str, treatment_sequence_str, name, manager, next_treatment)
-        )
-        connection.commit()
-
-        # Obter o número do chamado recém-criado
-        ticket_number = cursor.lastrowid
+        # Fluxo de aprovação e tratamento do chamado (compilado a partir de ticket_types)
+        catalog.refresh(connection, current_app.json.dumps)
+        ticket_workflow = engine.for_ticket_type(profile, motive_submotive)
+        if not ticket_workflow:
+            return jsonify({"error": "Tipo de chamado não disponível para o perfil"}), 404
+
+        (approval_sequence_str, treatment_sequence_str), compiled_workflow = ticket_workflow
+        next_approver, ticket_status, next_treatment = compiled_workflow.opening
+        if not ticket_status:
+            return jsonify({"error": "Perfil do próximo aprovador não encontrado"}), 404
+
+
+        # Definição da data e hora de abertura do chamado (texto exibido e ISO ordenável)
+        opened = timestamps.now()
+
+        # Gravação pela fila única de escrita (sem disputar o bloqueio com outros workers)
+        def insert_ticket(cursor):
+            # Formulário compacto (esquema de campos + JSON comprimido)
+            form_text, form_schema, form_data = forms.encode(cursor, form)
+
+            # Inserir chamado no banco de dados
+            cursor.execute(
+                "INSERT INTO tickets (ticket_type, submotive, motive_submotive, form_schema, form_data, user, ticket_status, ticket_open_date_time, opened_at, next_approver, approval_sequence, treatment_sequence, name, manager, next_treatment) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ticket_type, submotive, motive_submotive, form_schema, form_data, user, ticket_status, opened.display, opened.iso, next_approver, approval_sequence_str, treatment_sequence_str, name, manager, next_treatment)
+            )
+
+            # Obter o número do chamado recém-criado
+            ticket_number = cursor.lastrowid
+
+            # Formulário comprimido: as palavras entram no índice de busca nesta mesma transação
+            if form_schema is not None:
+                search.index_forms(cursor, [(ticket_number, form_text)])
+
+            # Registrar a abertura no histórico
+            history.record(cursor, [history.event(ticket_number, history.EVENT_OPEN, opened, user=user, profile=profile)])
+
+            # Notificar o primeiro aprovador (ou tratador) após o commit
+            events.stage(cursor, [ticket_number], set())
+            return ticket_number
+
+        ticket_number = run_transaction(connection, insert_ticket)
 
         return jsonify({"message": "Chamado aberto com sucesso", "ticket_number": ticket_number}), 201
 
     except Exception as e:
-        print("Erro ao abrir chamado:", e)
+        logger.exception("Erro ao abrir chamado")
         return jsonify({"error": f"Erro ao abrir chamado: {e}"}), 500
-
-    finally:
-        connection.close()
\ No newline at end of file
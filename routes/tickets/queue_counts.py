@@ -0,0 +1,32 @@
+import logging
+from flask import Blueprint, jsonify, g
+from db import get_connection
+from utils import queues
+
+logger = logging.getLogger(__name__)
+
+# Criando o Blueprint
+queue_counts = Blueprint('queue_counts', __name__)
+
+
+# Endpoint com a quantidade de chamados nas filas do usuário (indicadores do menu)
+# Lê somente os contadores mantidos pelos gatilhos, sem consultar a tabela tickets
+@queue_counts.route('/queue_counts', methods=['GET'])
+def get_queue_counts():
+    try:
+        # Identidade autenticada da requisição
+        identity = g.identity
+
+        connection = get_connection()
+        if not connection:
+            return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
+
+        cursor = connection.cursor()
+        return jsonify({
+            "pending_approvals": queues.approval_count(cursor, identity.get("approver_id"), str(identity.get("user"))),
+            "processing_tickets": queues.treatment_count(cursor, identity.get("treatment_id")),
+        }), 200
+
+    except Exception:
+        logger.exception("Erro ao buscar contadores das filas")
+        return jsonify({"error": "Erro interno no servidor"}), 500
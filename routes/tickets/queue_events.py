@@ -0,0 +1,44 @@
+from flask import Blueprint, Response, jsonify, current_app, g
+from utils.events import broker, format_event, has_queue
+from utils.token import query_token_endpoint
+
+# Criando o Blueprint
+queue_events = Blueprint('queue_events', __name__)
+
+# Intervalo de reconexão sugerido ao EventSource (ms)
+RETRY_MS = 5000
+
+
+# Canal Server-Sent Events: avisa quando um chamado entra ou sai das filas do usuário,
+# substituindo a consulta periódica de /pending_approvals e /processing_tickets
+# O EventSource do navegador não envia cabeçalhos, então o token também é aceito em ?token=
+@queue_events.route('/events', methods=['GET'])
+@query_token_endpoint
+def stream_events():
+    # Identidade autenticada da requisição
+    identity = g.identity
+
+    if not has_queue(identity):
+        return jsonify({"error": "Usuário sem fila de aprovação ou tratamento"}), 404
+
+    subscription = broker.subscribe(identity)
+    if subscription is None:
+        return jsonify({"error": "Limite de conexões atingido, tente novamente"}), 503
+
+    heartbeat = current_app.config.get("EVENTS_HEARTBEAT", 15.0)
+
+    # Não usa conexão com o banco: apenas repassa as notificações do broker
+    def generate():
+        try:
+            yield f"retry: {RETRY_MS}\n\n" + format_event({"event": "ready"})
+            while True:
+                message = subscription.get(heartbeat)
+                # Comentário periódico mantém a conexão aberta em proxies
+                yield format_event(message) if message else ": heartbeat\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
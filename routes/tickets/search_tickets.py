@@ -1,115 +1,221 @@
-from flask import Blueprint, jsonify, request, current_app
-from utils.token import decode_token
-from db import create_connection
-import json
+import logging
+from flask import Blueprint, Response, jsonify, request, current_app, g, stream_with_context
+from db import get_connection
+from utils import cache, forms, history, org, search
+from utils.json_provider import fragment
+from utils.pagination import (
+    PaginationError, keyset_order, paginate, parse_fields, parse_order, parse_page, parse_period,
+    rows_to_json, select_list, with_next_cursor,
+)
+
+logger = logging.getLogger(__name__)
 
 # Criando o Blueprint
 search_tickets = Blueprint('search_tickets', __name__)
 
+# Tipo de conteúdo da exportação em streaming
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Formulário do chamado em texto JSON (form_text só é chamado quando o campo é pedido)
+FORM_COLUMN = forms.FORM_TEXT.format(row="tickets")
+
+# Detalhamento do chamado (o formulário em texto JSON)
+DETAIL_QUERY = f"""
+SELECT ticket_number, ticket_type, submotive, {FORM_COLUMN} AS form, user, ticket_status, ticket_open_date_time, version
+FROM tickets
+WHERE ticket_number = ?
+"""
+
+# Campos disponíveis na listagem de chamados (campo da resposta -> coluna)
+LIST_COLUMNS = {
+    "ticket_number": "ticket_number",
+    "ticket_type": "tickets.ticket_type",
+    "submotive": "tickets.submotive",
+    "form": forms.FORM_JSON.format(row="tickets"),
+    "user": "tickets.user",
+    "name": "tickets.name",
+    "opened_at": "tickets.opened_at",
+    "closed_at": "tickets.closed_at",
+}
+
+
+# Filtro de visibilidade dos chamados de acordo com o perfil
+def visibility_filter(identity, cursor):
+    profile = identity.get("profile")
+
+    # Gerente: subordinados em qualquer nível da hierarquia e os próprios chamados
+    if profile == "GERENTE":
+        return org.reports_filter(cursor, identity.get("user"))
+
+    if profile in ("FIELDSERVICE", "ADM"):
+        return None, []
+
+    # Para usuário normal
+    return "user = ?", [identity.get("user")]
+
+
+# Consulta da listagem: visibilidade do perfil, período, termo de busca, ordenação e início da página
+# Retorna também a função que extrai o cursor de uma linha (a ordenação muda quando há busca ou ?order=)
+def listing_query(identity, cursor, fields, search_query, after=None, period=None, order=None):
+    # Consultas SQL baseadas no perfil
+    conditions = []
+    visibility, params = visibility_filter(identity, cursor)
+    if visibility:
+        conditions.append(visibility)
+
+    # Filtros de período sobre as colunas ISO indexadas
+    if period:
+        conditions.extend(period[0])
+        params.extend(period[1])
+
+    match = search.match_query(search_query) if search_query else None
+    ranked = match is not None and not search_query.isdigit() and order is None
+
+    if ranked:
+        # Busca por texto: resultados ordenados por relevância (bm25)
+        sql_query = f"""SELECT {select_list(LIST_COLUMNS, fields)}, tickets_fts.rank AS search_rank
+            FROM tickets JOIN tickets_fts ON tickets_fts.rowid = tickets.ticket_number"""
+        conditions.insert(0, "tickets_fts MATCH ?")
+        params.insert(0, match)
+        if after:
+            conditions.append("(tickets_fts.rank > ? OR (tickets_fts.rank = ? AND ticket_number > ?))")
+            params.extend([after[0], after[0], after[1]])
+        order_by = "tickets_fts.rank, ticket_number"
+        cursor_values = lambda row: [row["search_rank"], row[0]]
+    else:
+        if match and search_query.isdigit():
+            # Termo numérico: número do chamado ou texto indexado
+            conditions.append("(ticket_number = ? OR ticket_number IN (SELECT rowid FROM tickets_fts WHERE tickets_fts MATCH ?))")
+            params.extend([int(search_query), match])
+        elif match:
+            # Busca por texto com ordenação por data
+            conditions.append("ticket_number IN (SELECT rowid FROM tickets_fts WHERE tickets_fts MATCH ?)")
+            params.append(match)
+
+        # Ordem por ticket_number ou, com ?order=, por data de abertura/encerramento
+        order_key, keyset_conditions, keyset_params, order_by, cursor_values = keyset_order(order, after)
+        sql_query = f"SELECT {select_list(LIST_COLUMNS, fields)}{order_key} FROM tickets"
+        conditions.extend(keyset_conditions)
+        params.extend(keyset_params)
+
+    if conditions:
+        sql_query += " WHERE " + " AND ".join(conditions)
+    sql_query += f" ORDER BY {order_by}"
+    return sql_query, params, cursor_values
+
+
 # Endpoint para listar todos os chamados abertos
 @search_tickets.route('/list_tickets', methods=['GET'])
 def list_tickets():
-    try:
-        # Obter o token no cabeçalho
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"error": "Token não fornecido"}), 401
+    # Clientes que pedem NDJSON recebem a exportação em streaming
+    if request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        return export_tickets()
 
-        # Limpar o token do formato 'Bearer' e decodificar
-        token = token.replace("Bearer ", "")
-        decoded_token = decode_token(token)  # Recuperando os dados do token
+    try:
+        # Identidade autenticada da requisição
+        identity = g.identity
 
-        if not decoded_token:
-            return jsonify({"error": "Token inválido ou expirado"}), 401
+        # Paginação (keyset), projeção de campos, período e ordenação
+        try:
+            fields = parse_fields(LIST_COLUMNS)
+            limit, after = parse_page()
+            period = parse_period()
+            order = parse_order()
+        except PaginationError as e:
+            return jsonify({"error": str(e)}), 400
 
-        # Recuperar informações do token
-        user = decoded_token.get("user")
-        name = decoded_token.get("name")
-        profile = decoded_token.get("profile")  # Obter o perfil (campo no token)
-        
-        connection = create_connection()
+        connection = get_connection()
         if not connection:
             return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
 
         # Obter o termo de busca (query string)
         search_query = request.args.get("search", "").strip()
 
-        # Consultas SQL baseadas no perfil
-        if profile == "GERENTE":
-            sql_query = """
-                SELECT ticket_number, ticket_type, submotive, form, user, name
-                FROM tickets
-                WHERE (
-                    user IN (
-                        SELECT register FROM general_data WHERE manager = ?
-                    ) OR user = ?
-                )
-            """
-            params = [name, user]
-
-        elif profile in ("FIELDSERVICE", "ADM"):
-            sql_query = "SELECT ticket_number, ticket_type, submotive, form, user, name FROM tickets"
-            params = []  # Campo de busca para FIELD
-
-        else:  # Para usuário normal
-            sql_query = "SELECT ticket_number, ticket_type, submotive, form, user, name FROM tickets WHERE user = ?"
-            params = [user]
-
-        # Adicionar a pesquisa se fornecida
-        if search_query:
-            search_clause = " AND " if "WHERE" in sql_query else " WHERE "
-            search_filter = "(ticket_number = ? OR ticket_type LIKE ? OR submotive LIKE ?)"
-            sql_query += search_clause + search_filter
-            params.extend([search_query, f"%{search_query}%", f"%{search_query}%"])
-
         cursor = connection.cursor()
+        try:
+            sql_query, params, cursor_values = listing_query(identity, cursor, fields, search_query, after, period, order)
+        except PaginationError as e:
+            return jsonify({"error": str(e)}), 400
+        sql_query += " LIMIT ?"
+        params.append(limit + 1)
+
         cursor.execute(sql_query, params)
 
-        tickets = cursor.fetchall()
+        tickets, next_cursor = paginate(cursor.fetchall(), limit, cursor_values)
 
         # Verificar se há tickets retornados
         if not tickets:
             return jsonify({"error": "Nenhum ticket encontrado"}), 404
 
         # Retornar os tickets
-        return jsonify([{
-            "ticket_number": ticket[0],
-            "ticket_type": ticket[1],
-            "submotive": ticket[2],
-            "form": json.loads(ticket[3]) if ticket[3] else {},
-            "user": ticket[4],
-            "name": ticket[5],
-
-        } for ticket in tickets]), 200
+        return with_next_cursor(jsonify(rows_to_json(tickets)), next_cursor), 200
 
     except Exception as e:
         return jsonify({"error": f"Erro interno no servidor: {str(e)}"}), 500
-    finally:
-        connection.close()
+
+
+# Endpoint para exportar os chamados visíveis em NDJSON (uma linha JSON por chamado)
+@search_tickets.route('/tickets/export', methods=['GET'])
+def export_tickets():
+    # Identidade autenticada da requisição
+    identity = g.identity
+
+    try:
+        fields = parse_fields(LIST_COLUMNS)
+        period = parse_period()
+        order = parse_order()
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    connection = get_connection()
+    if not connection:
+        return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
+
+    search_query = request.args.get("search", "").strip()
+    sql_query, params, _ = listing_query(identity, connection.cursor(), fields, search_query, period=period, order=order)
+    chunk_size = current_app.config.get("EXPORT_CHUNK_SIZE", 500)
+
+    # Lê os chamados em blocos e envia cada bloco à medida que é lido (linhas já em JSON, select_list)
+    def generate():
+        cursor = connection.cursor()
+        cursor.execute(sql_query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield "".join(row[1] + "\n" for row in rows)
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+# Linha do detalhamento, do cache quando o chamado não mudou desde a última leitura
+def detail_row(cursor, ticket_number):
+    key = cache.ticket_key(ticket_number)
+    ticket = cache.response_cache.get(cache.KIND_TICKET, key)
+    if ticket is not None:
+        return ticket
+
+    started = cache.response_cache.begin()
+    cursor.execute(DETAIL_QUERY, (ticket_number,))
+    ticket = cursor.fetchone()
+    if ticket:
+        ticket = tuple(ticket)
+        cache.response_cache.put(key, ticket, started)
+    return ticket
 
 
 # Endpoint para detalhemento do ticket
 @search_tickets.route('/ticket_detail/<int:ticket_number>', methods=['GET'])
 def ticket_detail(ticket_number):
     try:
-        # Obter o token no cabeçalho
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"error": "Token não fornecido"}), 401
-
-        # Limpar o token do formato 'Bearer' e decodificar
-        token = token.replace("Bearer ", "")
-        decoded_token = decode_token(token)  # Recuperando os dados do token
-
-        if not decoded_token:
-            return jsonify({"error": "Token inválido ou expirado"}), 401
+        # Identidade autenticada da requisição
+        identity = g.identity
 
         # Recuperar informações do token
-        user = decoded_token.get("user")
-        name = decoded_token.get("name")
-        profile = decoded_token.get("profile")  # Obter o perfil (campo no token)
+        user = identity.get("user")
+        profile = identity.get("profile")  # Obter o perfil (campo no token)
 
-        connection = create_connection()
+        connection = get_connection()
         if not connection:
             return jsonify({"error": "Erro ao conectar com o banco"}), 500
 
@@ -118,37 +224,23 @@ def ticket_detail(ticket_number):
 
         # Se o perfil for GERENTE ou FIELD, podemos acessar qualquer chamado
         if profile == "GERENTE":
-            cursor.execute("""
-                SELECT ticket_number, ticket_type, submotive, form, user, ticket_status, ticket_open_date_time
-                FROM tickets 
-                WHERE ticket_number = ?
-            """, (ticket_number,))
-        elif profile == "FIELDSERVICE" or "ADM":
-            cursor.execute("""
-                SELECT ticket_number, ticket_type, submotive, form, user, ticket_status, ticket_open_date_time
-                FROM tickets 
-                WHERE ticket_number = ?
-            """, (ticket_number,))
+            ticket = detail_row(cursor, ticket_number)
+        elif profile in ("FIELDSERVICE", "ADM"):
+            ticket = detail_row(cursor, ticket_number)
         else:
             # Para o usuário normal, só poderá acessar o próprio ticket
-            cursor.execute("""
-                SELECT ticket_number, ticket_type, submotive, form, user, ticket_status, ticket_open_date_time
+            cursor.execute(f"""
+                SELECT ticket_number, ticket_type, submotive, {FORM_COLUMN} AS form, user, ticket_status, ticket_open_date_time, version
                 FROM tickets 
                 WHERE ticket_number = ? AND user = ?
             """, (ticket_number, user))
-
-        ticket = cursor.fetchone()
+            ticket = cursor.fetchone()
 
         if not ticket:
             return jsonify({"error": "Chamado não encontrado ou acesso negado"}), 404
 
-        # Verificar se o campo 'form' não está vazio antes de tentar carregar como JSON
-        form_data = None
-        if ticket[3]:  # Verifica se 'form' tem algum valor
-            try:
-                form_data = json.loads(ticket[3])  # Tenta converter o valor em JSON
-            except json.JSONDecodeError:
-                form_data = None  # Caso o valor não seja um JSON válido
+        # Formulário em texto JSON, copiado para a resposta sem ser decodificado
+        form_data = fragment(ticket[3]) if ticket[3] else None
 
         # Retornar os detalhes
         ticket_data = {
@@ -158,13 +250,17 @@ def ticket_detail(ticket_number):
             "form": form_data,
             "user": ticket[4],
             "ticket_status": ticket[5],
-            "ticket_open_date_time": ticket[6]
+            "ticket_open_date_time": ticket[6],
+            "version": ticket[7]
         }
+
+        # Observações do tratamento montadas a partir do histórico somente quando pedidas (?include=observations)
+        include = request.args.get("include", "").split(",")
+        if "observations" in include:
+            ticket_data["treatment_observation"] = history.observation_text(cursor, ticket_number)
+
         return jsonify(ticket_data), 200
-    except Exception as e:
-        print("Erro ao buscar detalhes do chamado:", e)
+    except Exception:
+        logger.exception("Erro ao buscar detalhes do chamado")
         return jsonify({"error": "Erro interno no servidor"}), 500
-    finally:
-        if connection:
-            connection.close()
 
@@ -0,0 +1,79 @@
+import logging
+from flask import Blueprint, jsonify, g
+from db import get_connection
+from routes.tickets.search_tickets import visibility_filter
+from utils.pagination import PaginationError, paginate, parse_fields, parse_page, rows_to_json, select_list, with_next_cursor
+
+logger = logging.getLogger(__name__)
+
+# Criando o Blueprint
+ticket_history = Blueprint('ticket_history', __name__)
+
+
+# Campos disponíveis no histórico do chamado (campo da resposta -> coluna)
+HISTORY_COLUMNS = {
+    "id": "id",
+    "event_type": "event_type",
+    "actor_id": "actor_id",
+    "user": "user",
+    "profile": "profile",
+    "message": "message",
+    "created": "created",
+    "created_at": "created_at",
+}
+
+
+# Chamado visível para o perfil: o histórico segue a mesma visibilidade da listagem de chamados
+def ticket_query(identity, cursor):
+    visibility, params = visibility_filter(identity, cursor)
+    sql_query = "SELECT ticket_number FROM tickets WHERE ticket_number = ?"
+    if visibility:
+        sql_query += f" AND {visibility}"
+    return sql_query, params
+
+
+# Eventos do chamado a partir do último id da página anterior
+def history_query(fields):
+    return f"""
+        SELECT {select_list(HISTORY_COLUMNS, fields, key="id")}
+        FROM ticket_events
+        WHERE ticket_number = ? AND id > ?
+        ORDER BY id
+        LIMIT ?
+    """
+
+
+# Endpoint para listar o histórico (eventos) de um chamado, do mais antigo para o mais recente
+@ticket_history.route('/ticket_history/<int:ticket_number>', methods=['GET'])
+def get_ticket_history(ticket_number):
+    try:
+        # Identidade autenticada da requisição
+        identity = g.identity
+
+        # Paginação (keyset pelo id do evento) e projeção de campos
+        try:
+            fields = parse_fields(HISTORY_COLUMNS)
+            limit, after = parse_page()
+        except PaginationError as e:
+            return jsonify({"error": str(e)}), 400
+
+        connection = get_connection()
+        if not connection:
+            return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
+
+        cursor = connection.cursor()
+
+        # O histórico segue a mesma visibilidade da listagem de chamados
+        sql_query, params = ticket_query(identity, cursor)
+        cursor.execute(sql_query, [ticket_number] + params)
+        if not cursor.fetchone():
+            return jsonify({"error": "Chamado não encontrado ou acesso negado"}), 404
+
+        cursor.execute(history_query(fields), (ticket_number, after[0] if after else 0, limit + 1))
+        events, next_cursor = paginate(cursor.fetchall(), limit)
+
+        return with_next_cursor(jsonify(rows_to_json(events)), next_cursor), 200
+
+    except Exception:
+        logger.exception("Erro ao buscar histórico do chamado")
+        return jsonify({"error": "Erro interno no servidor"}), 500
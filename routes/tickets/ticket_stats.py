@@ -0,0 +1,67 @@
+import datetime
+import logging
+from flask import Blueprint, jsonify, request, current_app, g
+from db import get_connection
+from utils import analytics, timestamps
+
+logger = logging.getLogger(__name__)
+
+# Criando o Blueprint
+ticket_stats = Blueprint('ticket_stats', __name__)
+
+# Perfis com acesso ao painel
+STATS_PROFILES = ("ADM", "GERENTE")
+
+
+# Período da série diária: ?from=2025-01-01&to=2025-01-31 (padrão: últimos STATS_DAYS_DEFAULT dias)
+def parse_days():
+    day_to = request.args.get("to")
+    day_to = timestamps.parse_bound(day_to)[:10] if day_to else datetime.date.today().isoformat()
+    day_from = request.args.get("from")
+    if day_from:
+        day_from = timestamps.parse_bound(day_from)[:10]
+    else:
+        days = current_app.config.get("STATS_DAYS_DEFAULT", 30)
+        day_from = (datetime.date.fromisoformat(day_to) - datetime.timedelta(days=days - 1)).isoformat()
+    if day_from > day_to:
+        raise ValueError("Período inválido: from posterior a to")
+    return day_from, day_to
+
+
+# Endpoint do painel: status, filas, tempos de ciclo (mediana/p90) e abertos/encerrados por dia
+# Lê somente os agregados mantidos pelos gatilhos (custo proporcional às faixas, não aos chamados)
+@ticket_stats.route('/stats', methods=['GET'])
+def get_stats():
+    try:
+        # Identidade autenticada da requisição
+        identity = g.identity
+        if identity.get("profile") not in STATS_PROFILES:
+            return jsonify({"error": "Acesso negado"}), 403
+
+        try:
+            day_from, day_to = parse_days()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Filtro opcional por tipo de chamado (ex.: ?motive_submotive=Hardware/Manutenção)
+        motive_submotive = request.args.get("motive_submotive") or None
+
+        connection = get_connection()
+        if not connection:
+            return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
+
+        cursor = connection.cursor()
+        return jsonify({
+            "status_counts": analytics.status_counts(cursor, motive_submotive),
+            "backlog": analytics.backlog(cursor),
+            "cycle_times": analytics.cycle_times(cursor, motive_submotive),
+            "daily": {
+                "from": day_from,
+                "to": day_to,
+                "series": analytics.daily(cursor, day_from, day_to, motive_submotive),
+            },
+        }), 200
+
+    except Exception:
+        logger.exception("Erro ao buscar estatísticas dos chamados")
+        return jsonify({"error": "Erro interno no servidor"}), 500
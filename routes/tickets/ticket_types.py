@@ -1,7 +1,9 @@
-from flask import Blueprint, jsonify, request, current_app
-from utils.token import decode_token
-from db import create_connection
-import json
+import logging
+from flask import Blueprint, jsonify, current_app, g
+from db import get_connection
+from utils.catalog import catalog
+
+logger = logging.getLogger(__name__)
 
 # Criando o Blueprint
 ticket_types = Blueprint('ticket_types', __name__)
@@ -9,67 +11,46 @@ ticket_types = Blueprint('ticket_types', __name__)
 # Endpoint para retornar os chamados disponíveis
 @ticket_types.route('/ticket_types', methods=['GET'])
 def get_ticket_type():
-    # Obter o token no cabeçalho
-    token = request.headers.get("Authorization")
-    if not token:
-        print("Nenhum token no cabeçalho")
-        return jsonify({"error": "Token não fornecido"}), 401
-
-    # Limpar o token do formato 'Bearer' e decodificar
-    token = token.replace("Bearer ", "")
-    decoded_token = decode_token(token)  # Recuperando os dados do token
-
-    if not decoded_token or not isinstance(decoded_token, dict):
-        print("Erro ao validar token ou formato inválido")
-        return jsonify({"error": "Token inválido ou expirado"}), 401
+    # Identidade autenticada da requisição
+    identity = g.identity
 
     # Recuperar informações do token
-    profile = decoded_token.get("profile")
+    profile = identity.get("profile")
 
     # Criar conexão com o banco
-    connection = create_connection()
+    connection = get_connection()
     if not connection:
-        print("Falha ao conectar com o banco")
+        logger.error("Falha ao conectar com o banco")
         return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
 
     try:
-        # Criação do cursor
-        cursor = connection.cursor()
-        
-        
-        # Chamados disponíveis para esse perfil
-        ticket_types_query = """
-        SELECT ticket_type, submotive, motive_submotive, form
-        FROM ticket_types
-        WHERE profile = ?
-        """
-        # Execução da consulta
-        cursor.execute(ticket_types_query, (profile,))
-        ticket_types_result = cursor.fetchall()
+        # Chamados disponíveis para esse perfil (catálogo em cache, já serializado)
+        catalog.refresh(connection, current_app.json.dumps)
+        return catalog.ticket_types(profile).response()
 
-        # Processar dados retornados
-        returned_data = []
-        for ticket in ticket_types_result:
-            try:
-                # Carregar o JSON do campo "form", se existir
-                form_data = json.loads(ticket[3]) if ticket[3] else {}
-            except json.JSONDecodeError as e:
-                print("Erro ao processar JSON:", e)
-                form_data = {}
+    except Exception:
+        logger.exception("Erro ao buscar chamados")
+        return jsonify({"error": "Erro ao buscar dados dos chamados"}), 500
 
-            returned_data.append({
-                "ticket_type": ticket[0],
-                "submotive": ticket[1],
-                "motive_submotive": ticket[2],
-                "form": form_data
-            })
 
-        return jsonify(returned_data), 200
+# Endpoint para recarregar o catálogo após alterações feitas diretamente no banco
+@ticket_types.route('/catalog/reload', methods=['POST'])
+def reload_catalog():
+    # Identidade autenticada da requisição
+    identity = g.identity
 
-    except Exception as e:
-        print("Erro ao buscar chamados:", e)
-        return jsonify({"error": "Erro ao buscar dados dos chamados"}), 500
+    # Somente administradores podem recarregar
+    if identity.get("profile") != "ADM":
+        return jsonify({"error": "Acesso negado"}), 403
+
+    connection = get_connection()
+    if not connection:
+        return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
+
+    try:
+        catalog.load(connection, current_app.json.dumps)
+        return jsonify({"message": "Catálogo recarregado com sucesso", "version": catalog.version}), 200
 
-    finally:
-        connection.close()
-        print("Conexão com banco fechada")
+    except Exception:
+        logger.exception("Erro ao recarregar o catálogo")
+        return jsonify({"error": "Erro ao recarregar o catálogo"}), 500
@@ -1,8 +1,12 @@
-from flask import Blueprint, jsonify, request
-from utils.token import decode_token
-from db import create_connection
-import datetime
-import json
+import logging
+from flask import Blueprint, jsonify, request, current_app, g
+from db import get_connection, run_transaction
+from utils.token import public_endpoint
+from utils.catalog import catalog
+from utils import events, history, timestamps
+from utils.workflow import TransitionConflict, Workflow, check_swapped, check_version, conflict_response
+
+logger = logging.getLogger(__name__)
 
 # Criando o Blueprint
 cancel = Blueprint('cancel', __name__)
@@ -10,29 +14,18 @@ cancel = Blueprint('cancel', __name__)
 
 # Endpoint para listar os motivos de reprovação
 @cancel.route('/get_cancel_reasons', methods=['GET'])
+@public_endpoint
 def get_cancel_reasons():
     try:
-        connection = create_connection()
-        cursor = connection.cursor()
-
-        # Buscar todos os motivos de reprovação
-        cursor.execute("SELECT cancel_reasons FROM cancellation_reasons")
-        reasons = cursor.fetchall()
-
-        # Se não houver motivos cadastrados
-        if not reasons:
-            return jsonify({"error": "Nenhum motivo de cancelamento encontrado"}), 404
+        connection = get_connection()
 
-        # Montar a lista de motivos com apenas o campo 'reason'
-        cancellation_reasons = [reason[0] for reason in reasons]
+        # Motivos em cache, já serializados (recarregados quando a tabela muda)
+        catalog.refresh(connection, current_app.json.dumps)
+        return catalog.cancel_reasons().response()
 
-        return jsonify({"cancel_reasons": cancellation_reasons}), 200
-
-    except Exception as e:
-        print(f"Erro ao buscar motivos de reprovação: {e}")
+    except Exception:
+        logger.exception("Erro ao buscar motivos de reprovação")
         return jsonify({"error": "Erro interno no servidor"}), 500
-    finally:
-        connection.close()
 
 
 
@@ -41,90 +34,88 @@ def get_cancel_reasons():
 # Endpoint para reprovar um chamado
 @cancel.route('/cancel_ticket/<int:ticket_number>', methods=['POST'])
 def cancel_ticket(ticket_number):
+    connection = None
     try:
-        connection = create_connection()
-        cursor = connection.cursor()
+        connection = get_connection()
         
-        # Obter o token do cabeçalho
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"error": "Token não fornecido"}), 401
-
-        token = token.replace("Bearer ", "")
-        decoded_token = decode_token(token)
-
-        if not decoded_token:
-            return jsonify({"error": "Token inválido ou expirado"}), 401
+        # Identidade autenticada da requisição
+        identity = g.identity
         # Recuperar informações do token
-        treatment_id = decoded_token.get("treatment_id")
-        user = decoded_token.get("user")
-        profile = decoded_token.get("profile")
+        treatment_id = identity.get("treatment_id")
+        user = identity.get("user")
+        profile = identity.get("profile")
         
         if not treatment_id:
             return jsonify({"error": "Perfil do tratador não encontrado"}), 404
-        print("Tratador atual:", treatment_id)
+        logger.debug("Tratador atual: %s", treatment_id)
 
 
         # Obter dados do formulário de tratamento
         data = request.get_json()
         cancel_reason = data.get('cancelReason')
+        expected_version = data.get('version')
 
         if not cancel_reason:
             return jsonify({"error": "Motivo de cancelamento obrigatório"}), 400
 
 
-        # Pesquisa inicial na tabela tickets
-        ticket_status_query = """
-        SELECT next_treatment, treatment_observation
-        FROM tickets
-        WHERE ticket_number = ?
-        """
-        cursor.execute(ticket_status_query, (ticket_number,))
-        ticket_status_result = cursor.fetchone()
-
-        if not ticket_status_result:
-            return jsonify({"error": "Chamado não encontrado"}), 404
-
-
-        next_treatment = ticket_status_result[0]
-        print("Próximo:", next_treatment)
-        
-
-        # Verificar se o tratador atual está na sequência
-        if treatment_id != next_treatment:
-            return jsonify({"error": "Tratador atual não não é o da sequência"}), 400
-
-
-        # Definir status do chamado como concluído
-        current_date_time = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        ticket_status = "Cancelado"
-        close_date_time = current_date_time
-
-        # Ajustando as observações
-        old_observation = ticket_status_result[1]
-        if old_observation is None:
-            old_observation = ""
-        new_observation_entry = f"[{current_date_time}] Tratador {treatment_id} {user} {profile}: {cancel_reason}"
-        updated_observation = f"{old_observation}\n{new_observation_entry}".strip()
-
-
-        update_ticket_info = """
-        UPDATE tickets
-        SET ticket_status = ?,
-            next_treatment =?,
-            close_date_time =?,
-            treatment_observation =?,
-            cancellation_reason =?
-        WHERE ticket_number = ?
-        """
-        cursor.execute(update_ticket_info, (ticket_status, 0, close_date_time, updated_observation, cancel_reason, ticket_number))
-
-        # Confirmar transação
-        connection.commit()
-        return {"success": True, "message": "Cancelamento processado com sucesso!"}
-
-    except Exception as e:
-        print(f"Erro ao cancelar o chamado: {e}")
+        # Leitura, validação e gravação sob o mesmo bloqueio de escrita
+        def cancel_one(cursor):
+            # Pesquisa inicial na tabela tickets
+            ticket_status_query = """
+            SELECT ticket_number, next_treatment, version
+            FROM tickets
+            WHERE ticket_number = ?
+            """
+            cursor.execute(ticket_status_query, (ticket_number,))
+            ticket = cursor.fetchone()
+
+            if not ticket:
+                return jsonify({"error": "Chamado não encontrado"}), 404
+            check_version(ticket, expected_version)
+
+            next_treatment = ticket["next_treatment"]
+            logger.debug("Próximo tratador: %s", next_treatment)
+
+
+            # Verificar se o tratador atual está na sequência (o chamado pode ter sido concluído ou cancelado)
+            if treatment_id != next_treatment:
+                raise TransitionConflict(ticket_number, "Tratador atual não é o da sequência")
+
+
+            # Definir status do chamado como cancelado (encerra o fluxo)
+            _, ticket_status, next_treatment = Workflow.cancel()
+            closed = timestamps.now()
+            queues_before = events.snapshot(cursor, [ticket_number])
+
+            # Cancelar somente se o chamado não mudou desde a leitura (compare-and-swap pela versão)
+            update_ticket_info = """
+            UPDATE tickets
+            SET ticket_status = ?,
+                next_treatment =?,
+                close_date_time =?,
+                closed_at =?,
+                cancellation_reason =?,
+                version = version + 1
+            WHERE ticket_number = ? AND version = ?
+            """
+            cursor.execute(update_ticket_info, (ticket_status, next_treatment, closed.display, closed.iso, cancel_reason, ticket_number, ticket["version"]))
+            check_swapped(cursor, ticket_number)
+
+            # O motivo do cancelamento é acrescentado ao histórico
+            history.record(cursor, [
+                history.event(ticket_number, history.EVENT_CANCEL, closed, actor_id=treatment_id, user=user, profile=profile, message=cancel_reason)
+            ])
+
+            # O chamado cancelado sai da fila do tratador (notificação após o commit)
+            events.stage(cursor, [ticket_number], queues_before)
+            return {"success": True, "message": "Cancelamento processado com sucesso!", "version": ticket["version"] + 1}
+
+        # Transação confirmada ao final
+        return run_transaction(connection, cancel_one)
+
+    except TransitionConflict as conflict:
+        return conflict_response(connection, conflict)
+    except Exception:
+        logger.exception("Erro ao cancelar o chamado")
         return jsonify({"error": "Erro interno no servidor"}), 500
-    finally:
-        connection.close()
@@ -1,84 +1,104 @@
-from flask import Blueprint, jsonify, request, current_app
-from utils.token import decode_token
-from db import create_connection
-import json
+import logging
+from flask import Blueprint, jsonify, g
+from db import get_connection
+from utils import cache, forms
+from utils.queues import QUEUE_TREATMENT
+from utils.pagination import (
+    PaginationError, keyset_order, paginate, parse_fields, parse_order, parse_page, parse_period,
+    rows_to_json, select_list, with_next_cursor,
+)
+
+logger = logging.getLogger(__name__)
 
 # Criando o Blueprint
 processing = Blueprint('processing', __name__)
 
 
 
+# Campos disponíveis na fila de tratamento (campo da resposta -> coluna)
+PROCESSING_COLUMNS = {
+    "ticket": "tickets.ticket_number",
+    "motive_submotive": "tickets.motive_submotive",
+    "form": forms.FORM_JSON.format(row="tickets"),
+    "user": "tickets.user",
+    "name": "tickets.name",
+    "manager": "tickets.manager",
+    "ticket_open_date_time": "tickets.ticket_open_date_time",
+    "ticket_status": "tickets.ticket_status",
+}
+
+# Chave da paginação: a fila materializada já está ordenada por tratador e número do chamado
+QUEUE_KEY = "treatment_queue.ticket_number"
+
+
+# Consulta da fila de tratamento do tratador: período, ordenação e início da página
+# Retorna também a função que extrai o cursor de uma linha
+def processing_query(treatment_id, fields, period, order=None, after=None):
+    order_key, keyset_conditions, keyset_params, order_by, cursor_values = keyset_order(order, after, key=QUEUE_KEY)
+    conditions = ["treatment_queue.treatment_id = ?"] + period[0] + keyset_conditions
+    params = [treatment_id] + period[1] + keyset_params
+
+    sql_query = f"""
+        SELECT {select_list(PROCESSING_COLUMNS, fields, key=QUEUE_KEY)}{order_key}
+        FROM
+            treatment_queue
+            JOIN tickets ON tickets.ticket_number = treatment_queue.ticket_number
+        WHERE
+            {" AND ".join(conditions)}
+        ORDER BY {order_by}
+        """
+    return sql_query, params, cursor_values
+
+
 # Endpoint para listar os chamados na fila de tratamento
 @processing.route('/processing_tickets', methods=['GET'])
 def list_processing_tickets():
     try:
-        # Obter o token no cabeçalho
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"error": "Token não fornecido"}), 401
+        # Identidade autenticada da requisição
+        identity = g.identity
 
-        # Limpar o token do formato 'Bearer' e decodificar
-        token = token.replace("Bearer ", "")
-        decoded_token = decode_token(token)
+        # Recuperar informações do token
+        treatment_id = identity.get("treatment_id")
+        logger.debug("Tratador atual: %s", treatment_id)
 
-        if not decoded_token:
-            return jsonify({"error": "Token inválido ou expirado"}), 401
+        # Paginação (keyset), projeção de campos, período e ordenação
+        try:
+            fields = parse_fields(PROCESSING_COLUMNS)
+            limit, after = parse_page()
+            period = parse_period()
+            order = parse_order()
+            sql_query, params, cursor_values = processing_query(treatment_id, fields, period, order, after)
+        except PaginationError as e:
+            return jsonify({"error": str(e)}), 400
 
-        # Recuperar informações do token
-        treatment_id = decoded_token.get("treatment_id")
-        print(treatment_id)
+        # Primeira página já servida e ainda válida (invalidada quando um chamado entra ou sai da fila)
+        cache_key = cache.queue_key(QUEUE_TREATMENT, treatment_id)
+        page = cache.cached_page(cache_key)
+        if page:
+            return cache.page_response(page)
+        started = cache.response_cache.begin()
         
-        connection = create_connection()
+        connection = get_connection()
         if not connection:
             return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
         
         cursor = connection.cursor()
 
         # Trazer somente os chamados estão abertos ou aprovados com o meu ID de tratamento
+        # (fila mantida por gatilhos)
         # Já ajustar um form para o tratamento em ticket_types
 
-        processing_query = """
-            SELECT
-                ticket_number,
-                motive_submotive,
-                form, 
-                user,
-                name,
-                manager,
-                ticket_open_date_time,
-                ticket_status
-            FROM
-                tickets
-            WHERE
-                next_treatment = ?
-            """
-        cursor.execute(processing_query, (treatment_id,))
-        processing_result = cursor.fetchall()
-
-        ticket_data_list = []
-
-        # Iterando sobre os resultados de approval_tickets
-        for ticket in processing_result:
-            ticket_data = {
-                "ticket": ticket[0],
-                "motive_submotive": ticket[1],
-                "form": json.loads(ticket[2]) if ticket[2] else {},
-                "user": ticket[3],
-                "name": ticket[4],
-                "manager": ticket[5],
-                "ticket_open_date_time": ticket[6],
-                "ticket_status": ticket[7],
-            }
-            ticket_data_list.append(ticket_data)  # Adiciona o dicionário à lista
-
-        # Retornar todos os tickets como resposta JSON
-        return jsonify(ticket_data_list), 200
+        cursor.execute(sql_query + " LIMIT ?", params + [limit + 1])
+        processing_result, next_cursor = paginate(cursor.fetchall(), limit, cursor_values)
+
+        # Retornar os tickets da página como resposta JSON
+        response = jsonify(rows_to_json(processing_result))
+        cache.store_page(cache_key, started, response, 200, next_cursor)
+        return with_next_cursor(response, next_cursor), 200
     
-    except Exception as e:
-        print("Erro ao buscar detalhes do chamado:", e)
+    except Exception:
+        logger.exception("Erro ao buscar detalhes do chamado")
         return jsonify({"error": "Erro interno no servidor"}), 500
-    finally:
-        connection.close()
 
 
 
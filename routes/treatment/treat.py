@@ -1,111 +1,196 @@
-from flask import Blueprint, jsonify, request
-from utils.token import decode_token
-from db import create_connection
-import json
-import datetime
+import logging
+from flask import Blueprint, jsonify, request, current_app, g
+from db import get_connection, run_transaction
+from utils.bulk import BulkError, failure, parse_ticket_numbers, success, ticket_numbers_param
+from utils.catalog import catalog
+from utils import events, history, timestamps
+from utils.workflow import STATUS_DONE, TransitionConflict, check_swapped, check_version, conflict_response, engine
+
+logger = logging.getLogger(__name__)
 
 # Criando o Blueprint
 treat = Blueprint('treat', __name__)
 
 
+# Situação atual dos chamados a tratar
+treatment_tickets_query = """
+SELECT ticket_number, ticket_status, next_treatment, approval_sequence, treatment_sequence, version
+FROM tickets
+WHERE ticket_number IN (SELECT value FROM json_each(?))
+"""
+
+update_ticket_info = """
+UPDATE tickets
+SET ticket_status = ?,
+    next_treatment =?,
+    close_date_time =?,
+    closed_at =?,
+    version = version + 1
+WHERE ticket_number = ? AND version = ?
+"""
+
+
+# Busca os chamados a tratar indexados pelo número
+def find_treatment_tickets(cursor, ticket_numbers):
+    cursor.execute(treatment_tickets_query, (ticket_numbers_param(ticket_numbers),))
+    return {ticket["ticket_number"]: ticket for ticket in cursor.fetchall()}
+
+
+# Determina o próximo passo do tratamento de um chamado (None se o tratador não está na sequência)
+# Levanta TransitionConflict se o chamado não está na vez deste tratador (ex.: já cancelado ou concluído)
+def plan_treatment(ticket, treatment_id):
+    ticket_workflow = engine.for_sequences(ticket["approval_sequence"], ticket["treatment_sequence"])
+    step = ticket_workflow.treat(treatment_id)
+    if step is not None and ticket["next_treatment"] != treatment_id:
+        raise TransitionConflict(ticket["ticket_number"], "Chamado não está na vez deste tratador")
+    return step
+
+
+# Grava os tratamentos já validados: [(chamado, passo), ...]
+def apply_treatments(cursor, tickets, treatments, treatment_id, user, profile, observation):
+    treated = timestamps.now()
+    queues_before = events.snapshot(cursor, [ticket_number for ticket_number, _ in treatments])
+
+    for ticket_number, step in treatments:
+        ticket = tickets[ticket_number]
+
+        # Definir status do chamado como concluído
+        ticket_status = STATUS_DONE if step.closes else ticket["ticket_status"]
+        close_date_time = treated.display if step.closes else ""
+        closed_at = treated.iso if step.closes else None
+
+        # Avançar somente se o chamado não mudou desde a leitura (compare-and-swap pela versão)
+        cursor.execute(update_ticket_info, (ticket_status, step.next_treatment, close_date_time, closed_at, ticket_number, ticket["version"]))
+        check_swapped(cursor, ticket_number)
+
+    # A observação é acrescentada ao histórico (sem reescrever as anteriores)
+    history.record(cursor, [
+        history.event(ticket_number, history.EVENT_OBSERVATION, treated, actor_id=treatment_id, user=user, profile=profile, message=observation)
+        for ticket_number, _ in treatments
+    ])
+
+    # O chamado passa para o próximo tratador ou sai das filas (notificação após o commit)
+    events.stage(cursor, [ticket_number for ticket_number, _ in treatments], queues_before)
+
+
 # Endpoint para aprovar um chamado
 @treat.route('/treat_ticket/<int:ticket_number>', methods=['POST'])
 def treat_ticket(ticket_number):
     connection = None
     try:
         # Conexão com o banco de dados
-        connection = create_connection()
-        cursor = connection.cursor()
-
-        # Obter informações do token
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"error": "Token não fornecido"}), 401
+        connection = get_connection()
 
-        token = token.replace("Bearer ", "")
-        decoded_token = decode_token(token)
-
-        if not decoded_token:
-            return jsonify({"error": "Token inválido ou expirado"}), 401
+        # Identidade autenticada da requisição
+        identity = g.identity
 
         # Recuperar informações do token
-        treatment_id = decoded_token.get("treatment_id")
-        user = decoded_token.get("user")
-        profile = decoded_token.get("profile")
+        treatment_id = identity.get("treatment_id")
+        user = identity.get("user")
+        profile = identity.get("profile")
         
         if not treatment_id:
             return jsonify({"error": "Perfil do tratador não encontrado"}), 404
-        print("Tratador atual:", treatment_id)
+        logger.debug("Tratador atual: %s", treatment_id)
 
 
         # Obter dados do formulário de tratamento
         data = request.get_json()
         observation = data.get('observation')
+        expected_version = data.get('version')
 
         if not observation:
             return jsonify({"error": "Formulário de tratamento é obrigatório"}), 400
 
+        # Fluxo compilado do chamado
+        catalog.refresh(connection, current_app.json.dumps)
 
-        # Pesquisa inicial na tabela tickets
-        ticket_status_query = """
-        SELECT ticket_status, next_treatment, treatment_sequence, treatment_observation
-        FROM tickets
-        WHERE ticket_number = ?
-        """
-        cursor.execute(ticket_status_query, (ticket_number,))
-        ticket_status_result = cursor.fetchone()
+        # Leitura, validação e gravação sob o mesmo bloqueio de escrita
+        def treat_one(cursor):
+            # Pesquisa inicial na tabela tickets
+            tickets = find_treatment_tickets(cursor, [ticket_number])
+            if ticket_number not in tickets:
+                return jsonify({"error": "Chamado não encontrado"}), 404
+            check_version(tickets[ticket_number], expected_version)
 
-        if not ticket_status_result:
-            return jsonify({"error": "Chamado não encontrado"}), 404
+            # Verificar se o tratador atual está na sequência e determinar o próximo
+            step = plan_treatment(tickets[ticket_number], treatment_id)
+            if step is None:
+                return jsonify({"error": "Tratador atual não está na sequência de tratamento"}), 400
 
+            apply_treatments(cursor, tickets, [(ticket_number, step)], treatment_id, user, profile, observation)
+            return {"success": True, "message": "Aprovação processada com sucesso!", "version": tickets[ticket_number]["version"] + 1}
 
-        initial_ticket_status = ticket_status_result[0]
-        current_treatment = ticket_status_result[1]
-        treatment_sequence = json.loads(ticket_status_result[2])
-        print(initial_ticket_status, current_treatment, treatment_sequence)
-        
+        return run_transaction(connection, treat_one)
+            
+    except TransitionConflict as conflict:
+        return conflict_response(connection, conflict)
+    except Exception:
+        logger.exception("Erro ao processar tratamento")
+        return jsonify({"error": "Erro interno no servidor"}), 500
 
-        # Verificar se o tratador atual está na sequência
-        if treatment_id not in treatment_sequence:
-            return jsonify({"error": "Tratador atual não está na sequência de tratamento"}), 400
 
-        current_index = treatment_sequence.index(treatment_id)
-        next_treatment = treatment_sequence[current_index + 1] if current_index + 1 < len(treatment_sequence) else 0
+# Endpoint para tratar vários chamados em uma única transação
+@treat.route('/treat_tickets', methods=['POST'])
+def treat_tickets():
+    connection = None
+    try:
+        # Identidade autenticada da requisição
+        identity = g.identity
 
+        treatment_id = identity.get("treatment_id")
+        user = identity.get("user")
+        profile = identity.get("profile")
+        if not treatment_id:
+            return jsonify({"error": "Perfil do tratador não encontrado"}), 404
 
+        data = request.get_json(silent=True)
+        try:
+            ticket_numbers = parse_ticket_numbers(data)
+        except BulkError as e:
+            return jsonify({"error": str(e)}), 400
 
+        # A mesma observação é registrada em todos os chamados
+        observation = data.get('observation')
+        if not observation:
+            return jsonify({"error": "Formulário de tratamento é obrigatório"}), 400
 
-        # Definir status do chamado como concluído
-        current_date_time = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        ticket_status = "Concluído" if next_treatment == 0 else initial_ticket_status
-        close_date_time = current_date_time if next_treatment == 0 else ""
-
-        # Ajustando as observações
-        old_observation = ticket_status_result[3]
-        if old_observation is None:
-            old_observation = ""
-        new_observation_entry = f"[{current_date_time}] Tratador {treatment_id} {user} {profile}: {observation}"
-        updated_observation = f"{old_observation}\n{new_observation_entry}".strip()
-
-
-        update_ticket_info = """
-        UPDATE tickets
-        SET ticket_status = ?,
-            next_treatment =?,
-            close_date_time =?,
-            treatment_observation =?
-        WHERE ticket_number = ?
-        """
-        cursor.execute(update_ticket_info, (ticket_status, next_treatment, close_date_time, updated_observation, ticket_number))
-
-        # Confirmar transação
-        connection.commit()
-        return {"success": True, "message": "Aprovação processada com sucesso!"}
-            
-    except Exception as e:
-        print(f"Erro ao processar tratamento: {e}")
+        connection = get_connection()
+        if not connection:
+            return jsonify({"error": "Não foi possível se conectar com o banco"}), 500
+
+        catalog.refresh(connection, current_app.json.dumps)
+
+        def treat_all(cursor):
+            # Buscar todos os chamados com uma única consulta
+            tickets = find_treatment_tickets(cursor, ticket_numbers)
+
+            results = []
+            treatments = []
+            for ticket_number in ticket_numbers:
+                if ticket_number not in tickets:
+                    results.append(failure(ticket_number, "Chamado não encontrado", 404))
+                    continue
+                try:
+                    step = plan_treatment(tickets[ticket_number], treatment_id)
+                except TransitionConflict as conflict:
+                    results.append(failure(ticket_number, str(conflict), 409))
+                    continue
+                if step is None:
+                    results.append(failure(ticket_number, "Tratador atual não está na sequência de tratamento", 400))
+                    continue
+                treatments.append((ticket_number, step))
+                results.append(success(ticket_number))
+
+            # Gravar todos os tratamentos, confirmados uma única vez ao final da transação
+            if treatments:
+                apply_treatments(cursor, tickets, treatments, treatment_id, user, profile, observation)
+            return jsonify({"treated": len(treatments), "results": results}), 200
+
+        return run_transaction(connection, treat_all)
+
+    except TransitionConflict as conflict:
+        return conflict_response(connection, conflict)
+    except Exception:
+        logger.exception("Erro ao tratar chamados em lote")
         return jsonify({"error": "Erro interno no servidor"}), 500
-    
-    finally:
-        if connection:
-            connection.close()
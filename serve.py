@@ -0,0 +1,87 @@
+# serve.py
+# Servidor de produção: gunicorn com N workers criados (fork) a partir do app pré-carregado
+#
+#   python serve.py                       # SERVE_BIND / SERVE_WORKERS / SERVE_THREADS do config
+#   python serve.py --workers 4 --bind 0.0.0.0:5000
+#
+# - O app é importado uma única vez no master: as migrações rodam antes do fork e os workers
+#   compartilham o código já carregado (as conexões SQLite do master são fechadas antes do fork)
+# - As escritas passam pela fila única de escrita (db.WriteLane, arquivo <banco>.write.lock),
+#   então os workers esperam a vez em vez de receber "database is locked"
+# - Recarga graciosa: kill -HUP <pid do master> sobe workers novos e encerra os antigos após
+#   concluírem as requisições em andamento; para carregar código novo use kill -USR2 <pid>
+#   (novo master) seguido de kill -TERM no master antigo
+# - Saúde de cada worker: GET /health (pid, tempo no ar, pool e fila de escrita)
+#
+# As notificações de /events são publicadas no próprio processo: com vários workers, o cliente
+# só recebe as mudanças feitas pelo worker em que está conectado (use asgi.py para o /events)
+# O cache de leitura (CACHE_BACKEND=memory) também é de cada worker: a escrita invalida só o cache
+# do worker que a atendeu, e os demais servem a versão anterior por até CACHE_TTL segundos
+import argparse
+from gunicorn.app.base import BaseApplication
+from config import Config
+
+
+class ServiceDeskApplication(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        import db
+        from app import app
+
+        # Conexões abertas no master (migrações) não podem ser herdadas pelos workers
+        db.pool.close_all()
+        return app
+
+
+# Após o fork: cada worker abre as próprias conexões e registra o início para o /health
+def post_fork(server, worker):
+    import db
+    from routes.monitoring.status import worker_started
+
+    db.pool.after_fork()
+    worker_started(worker.age)
+    server.log.info("Worker %s (pid %s) pronto", worker.age, worker.pid)
+
+
+def worker_exit(server, worker):
+    import db
+
+    if db.pool:
+        db.pool.close_all()
+
+
+def options(args):
+    return {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "preload_app": True,
+        "timeout": Config.SERVE_TIMEOUT,
+        "graceful_timeout": Config.SERVE_GRACEFUL_TIMEOUT,
+        "max_requests": Config.SERVE_MAX_REQUESTS,
+        "max_requests_jitter": Config.SERVE_MAX_REQUESTS // 10,
+        "post_fork": post_fork,
+        "worker_exit": worker_exit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de produção (gunicorn) do ServiceDesk")
+    parser.add_argument("--bind", default=Config.SERVE_BIND)
+    parser.add_argument("--workers", type=int, default=Config.SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=Config.SERVE_THREADS)
+    args = parser.parse_args()
+
+    ServiceDeskApplication(options(args)).run()
+
+
+if __name__ == "__main__":
+    main()
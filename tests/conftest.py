@@ -0,0 +1,111 @@
+# tests/conftest.py
+# Aplicação sobre um banco SQLite em memória (sqlite://): as migrações criam o esquema
+# e os dados de referência abaixo reproduzem os perfis e fluxos do banco de exemplo
+import json
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "teste"
+
+os.environ["DATABASE_URI"] = "sqlite://"
+os.environ["SECRET_KEY"] = "testes"
+os.environ["CATALOG_CHECK_INTERVAL"] = "0"
+os.environ["LOGIN_RATE_LIMIT"] = "1000"
+os.environ["LOG_LEVEL"] = "WARNING"
+sys.path.insert(0, REPO_DIR)
+
+# Matrícula, nome, cargo, gestor e perfil (general_data)
+PEOPLE = [
+    (1001, "GABI", "GERENTE", "MARCELO", "GERENTE"),
+    (1002, "LUIS", "SUPERVISOR", "GABI", "USUARIO"),
+    (1003, "OTAVIO", "ANALISTA", "VITOR", "FIELD"),
+    (1004, "KAROL", "SUPERVISOR", "TIAGO", "USUARIO"),
+    (1005, "TIAGO", "GERENTE", "MARCELO", "GERENTE"),
+    (1006, "MASTER", "ANALISTA ADM", "MARCELO", "ADM"),
+]
+
+PROFILES = [
+    (1, "SUPERVISOR", "USUARIO", 0, 0),
+    (2, "GERENTE", "GERENTE", 1, 0),
+    (3, "ANALISTA", "FIELDSERVICE", 2, 1),
+    (4, "ANALISTA ADM", "ADM", 3, 2),
+]
+
+FORM = json.dumps({"Equipamento": "Equipamento", "Descrição": "Descrição", "Local": "Local"})
+TREATMENT_FORM = json.dumps({"Fechamento": "Fechamento", "Descrição": "Descrição"})
+
+# Tipo de chamado, submotivo, fluxo de aprovação e de tratamento por perfil (ticket_types)
+TICKET_TYPES = [
+    ("Hardware", "Movimentação", "Hardware/Movimentação", FORM, "[1, 3, 2]", "[1, 2]", "USUARIO", TREATMENT_FORM),
+    ("Hardware", "Movimentação", "Hardware/Movimentação", FORM, "[3, 2]", "[1, 2]", "GERENTE", TREATMENT_FORM),
+    ("Hardware", "Movimentação", "Hardware/Movimentação", FORM, "[3]", "[1, 2]", "FIELDSERVICE", TREATMENT_FORM),
+    ("Hardware", "Movimentação", "Hardware/Movimentação", FORM, "[1, 2]", "[1, 2]", "ADM", TREATMENT_FORM),
+]
+
+REASONS = ["Dados incorretos", "Outras razões"]
+
+
+def seed(connection):
+    from werkzeug.security import generate_password_hash
+
+    password = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+    connection.executemany("INSERT INTO general_data (register, name, position, manager, profile) VALUES (?, ?, ?, ?, ?)", PEOPLE)
+    connection.executemany("INSERT INTO profile_config VALUES (?, ?, ?, ?, ?)", PROFILES)
+    connection.executemany("INSERT INTO users (user, password) VALUES (?, ?)", [(person[0], password) for person in PEOPLE])
+    connection.executemany(
+        "INSERT INTO ticket_types (ticket_type, submotive, motive_submotive, form, approval_sequence,"
+        " treatment_sequence, profile, treatment_form) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        TICKET_TYPES,
+    )
+    connection.executemany("INSERT INTO pages_roles (profile, allowed_page, page_id) VALUES (?, 'ABERTURA', 1)",
+                           [(profile[2],) for profile in PROFILES])
+    connection.executemany("INSERT INTO rejection_reasons VALUES (?)", [(reason,) for reason in REASONS])
+    connection.executemany("INSERT INTO cancellation_reasons VALUES (?)", [(reason,) for reason in REASONS])
+    connection.commit()
+
+
+@pytest.fixture(scope="session")
+def app():
+    import db
+    from app import app
+
+    connection = db.pool.acquire()
+    try:
+        seed(connection)
+    finally:
+        db.pool.release(connection)
+    return app
+
+
+@pytest.fixture(scope="session")
+def headers(app):
+    client = app.test_client()
+    tokens = {}
+    for person in PEOPLE:
+        response = client.post("/login", json={"username": person[0], "password": PASSWORD})
+        assert response.status_code == 200, response.get_json()
+        tokens[person[0]] = {"Authorization": f"Bearer {response.get_json()['token']}"}
+    return tokens
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# Abre um chamado do solicitante e devolve o número
+@pytest.fixture
+def open_ticket(client, headers):
+    def open_as(user=1002):
+        response = client.post("/open_ticket", headers=headers[user], json={
+            "ticket_type": "Hardware",
+            "submotive": "Movimentação",
+            "motive_submotive": "Hardware/Movimentação",
+            "form": {"Equipamento": "CPU", "Descrição": "Troca de mesa", "Local": "Sala 2"},
+        })
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()["ticket_number"]
+    return open_as
@@ -0,0 +1,19 @@
+# tests/test_analytics.py
+from utils import analytics
+
+
+# Faixa com um único valor observado: todos os quantis são esse valor
+def test_quantile_of_identical_durations():
+    buckets = [(0, 4, 0.0, 0.0, 0.0)]
+    assert analytics.summarize(buckets) == {"count": 4, "mean_s": 0.0, "p50_s": 0.0, "p90_s": 0.0}
+
+
+# Os quantis ficam entre o menor e o maior valor observado, não nos limites da faixa
+def test_quantile_stays_within_observed_range():
+    # Faixa 0 (até 60 s) com 2, 4, 6 e 8 s; faixa sem limite superior com 10 e 12 dias
+    buckets = [(0, 4, 20.0, 2.0, 8.0), (len(analytics.DURATION_BUCKETS), 2, 1900800.0, 864000.0, 1036800.0)]
+    total = 6
+    for fraction in (0.1, 0.5, 0.6):
+        assert 2.0 <= analytics.quantile(buckets, total, fraction) <= 8.0
+    assert 864000.0 <= analytics.quantile(buckets, total, 0.9) <= 1036800.0
+    assert analytics.quantile(buckets, total, 1.0) == 1036800.0
@@ -0,0 +1,27 @@
+# tests/test_cache.py
+from flask import jsonify
+
+from utils import cache
+from utils.queues import QUEUE_APPROVAL
+
+
+# Leitura que começou antes de uma transição e grava depois dela: a página não entra no cache
+def test_page_read_before_transition_is_not_cached(app, open_ticket):
+    key = cache.queue_key(QUEUE_APPROVAL, 1, "1001")
+    with app.test_request_context("/pending_approvals"):
+        started = cache.response_cache.begin()
+        stale = jsonify({"message": "Nenhum ticket pendente de aprovação"})
+
+        # Abertura de um chamado na fila do gerente enquanto a leitura estava em andamento
+        open_ticket()
+
+        stale_fills = cache.response_cache.stale_fills
+        cache.store_page(key, started, stale, 404, None)
+        assert cache.cached_page(key) is None
+        assert cache.response_cache.stale_fills == stale_fills + 1
+
+        # Leitura iniciada depois da invalidação é guardada normalmente
+        started = cache.response_cache.begin()
+        cache.store_page(key, started, jsonify([]), 200, None)
+        assert cache.cached_page(key) is not None
+    cache.response_cache.invalidate([key])
@@ -0,0 +1,101 @@
+# tests/test_db.py
+import threading
+
+import pytest
+
+import db
+import migrations
+
+
+@pytest.fixture
+def memory_pool():
+    pool = db.ConnectionPool("sqlite://", timeout=2.0)
+    connection = pool.acquire()
+    try:
+        connection.execute("CREATE TABLE items (value INTEGER)")
+        connection.commit()
+    finally:
+        pool.release(connection)
+    yield pool
+    pool.close_all()
+
+
+# Banco em memória: a conexão única é emprestada a um usuário por vez
+def test_memory_pool_lends_connection_exclusively(memory_pool):
+    writer = memory_pool.acquire()
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT INTO items VALUES (1)")
+
+    acquired = threading.Event()
+    seen = []
+
+    def reader():
+        connection = memory_pool.acquire()
+        acquired.set()
+        try:
+            seen.extend(row[0] for row in connection.execute("SELECT value FROM items"))
+        finally:
+            memory_pool.release(connection)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    # Enquanto a transação está aberta, a outra thread espera a conexão
+    assert not acquired.wait(0.2)
+
+    writer.commit()
+    memory_pool.release(writer)
+    thread.join(2.0)
+    assert acquired.is_set()
+    assert seen == [1]
+
+
+# Devolver a conexão desfaz somente a transação de quem a devolveu
+def test_release_rolls_back_only_own_transaction(memory_pool):
+    connection = memory_pool.acquire()
+    connection.execute("BEGIN IMMEDIATE")
+    connection.execute("INSERT INTO items VALUES (2)")
+    memory_pool.release(connection)
+
+    connection = memory_pool.acquire()
+    try:
+        assert connection.execute("SELECT count(*) FROM items WHERE value = 2").fetchone()[0] == 0
+    finally:
+        memory_pool.release(connection)
+
+
+def test_memory_pool_times_out_while_lent(memory_pool):
+    memory_pool.timeout = 0.05
+    connection = memory_pool.acquire()
+    try:
+        with pytest.raises(TimeoutError):
+            memory_pool.acquire()
+    finally:
+        memory_pool.release(connection)
+    assert memory_pool.stats()["in_use"] == 0
+
+
+# Banco novo: a migração 0 cria as tabelas base e as demais rodam em seguida
+def test_migrations_build_schema_from_empty_database():
+    pool = db.ConnectionPool("sqlite://")
+    connection = pool.acquire()
+    try:
+        applied = migrations.run_migrations(connection)
+        assert applied == [version for version, _, _ in migrations.MIGRATIONS]
+        assert migrations.current_version(connection) == migrations.MIGRATIONS[-1][0]
+        assert migrations.run_migrations(connection) == []
+    finally:
+        pool.release(connection)
+        pool.close_all()
+
+
+# Backend fora do SQLite é recusado na criação do pool
+def test_server_backend_is_rejected():
+    with pytest.raises(RuntimeError, match="mysql"):
+        db.ConnectionPool("mysql://servicedesk@localhost/servicedesk")
+
+
+# Login e catálogo sobre o banco em memória da aplicação
+def test_login_and_catalog_on_memory_database(client, headers):
+    response = client.get("/ticket_types", headers=headers[1002])
+    assert response.status_code == 200
+    assert [item["motive_submotive"] for item in response.get_json()] == ["Hardware/Movimentação"]
@@ -0,0 +1,79 @@
+# tests/test_org.py
+import contextlib
+
+import db
+
+
+# Carga do RH fora do app: troca o gestor (pelo nome) direto em general_data
+def set_manager(register, manager):
+    connection = db.pool.acquire()
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute("UPDATE general_data SET manager = ? WHERE register = ?", (manager, register))
+        connection.commit()
+    finally:
+        db.pool.release(connection)
+
+
+@contextlib.contextmanager
+def manager_moved(register, manager, original):
+    set_manager(register, manager)
+    try:
+        yield
+    finally:
+        set_manager(register, original)
+
+
+# Números dos chamados de uma listagem (404 = nenhum chamado)
+def numbers(response, field):
+    if response.status_code == 404:
+        return set()
+    return {ticket[field] for ticket in response.get_json()}
+
+
+def listed(client, headers, user):
+    return numbers(client.get("/list_tickets?fields=ticket_number", headers=headers[user]), "ticket_number")
+
+
+def pending(client, headers, user):
+    return numbers(client.get("/pending_approvals?fields=ticket", headers=headers[user]), "ticket")
+
+
+# O gerente vê os chamados dos subordinados em qualquer nível da hierarquia
+def test_manager_sees_reports_across_levels(client, headers, open_ticket):
+    ticket_number = open_ticket(user=1004)
+    assert ticket_number in listed(client, headers, 1005)
+    assert ticket_number not in listed(client, headers, 1001)
+
+    # TIAGO passa a responder a GABI: KAROL (subordinada de TIAGO) fica no segundo nível de GABI
+    with manager_moved(1005, "GABI", "MARCELO"):
+        assert ticket_number in listed(client, headers, 1001)
+        assert ticket_number in listed(client, headers, 1005)
+        assert client.get(f"/ticket_detail/{ticket_number}", headers=headers[1001]).status_code == 200
+
+    assert ticket_number not in listed(client, headers, 1001)
+
+
+# Troca de gestor pelo RH: a aprovação pendente passa para o novo gestor direto, inclusive nas
+# primeiras páginas das filas já guardadas em cache e nos contadores
+def test_pending_approval_follows_manager_change(client, headers, open_ticket):
+    ticket_number = open_ticket(user=1004)
+    # Pendências de TIAGO: todas de KAROL, a única subordinada dele
+    moved = pending(client, headers, 1005)
+    assert ticket_number in moved
+    gabi_pending = pending(client, headers, 1001)
+    assert ticket_number not in gabi_pending
+    gabi_count = client.get("/queue_counts", headers=headers[1001]).get_json()["pending_approvals"]
+
+    with manager_moved(1004, "GABI", "TIAGO"):
+        assert pending(client, headers, 1001) == gabi_pending | moved
+        assert pending(client, headers, 1005) == set()
+        assert client.get("/queue_counts", headers=headers[1005]).get_json()["pending_approvals"] == 0
+        assert client.get("/queue_counts", headers=headers[1001]).get_json()["pending_approvals"] == gabi_count + len(moved)
+
+        # O novo gestor aprova a partir da fila dele
+        response = client.post(f"/approve_ticket/{ticket_number}", headers=headers[1001], json={"version": 0})
+        assert response.status_code == 200
+
+    assert ticket_number not in pending(client, headers, 1001)
+    assert ticket_number not in pending(client, headers, 1005)
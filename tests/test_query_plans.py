@@ -0,0 +1,24 @@
+# tests/test_query_plans.py
+import db
+import query_plans
+
+
+# Nenhuma consulta das rotas (montada pelas mesmas funções das rotas) faz varredura completa
+def test_route_queries_use_indexes(app):
+    connection = db.pool.acquire()
+    try:
+        assert query_plans.check_query_plans(connection) == []
+    finally:
+        db.pool.release(connection)
+
+
+# As consultas verificadas são as das rotas: paginação e ordenação inclusas
+def test_checks_follow_route_builders(app):
+    connection = db.pool.acquire()
+    try:
+        checks = {name: sql for name, sql, _ in query_plans.query_plan_checks(connection.cursor())}
+    finally:
+        db.pool.release(connection)
+    assert "ORDER BY" in checks["list_tickets (gerente)"] and checks["list_tickets (gerente)"].endswith("LIMIT ?")
+    assert "+user IN" in checks["list_tickets (gerente, equipe grande)"]
+    assert "tickets_fts.rank" in checks["list_tickets (busca)"]
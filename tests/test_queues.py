@@ -0,0 +1,128 @@
+# tests/test_queues.py
+import db
+from utils import queues
+
+
+# Filas em que o chamado está: ({aprovador: gerente}, {tratador})
+def membership(ticket_number):
+    connection = db.pool.acquire()
+    try:
+        approval = connection.execute(
+            "SELECT approver_id, manager FROM approval_queue WHERE ticket_number = ?", (ticket_number,)
+        ).fetchall()
+        treatment = connection.execute(
+            "SELECT treatment_id FROM treatment_queue WHERE ticket_number = ?", (ticket_number,)
+        ).fetchall()
+    finally:
+        db.pool.release(connection)
+    return {row[0]: row[1] for row in approval}, {row[0] for row in treatment}
+
+
+# Contadores das filas contra o conteúdo das filas (linhas com total zerado não contam)
+def counts_match_queues():
+    connection = db.pool.acquire()
+    try:
+        counts = set(connection.execute("SELECT queue, owner_id, manager, total FROM queue_counts WHERE total <> 0"))
+        expected = set(connection.execute(f"""
+            SELECT '{queues.QUEUE_APPROVAL}', approver_id, manager, count(*) FROM approval_queue GROUP BY 2, 3
+            UNION ALL
+            SELECT '{queues.QUEUE_TREATMENT}', treatment_id, '', count(*) FROM treatment_queue GROUP BY 2
+        """))
+    finally:
+        db.pool.release(connection)
+    return {tuple(row) for row in counts} == {tuple(row) for row in expected}
+
+
+def queue_counts(client, headers, user):
+    return client.get("/queue_counts", headers=headers[user]).get_json()
+
+
+# Abertura, aprovações e tratamento: o chamado passa de fila em fila e os contadores acompanham
+def test_queues_follow_the_workflow(client, headers, open_ticket):
+    manager_before = queue_counts(client, headers, 1001)
+    adm_before = queue_counts(client, headers, 1006)
+    field_before = queue_counts(client, headers, 1003)
+
+    ticket_number = open_ticket()
+    # Aprovador 1 (gerente): a fila guarda a matrícula do gestor direto do solicitante
+    assert membership(ticket_number) == ({1: "1001"}, set())
+    assert queue_counts(client, headers, 1001)["pending_approvals"] == manager_before["pending_approvals"] + 1
+    assert counts_match_queues()
+
+    # Sequência de aprovação [1, 3, 2]
+    for version, (user, next_queue) in enumerate([(1001, {3: ""}), (1006, {2: ""}), (1003, {})]):
+        response = client.post(f"/approve_ticket/{ticket_number}", headers=headers[user], json={"version": version})
+        assert response.status_code == 200
+        approval, _ = membership(ticket_number)
+        assert set(approval) == set(next_queue)
+        assert counts_match_queues()
+    assert queue_counts(client, headers, 1001)["pending_approvals"] == manager_before["pending_approvals"]
+
+    # Aprovado: tratamento [1, 2]
+    assert membership(ticket_number) == ({}, {1})
+    assert queue_counts(client, headers, 1003)["processing_tickets"] == field_before["processing_tickets"] + 1
+
+    response = client.post(f"/treat_ticket/{ticket_number}", headers=headers[1003], json={"observation": "Mesa trocada", "version": 3})
+    assert response.status_code == 200
+    assert membership(ticket_number) == ({}, {2})
+    assert queue_counts(client, headers, 1003)["processing_tickets"] == field_before["processing_tickets"]
+    assert queue_counts(client, headers, 1006)["processing_tickets"] == adm_before["processing_tickets"] + 1
+
+    response = client.post(f"/treat_ticket/{ticket_number}", headers=headers[1006], json={"observation": "Conferido", "version": 4})
+    assert response.status_code == 200
+    assert membership(ticket_number) == ({}, set())
+    assert queue_counts(client, headers, 1006) == adm_before
+    assert counts_match_queues()
+
+
+# Reprovação tira o chamado da fila de aprovação
+def test_rejection_leaves_the_queues(client, headers, open_ticket):
+    before = queue_counts(client, headers, 1001)
+    ticket_number = open_ticket()
+    response = client.post(
+        f"/reject_ticket/{ticket_number}", headers=headers[1001],
+        json={"rejection_reason": "Dados incorretos", "version": 0},
+    )
+    assert response.status_code == 200
+    assert membership(ticket_number) == ({}, set())
+    assert queue_counts(client, headers, 1001) == before
+    assert counts_match_queues()
+
+
+# Cancelamento pelo tratador tira o chamado da fila de tratamento
+def test_cancel_leaves_the_queues(client, headers, open_ticket):
+    before = queue_counts(client, headers, 1003)
+    ticket_number = open_ticket()
+    for version, user in enumerate([1001, 1006, 1003]):
+        assert client.post(f"/approve_ticket/{ticket_number}", headers=headers[user], json={"version": version}).status_code == 200
+    assert membership(ticket_number) == ({}, {1})
+
+    response = client.post(
+        f"/cancel_ticket/{ticket_number}", headers=headers[1003],
+        json={"cancelReason": "Outras razões", "version": 3},
+    )
+    assert response.status_code == 200
+    assert membership(ticket_number) == ({}, set())
+    assert queue_counts(client, headers, 1003) == before
+    assert counts_match_queues()
+
+
+# Recarga das migrações 10 e 12: mesmas filas e contadores que os gatilhos mantinham
+def test_approval_rebuild_matches_triggers(client, headers, open_ticket):
+    pending = [open_ticket() for _ in range(3)]
+    client.post(f"/approve_ticket/{pending[0]}", headers=headers[1001], json={"version": 0})
+    before = {ticket_number: membership(ticket_number) for ticket_number in pending}
+    counts_before = queue_counts(client, headers, 1001), queue_counts(client, headers, 1006)
+
+    connection = db.pool.acquire()
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        for step in queues.APPROVAL_REBUILD:
+            connection.execute(step)
+        connection.commit()
+    finally:
+        db.pool.release(connection)
+
+    assert {ticket_number: membership(ticket_number) for ticket_number in pending} == before
+    assert (queue_counts(client, headers, 1001), queue_counts(client, headers, 1006)) == counts_before
+    assert counts_match_queues()
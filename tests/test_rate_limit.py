@@ -0,0 +1,35 @@
+# tests/test_rate_limit.py
+from utils import rate_limit
+from utils.rate_limit import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# Tabela cheia de janelas em curso: chaves novas são recusadas e o contador bloqueado continua valendo
+def test_full_table_rejects_new_keys_without_evicting_live_windows(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    limiter = RateLimiter(limit=2, window=60.0, max_keys=3)
+
+    assert limiter.hit("vitima") == 0
+    assert limiter.hit("vitima") == 0
+    assert limiter.hit("vitima") > 0
+
+    clock.now += 10
+    assert limiter.hit("atacante-1") == 0
+    assert limiter.hit("atacante-2") == 0
+    for attempt in range(100):
+        assert limiter.hit(f"inventado-{attempt}") == 51
+    assert limiter.hit("vitima") == 51
+
+    # Vencida a janela mais antiga (a da vítima), a vaga volta para chaves novas
+    clock.now += 50
+    assert limiter.hit("inventado-0") == 0
+    assert limiter.hit("atacante-1") == 0
+    assert limiter.hit("atacante-1") > 0
@@ -0,0 +1,98 @@
+# tests/test_search.py
+import sqlite3
+
+import db
+import migrations
+from utils import forms, search
+
+
+def found(client, headers, term):
+    response = client.get(f"/list_tickets?search={term}&fields=ticket_number", headers=headers[1006])
+    if response.status_code == 404:
+        return set()
+    return {ticket["ticket_number"] for ticket in response.get_json()}
+
+
+def open_with_form(client, headers, form):
+    response = client.post("/open_ticket", headers=headers[1002], json={
+        "ticket_type": "Hardware",
+        "submotive": "Movimentação",
+        "motive_submotive": "Hardware/Movimentação",
+        "form": form,
+    })
+    assert response.status_code == 201
+    return response.get_json()["ticket_number"]
+
+
+# Alteração fora do app (carga ou correção direta no banco): os gatilhos atualizam o índice
+def update_ticket(ticket_number, **columns):
+    connection = db.pool.acquire()
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        connection.execute(f"UPDATE tickets SET {assignments} WHERE ticket_number = ?", (*columns.values(), ticket_number))
+        connection.commit()
+    finally:
+        db.pool.release(connection)
+
+
+# Palavras do formulário, pequeno (gatilho) ou comprimido (gravado pelo app), sem acentos e por prefixo
+def test_search_form_text(client, headers):
+    short = open_with_form(client, headers, {"Equipamento": "Projetor", "Descrição": "Lâmpada queimada"})
+    long = open_with_form(client, headers, {"Equipamento": "Scanner", "Descrição": "Alimentador " + "travando " * 60})
+
+    assert found(client, headers, "lampada") == {short}
+    assert found(client, headers, "proj") == {short}
+    assert found(client, headers, "alimentador") == {long}
+
+    # Alteração de outra coluna mantém as palavras do formulário comprimido
+    update_ticket(long, submotive="Manutenção")
+    assert found(client, headers, "alimentador") == {long}
+    assert long in found(client, headers, "manutencao")
+
+    # Formulário regravado: as palavras antigas saem do índice
+    update_ticket(short, form_data=forms.compact({"Equipamento": "Televisor"}))
+    assert found(client, headers, "lampada") == set()
+    assert found(client, headers, "televisor") == {short}
+
+
+# Observações do tratamento entram no índice pelo histórico de eventos
+def test_search_observations(client, headers, open_ticket):
+    ticket_number = open_ticket()
+    assert found(client, headers, "parafusadeira") == set()
+    for version, user in enumerate([1001, 1006, 1003]):
+        assert client.post(f"/approve_ticket/{ticket_number}", headers=headers[user], json={"version": version}).status_code == 200
+
+    response = client.post(
+        f"/treat_ticket/{ticket_number}", headers=headers[1003],
+        json={"observation": "Usada a parafusadeira do almoxarifado", "version": 3},
+    )
+    assert response.status_code == 200
+    assert found(client, headers, "parafusadeira") == {ticket_number}
+    assert found(client, headers, "almoxarifado parafusadeira") == {ticket_number}
+
+
+# Banco anterior aos formulários compactos: a troca dos gatilhos na migração 11 mantém o índice
+# dos chamados existentes e os novos gatilhos seguem atualizando
+def test_index_survives_trigger_swap(monkeypatch):
+    connection = sqlite3.connect(":memory:", isolation_level=None)
+    all_migrations = migrations.MIGRATIONS
+    monkeypatch.setattr(migrations, "MIGRATIONS", [migration for migration in all_migrations if migration[0] < 11])
+    migrations.run_migrations(connection)
+    connection.execute(
+        "INSERT INTO tickets (ticket_type, submotive, motive_submotive, form, user, ticket_open_date_time, "
+        "ticket_status, next_approver, approval_sequence) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ("Hardware", "Movimentação", "Hardware/Movimentação", '{"Equipamento": "Roteador"}', 1002, "01/01/2025 10:00", "Concluído", "0", "[]"),
+    )
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", all_migrations)
+    assert 11 in migrations.run_migrations(connection)
+
+    def matches(term):
+        return [row[0] for row in connection.execute("SELECT rowid FROM tickets_fts WHERE tickets_fts MATCH ?", (search.match_query(term),))]
+
+    assert matches("roteador") == [1]
+    connection.execute("UPDATE tickets SET form_data = ? WHERE ticket_number = 1", ('{"Equipamento": "Switch"}',))
+    assert matches("roteador") == []
+    assert matches("switch") == [1]
+    connection.close()
@@ -0,0 +1,16 @@
+# tests/test_tickets.py
+
+
+# Usuário comum só vê o detalhamento (e as observações) dos próprios chamados
+def test_ticket_detail_visibility(client, headers, open_ticket):
+    ticket_number = open_ticket(1002)
+
+    response = client.get(f"/ticket_detail/{ticket_number}?include=observations", headers=headers[1002])
+    assert response.status_code == 200
+    assert response.get_json()["form"]["Equipamento"] == "CPU"
+
+    response = client.get(f"/ticket_detail/{ticket_number}?include=observations", headers=headers[1004])
+    assert response.status_code == 404
+
+    for user in (1003, 1006):
+        assert client.get(f"/ticket_detail/{ticket_number}", headers=headers[user]).status_code == 200
@@ -0,0 +1,43 @@
+# tests/test_transitions.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Vários aprovadores simultâneos no mesmo passo: uma aprovação vence e as demais recebem 409
+def test_concurrent_approvals_conflict(app, headers, open_ticket):
+    ticket_number = open_ticket()
+    workers = 8
+    start = threading.Barrier(workers)
+
+    def approve(_):
+        client = app.test_client()
+        start.wait()
+        response = client.post(f"/approve_ticket/{ticket_number}", headers=headers[1001], json={"version": 0})
+        return response.status_code, response.get_json()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(approve, range(workers)))
+
+    statuses = sorted(status for status, _ in results)
+    assert statuses == [200] + [409] * (workers - 1)
+    for status, body in results:
+        if status == 409:
+            # Estado atual devolvido junto com o conflito: o chamado avançou uma única vez
+            assert body["current"]["ticket_number"] == ticket_number
+            assert body["current"]["version"] == 1
+            assert str(body["current"]["next_approver"]) == "3"
+
+    history = app.test_client().get(f"/ticket_history/{ticket_number}", headers=headers[1006]).get_json()
+    assert [event["event_type"] for event in history] == ["open", "approval"]
+
+
+# Versão enviada pelo cliente desatualizada: 409 sem alterar o chamado
+def test_stale_version_is_rejected(client, headers, open_ticket):
+    ticket_number = open_ticket()
+    response = client.post(f"/approve_ticket/{ticket_number}", headers=headers[1001], json={"version": 5})
+    assert response.status_code == 409
+    assert response.get_json()["current"]["version"] == 0
+
+    response = client.post(f"/approve_ticket/{ticket_number}", headers=headers[1001], json={"version": 0})
+    assert response.status_code == 200
+    assert response.get_json()["version"] == 1
@@ -0,0 +1,349 @@
+#utils/analytics.py
+import click
+from utils.workflow import STATUS_APPROVED
+
+# Agregados dos painéis (GET /stats) mantidos por gatilhos na mesma transação de cada
+# abertura, aprovação, reprovação, tratamento e cancelamento: as consultas do painel
+# leem somente faixas e contadores, sem percorrer tickets ou tickets_approvals
+#
+# - stats_status: chamados por tipo (motive_submotive) e status
+# - stats_daily: chamados abertos e encerrados por dia e tipo
+# - stats_durations: histograma de tempos (segundos) por métrica e chave:
+#     open_to_approval  abertura -> última aprovação, por tipo de chamado
+#     open_to_close     abertura -> encerramento (concluído, reprovado ou cancelado), por tipo
+#     approval          espera de cada aprovação desde o evento anterior, por perfil do aprovador
+#     treatment         duração de cada passo do tratamento desde o evento anterior, por tratador
+#   cada faixa guarda a quantidade, a soma e o menor e o maior valor observados (limites dos quantis)
+METRIC_OPEN_TO_APPROVAL = "open_to_approval"
+METRIC_OPEN_TO_CLOSE = "open_to_close"
+METRIC_APPROVAL = "approval"
+METRIC_TREATMENT = "treatment"
+
+# Limites superiores das faixas do histograma (segundos); a última faixa não tem limite
+DURATION_BUCKETS = (
+    60, 300, 900, 1800, 3600, 7200, 14400, 28800, 57600,
+    86400, 172800, 259200, 432000, 604800, 1209600, 2592000, 5184000, 7776000,
+)
+
+CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS stats_status (
+        motive_submotive TEXT NOT NULL,
+        ticket_status TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (motive_submotive, ticket_status)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day TEXT NOT NULL,
+        motive_submotive TEXT NOT NULL,
+        opened INTEGER NOT NULL DEFAULT 0,
+        closed INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, motive_submotive)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_durations (
+        metric TEXT NOT NULL,
+        key TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        min_seconds REAL NOT NULL,
+        max_seconds REAL NOT NULL,
+        PRIMARY KEY (metric, key, bucket)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+# Faixa do histograma de uma duração (expressão SQL)
+def bucket_case(seconds):
+    cases = " ".join(f"WHEN {seconds} <= {bound} THEN {index}" for index, bound in enumerate(DURATION_BUCKETS))
+    return f"CASE {cases} ELSE {len(DURATION_BUCKETS)} END"
+
+
+# Segundos entre dois instantes ISO-8601 (NULL se algum deles for NULL)
+def seconds_between(start, end):
+    return f"max(0, (julianday({end}) - julianday({start})) * 86400)"
+
+
+# Soma uma duração ao histograma (comando de gatilho)
+def add_duration(metric, key, start, end):
+    return f"""
+        INSERT INTO stats_durations (metric, key, bucket, total, seconds, min_seconds, max_seconds)
+        SELECT '{metric}', {key}, {bucket_case("d")}, 1, d, d, d
+        FROM (SELECT {seconds_between(start, end)} AS d)
+        WHERE d IS NOT NULL
+        ON CONFLICT (metric, key, bucket) DO UPDATE SET
+            total = total + 1,
+            seconds = seconds + excluded.seconds,
+            min_seconds = min(min_seconds, excluded.min_seconds),
+            max_seconds = max(max_seconds, excluded.max_seconds);
+    """
+
+
+def add_status(motive, status, amount):
+    statement = f"""
+        INSERT INTO stats_status (motive_submotive, ticket_status, total)
+        VALUES (coalesce({motive}, ''), {status}, {amount})
+        ON CONFLICT (motive_submotive, ticket_status) DO UPDATE SET total = total + {amount};
+    """
+    # Status que ficou sem chamados sai da tabela (mesmo conteúdo do rebuild)
+    if amount < 0:
+        statement += f"""
+        DELETE FROM stats_status
+        WHERE motive_submotive = coalesce({motive}, '') AND ticket_status = {status} AND total = 0;
+    """
+    return statement
+
+
+def add_daily(day, motive, column):
+    return f"""
+        INSERT INTO stats_daily (day, motive_submotive, {column})
+        SELECT substr({day}, 1, 10), coalesce({motive}, ''), 1
+        WHERE {day} IS NOT NULL
+        ON CONFLICT (day, motive_submotive) DO UPDATE SET {column} = {column} + 1;
+    """
+
+
+# Instante do evento anterior do mesmo chamado (início da etapa encerrada pelo evento novo)
+PREVIOUS_EVENT = """(
+    SELECT max(previous.created_at) FROM ticket_events AS previous
+    WHERE previous.ticket_number = new.ticket_number AND previous.id < new.id
+)"""
+
+# Última aprovação registrada (inserida em tickets_approvals antes do UPDATE do chamado)
+LAST_APPROVAL = """(
+    SELECT max(approved_at) FROM tickets_approvals WHERE tickets_approvals.ticket_number = new.ticket_number
+)"""
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_stats_insert AFTER INSERT ON tickets BEGIN
+        {add_status("new.motive_submotive", "new.ticket_status", 1)}
+        {add_daily("new.opened_at", "new.motive_submotive", "opened")}
+        {add_daily("new.closed_at", "new.motive_submotive", "closed")}
+        {add_duration(METRIC_OPEN_TO_CLOSE, "coalesce(new.motive_submotive, '')", "new.opened_at", "new.closed_at")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_stats_status_update AFTER UPDATE OF ticket_status ON tickets
+    WHEN old.ticket_status IS NOT new.ticket_status BEGIN
+        {add_status("old.motive_submotive", "old.ticket_status", -1)}
+        {add_status("new.motive_submotive", "new.ticket_status", 1)}
+    END
+    """,
+    # Fim da sequência de aprovação: o chamado passa a "Aprovado"
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_stats_approved AFTER UPDATE OF ticket_status ON tickets
+    WHEN new.ticket_status = '{STATUS_APPROVED}' AND old.ticket_status IS NOT new.ticket_status BEGIN
+        {add_duration(METRIC_OPEN_TO_APPROVAL, "coalesce(new.motive_submotive, '')", "new.opened_at", LAST_APPROVAL)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_stats_close AFTER UPDATE OF closed_at ON tickets
+    WHEN old.closed_at IS NULL AND new.closed_at IS NOT NULL BEGIN
+        {add_daily("new.closed_at", "new.motive_submotive", "closed")}
+        {add_duration(METRIC_OPEN_TO_CLOSE, "coalesce(new.motive_submotive, '')", "new.opened_at", "new.closed_at")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_stats_delete AFTER DELETE ON tickets BEGIN
+        {add_status("old.motive_submotive", "old.ticket_status", -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ticket_events_stats_approval AFTER INSERT ON ticket_events
+    WHEN new.event_type = 'approval' BEGIN
+        {add_duration(METRIC_APPROVAL, "coalesce(new.profile, '')", PREVIOUS_EVENT, "new.created_at")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ticket_events_stats_treatment AFTER INSERT ON ticket_events
+    WHEN new.event_type = 'observation' BEGIN
+        {add_duration(METRIC_TREATMENT, "coalesce(new.actor_id, '')", PREVIOUS_EVENT, "new.created_at")}
+    END
+    """,
+]
+
+
+# Durações de todos os chamados existentes: (metric, key, d em segundos)
+durations_query = f"""
+SELECT '{METRIC_OPEN_TO_CLOSE}' AS metric, coalesce(motive_submotive, '') AS key, {seconds_between("opened_at", "closed_at")} AS d
+FROM tickets
+UNION ALL
+SELECT '{METRIC_OPEN_TO_APPROVAL}', coalesce(t.motive_submotive, ''), {seconds_between("t.opened_at", "max(a.approved_at)")}
+FROM tickets AS t
+JOIN tickets_approvals AS a ON a.ticket_number = t.ticket_number AND a.approver_id IS NOT NULL
+GROUP BY t.ticket_number
+-- Todos os aprovadores da sequência aprovaram
+HAVING count(DISTINCT a.approver_id) = (
+    SELECT count(DISTINCT value) FROM json_each(t.approval_sequence) WHERE value <> 0
+)
+UNION ALL
+SELECT CASE event_type WHEN 'approval' THEN '{METRIC_APPROVAL}' ELSE '{METRIC_TREATMENT}' END,
+       CASE event_type WHEN 'approval' THEN coalesce(profile, '') ELSE coalesce(actor_id, '') END,
+       {seconds_between("previous_at", "created_at")}
+FROM (
+    SELECT event_type, profile, actor_id, created_at,
+           max(created_at) OVER (PARTITION BY ticket_number ORDER BY id ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS previous_at
+    FROM ticket_events
+)
+WHERE event_type IN ('approval', 'observation')
+"""
+
+REBUILD = [
+    "DELETE FROM stats_status",
+    "DELETE FROM stats_daily",
+    "DELETE FROM stats_durations",
+    """
+    INSERT INTO stats_status (motive_submotive, ticket_status, total)
+    SELECT coalesce(motive_submotive, ''), ticket_status, count(*) FROM tickets GROUP BY 1, 2
+    """,
+    """
+    INSERT INTO stats_daily (day, motive_submotive, opened, closed)
+    SELECT day, motive_submotive, sum(opened), sum(closed) FROM (
+        SELECT substr(opened_at, 1, 10) AS day, coalesce(motive_submotive, '') AS motive_submotive, 1 AS opened, 0 AS closed
+        FROM tickets WHERE opened_at IS NOT NULL
+        UNION ALL
+        SELECT substr(closed_at, 1, 10), coalesce(motive_submotive, ''), 0, 1
+        FROM tickets WHERE closed_at IS NOT NULL
+    )
+    GROUP BY day, motive_submotive
+    """,
+    f"""
+    INSERT INTO stats_durations (metric, key, bucket, total, seconds, min_seconds, max_seconds)
+    SELECT metric, key, {bucket_case("d")}, count(*), sum(d), min(d), max(d)
+    FROM ({durations_query})
+    WHERE d IS NOT NULL
+    GROUP BY 1, 2, 3
+    """,
+]
+
+
+# Recalcula todos os agregados a partir dos chamados e do histórico (migração e cargas em massa)
+def rebuild(connection):
+    for step in REBUILD:
+        connection.execute(step)
+
+
+status_query = """
+SELECT motive_submotive, ticket_status, total FROM stats_status
+WHERE total <> 0 AND (? IS NULL OR motive_submotive = ?)
+"""
+
+backlog_query = """
+SELECT queue, owner_id, sum(total) FROM queue_counts
+WHERE total <> 0
+GROUP BY queue, owner_id
+"""
+
+durations_stats_query = """
+SELECT metric, key, bucket, total, seconds, min_seconds, max_seconds FROM stats_durations
+WHERE ? IS NULL OR metric NOT IN ('open_to_approval', 'open_to_close') OR key = ?
+ORDER BY metric, key, bucket
+"""
+
+daily_query = """
+SELECT day, sum(opened), sum(closed) FROM stats_daily
+WHERE day >= ? AND day <= ? AND (? IS NULL OR motive_submotive = ?)
+GROUP BY day
+ORDER BY day
+"""
+
+
+# Quantil aproximado pelo histograma: interpolação linear dentro da faixa, do menor ao maior
+# valor observado passando pela média (o resultado nunca sai do intervalo observado; faixa com
+# um único valor devolve o próprio valor)
+def quantile(buckets, total, fraction):
+    target = fraction * total
+    seen = 0
+    for _, count, seconds, lowest, highest in buckets:
+        if count and seen + count >= target:
+            if lowest == highest:
+                return lowest
+            mean = min(max(seconds / count, lowest), highest)
+            position = (target - seen) / count
+            if position <= 0.5:
+                return lowest + (mean - lowest) * position * 2
+            return mean + (highest - mean) * (position - 0.5) * 2
+        seen += count
+    return None
+
+
+# Resumo de um histograma: [(faixa, quantidade, soma, menor e maior valor em segundos), ...]
+def summarize(rows):
+    total = sum(row[1] for row in rows)
+    if not total:
+        return None
+    buckets = sorted(rows)
+    return {
+        "count": total,
+        "mean_s": round(sum(row[2] for row in rows) / total, 1),
+        "p50_s": round(quantile(buckets, total, 0.5), 1),
+        "p90_s": round(quantile(buckets, total, 0.9), 1),
+    }
+
+
+def status_counts(cursor, motive_submotive=None):
+    by_status = {}
+    by_ticket_type = {}
+    for motive, ticket_status, total in cursor.execute(status_query, (motive_submotive, motive_submotive)):
+        by_status[ticket_status] = by_status.get(ticket_status, 0) + total
+        by_ticket_type.setdefault(motive, {})[ticket_status] = total
+    return {"total": sum(by_status.values()), "by_status": by_status, "by_ticket_type": by_ticket_type}
+
+
+# Chamados pendentes por fila e dono (aprovador/tratador), dos contadores das filas
+def backlog(cursor):
+    result = {}
+    for queue, owner_id, total in cursor.execute(backlog_query):
+        result.setdefault(queue, {})[str(owner_id)] = total
+    return result
+
+
+# Tempos de ciclo por métrica: total da métrica e por chave (tipo, perfil ou tratador)
+# O filtro por tipo de chamado vale para as métricas por tipo; approval e treatment são por aprovador/tratador
+def cycle_times(cursor, motive_submotive=None):
+    series = {}
+    for metric, key, bucket, total, seconds, lowest, highest in cursor.execute(durations_stats_query, (motive_submotive, motive_submotive)):
+        series.setdefault(metric, {}).setdefault(key, []).append((bucket, total, seconds, lowest, highest))
+
+    result = {}
+    for metric, keys in series.items():
+        merged = {}
+        for rows in keys.values():
+            for bucket, total, seconds, lowest, highest in rows:
+                if bucket not in merged:
+                    merged[bucket] = (total, seconds, lowest, highest)
+                    continue
+                count, sum_seconds, merged_lowest, merged_highest = merged[bucket]
+                merged[bucket] = (count + total, sum_seconds + seconds, min(merged_lowest, lowest), max(merged_highest, highest))
+        result[metric] = {
+            "all": summarize([(bucket, *merged[bucket]) for bucket in merged]),
+            "by_key": {key: summarize(rows) for key, rows in sorted(keys.items())},
+        }
+    return result
+
+
+def daily(cursor, day_from, day_to, motive_submotive=None):
+    cursor.execute(daily_query, (day_from, day_to, motive_submotive, motive_submotive))
+    return [{"day": day, "opened": opened, "closed": closed} for day, opened, closed in cursor.fetchall()]
+
+
+# Comando de linha de comando para recalcular os agregados (flask --app app rebuild-stats)
+def init_app(app, pool):
+    @app.cli.command("rebuild-stats")
+    def rebuild_stats_command():
+        """Recalcula os agregados do painel (/stats) a partir dos chamados."""
+        connection = pool.acquire()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            rebuild(connection)
+            connection.commit()
+            total = connection.execute("SELECT coalesce(sum(total), 0) FROM stats_status").fetchone()[0]
+        finally:
+            pool.release(connection)
+        click.echo(f"Agregados do painel recalculados para {total} chamados")
@@ -0,0 +1,39 @@
+#utils/bulk.py
+import json
+from flask import current_app as app
+
+
+# Erro na lista de chamados enviada para uma operação em lote
+class BulkError(ValueError):
+    pass
+
+
+# Lê {"tickets": [...]} do corpo da requisição (sem repetições, na ordem enviada)
+def parse_ticket_numbers(data):
+    tickets = data.get("tickets") if isinstance(data, dict) else None
+    if not isinstance(tickets, list) or not tickets:
+        raise BulkError("Lista de chamados é obrigatória")
+
+    max_size = app.config.get("BULK_MAX_TICKETS", 500)
+    if len(tickets) > max_size:
+        raise BulkError(f"Máximo de {max_size} chamados por operação")
+
+    try:
+        numbers = [int(ticket) for ticket in tickets]
+    except (TypeError, ValueError):
+        raise BulkError("Números de chamado inválidos")
+    return list(dict.fromkeys(numbers))
+
+
+# Parâmetro único com todos os números (usado com json_each na consulta)
+def ticket_numbers_param(numbers):
+    return json.dumps(numbers)
+
+
+# Resultado individual de cada chamado do lote
+def success(ticket_number):
+    return {"ticket": ticket_number, "success": True}
+
+
+def failure(ticket_number, error, status):
+    return {"ticket": ticket_number, "success": False, "error": error, "status": status}
@@ -0,0 +1,224 @@
+#utils/cache.py
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, request
+from werkzeug.utils import import_string
+from utils.pagination import with_next_cursor
+from utils.queues import MANAGER_APPROVER, QUEUE_APPROVAL
+
+# Cache de leitura dos chamados e das filas, invalidado pelas escritas:
+# - "ticket:<número>": linha do /ticket_detail
+# - "approval:<aprovador>:<gerente>" e "treatment:<tratador>": primeiras páginas de /pending_approvals
+#   e /processing_tickets, uma variante por query string; a fila do gerente guarda também a versão da
+#   hierarquia (org_version), já que a troca de gestor é feita pelo RH fora do app e não passa por events.stage
+# Abertura, aprovação, reprovação, tratamento e cancelamento passam por events.stage: os chamados
+# alterados e as filas em que estavam antes ou estão depois são invalidados após o commit.
+# O backend padrão fica na memória do processo: com vários workers, os demais só deixam de servir
+# o conteúdo antigo após CACHE_TTL segundos (use um backend compartilhado em CACHE_BACKEND)
+
+# Tipos de entrada (contadores de acertos e falhas por tipo)
+KIND_TICKET = "ticket"
+KIND_QUEUE = "queue"
+
+# Variantes (query strings) guardadas por fila
+QUEUE_VARIANTS = 8
+
+
+# Backend em memória: LRU com expiração por entrada
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_size=4096, ttl=30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # chave -> (valor, expiração)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_size": self.max_size, "ttl": self.ttl, "evictions": self.evictions}
+
+
+# Backends disponíveis em CACHE_BACKEND (ou "pacote.módulo:Classe" com a mesma interface do MemoryBackend)
+BACKENDS = {"memory": MemoryBackend}
+
+
+# Cache com contadores de uso e proteção contra gravar uma leitura anterior à última invalidação
+class ResponseCache:
+    def __init__(self, backend=None, enabled=True, tracked_keys=4096):
+        self.backend = backend or MemoryBackend()
+        self.enabled = enabled
+        self.tracked_keys = tracked_keys
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._last = 0
+        # Última invalidação de cada chave (limitado); chaves descartadas valem pelo piso
+        self._invalidated = OrderedDict()
+        self._floor = 0
+        self.counters = {kind: {"hits": 0, "misses": 0} for kind in (KIND_TICKET, KIND_QUEUE)}
+        self.invalidations = 0
+        self.stale_fills = 0
+
+    # Número da leitura: put só grava se a chave não foi invalidada depois dele
+    def begin(self):
+        with self._lock:
+            return self._last
+
+    def get(self, kind, key):
+        if not self.enabled:
+            return None
+        value = self.backend.get(key)
+        with self._lock:
+            self.counters[kind]["hits" if value is not None else "misses"] += 1
+        return value
+
+    def put(self, key, value, started):
+        if not self.enabled:
+            return
+        with self._lock:
+            if started < max(self._floor, self._invalidated.get(key, 0)):
+                # A escrita terminou durante a leitura: o valor lido pode estar desatualizado
+                self.stale_fills += 1
+                return
+        self.backend.set(key, value)
+
+    def invalidate(self, keys):
+        if not keys:
+            return
+        with self._lock:
+            sequence = next(self._sequence)
+            self._last = sequence
+            for key in keys:
+                self._invalidated[key] = sequence
+                self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.tracked_keys:
+                _, dropped = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, dropped)
+            self.invalidations += len(keys)
+        self.backend.delete(keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            report = {
+                "enabled": self.enabled,
+                "backend": self.backend.name,
+                "invalidations": self.invalidations,
+                "stale_fills": self.stale_fills,
+            }
+            for kind, counter in self.counters.items():
+                lookups = counter["hits"] + counter["misses"]
+                report[f"{kind}_hits"] = counter["hits"]
+                report[f"{kind}_misses"] = counter["misses"]
+                report[f"{kind}_hit_ratio"] = round(counter["hits"] / lookups, 4) if lookups else 0.0
+        report.update(self.backend.stats())
+        return report
+
+
+response_cache = ResponseCache()
+
+
+def ticket_key(ticket_number):
+    return f"ticket:{ticket_number}"
+
+
+# Identidade da fila: aprovador (e gerente, no aprovador gerente) ou tratador
+def queue_key(queue_name, owner_id, manager=""):
+    if queue_name == QUEUE_APPROVAL:
+        return f"approval:{owner_id}:{manager if owner_id == MANAGER_APPROVER else ''}"
+    return f"treatment:{owner_id}"
+
+
+# Primeira página já serializada da fila para a query string desta requisição:
+# (corpo, status, cursor da próxima página, versão) ou None
+# version: versão dos dados fora dos eventos dos chamados (org_version na fila do gerente); a página
+# guardada com outra versão não vale mais
+def cached_page(key, version=None):
+    if request.args.get("cursor"):
+        return None
+    variants = response_cache.get(KIND_QUEUE, key)
+    if variants is None:
+        return None
+    page = variants.get(request.query_string)
+    if page is None or page[3] != version:
+        return None
+    return page
+
+
+def store_page(key, started, response, status, next_cursor, version=None):
+    if request.args.get("cursor"):
+        return
+    variants = dict(response_cache.backend.get(key) or {})
+    variants[request.query_string] = (response.get_data(), status, next_cursor, version)
+    while len(variants) > QUEUE_VARIANTS:
+        variants.pop(next(iter(variants)))
+    response_cache.put(key, variants, started)
+
+
+# Resposta de uma página guardada por store_page
+def page_response(page):
+    body, status, next_cursor, _ = page
+    return with_next_cursor(current_app.response_class(body, mimetype="application/json"), next_cursor), status
+
+
+# Guarda as chaves a invalidar após o commit (chamado por events.stage no fim da transação)
+# memberships: {(fila, chamado, dono, gerente), ...} antes e depois da alteração
+def stage(ticket_numbers, memberships):
+    keys = {ticket_key(ticket_number) for ticket_number in ticket_numbers}
+    keys.update(queue_key(queue_name, owner_id, manager) for queue_name, _, owner_id, manager in memberships)
+    g.cache_invalidations = sorted(keys)
+
+
+# Invalida as chaves após o commit, mesmo em respostas de erro: invalidar uma transação
+# desfeita só custa uma nova leitura
+def invalidate_staged(response):
+    keys = g.pop("cache_invalidations", None)
+    if keys:
+        response_cache.invalidate(keys)
+    return response
+
+
+def init_app(app):
+    backend = app.config.get("CACHE_BACKEND", "memory")
+    backend_class = BACKENDS.get(backend) or import_string(backend.replace(":", "."))
+    size = app.config.get("CACHE_SIZE", 4096)
+    response_cache.backend = backend_class(max_size=size, ttl=app.config.get("CACHE_TTL", 30.0))
+    response_cache.tracked_keys = size
+    response_cache.enabled = app.config.get("CACHE_ENABLED", True)
+    app.after_request(invalidate_staged)
@@ -0,0 +1,155 @@
+#utils/catalog.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+# Tabelas do catálogo: qualquer alteração nelas incrementa catalog_version
+CATALOG_TABLES = ("ticket_types", "rejection_reasons", "cancellation_reasons")
+
+CREATE_VERSION_TABLE = [
+    """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 1)",
+]
+
+
+# Gatilhos que incrementam catalog_version a cada alteração nas tabelas
+def version_triggers(tables):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_catalog_{event.lower()} AFTER {event} ON {table} BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END
+        """
+        for table in tables
+        for event in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+CREATE_TRIGGERS = version_triggers(CATALOG_TABLES)
+
+
+# Resposta já serializada do catálogo
+class CatalogEntry:
+    def __init__(self, body, status=200):
+        self.body = body
+        self.status = status
+        self.etag = hashlib.sha1(body).hexdigest()
+
+    # Responde 304 quando o navegador já tem a mesma versão (If-None-Match)
+    def response(self):
+        response = Response(self.body, status=self.status, mimetype="application/json")
+        if self.status == 200:
+            response.set_etag(self.etag)
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.make_conditional(request)
+        return response
+
+
+# Cache em memória dos catálogos (tipos de chamado por perfil, motivos de reprovação e de cancelamento)
+class CatalogCache:
+    def __init__(self, check_interval=5.0):
+        self.check_interval = check_interval
+        self.version = None
+        self._checked_at = 0.0
+        self._ticket_types = {}
+        self._empty_ticket_types = None
+        self._rejection_reasons = None
+        self._cancel_reasons = None
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    # Registra uma função chamada (com a conexão) sempre que o catálogo é recarregado
+    def on_reload(self, listener):
+        self._listeners.append(listener)
+
+    def load(self, connection, dumps):
+        cursor = connection.cursor()
+        version = cursor.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()[0]
+
+        # Tipos de chamado agrupados por perfil
+        ticket_types = {}
+        cursor.execute("""
+            SELECT profile, ticket_type, submotive, motive_submotive, form
+            FROM ticket_types
+            ORDER BY id
+        """)
+        for profile, ticket_type, submotive, motive_submotive, form in cursor.fetchall():
+            try:
+                # Carregar o JSON do campo "form", se existir
+                form_data = json.loads(form) if form else {}
+            except json.JSONDecodeError as e:
+                logger.warning("Erro ao processar JSON do formulário: %s", e)
+                form_data = {}
+
+            ticket_types.setdefault(profile, []).append({
+                "ticket_type": ticket_type,
+                "submotive": submotive,
+                "motive_submotive": motive_submotive,
+                "form": form_data,
+            })
+
+        # Motivos de reprovação e de cancelamento
+        rejection_reasons = [row[0] for row in cursor.execute("SELECT reason FROM rejection_reasons").fetchall()]
+        cancel_reasons = [row[0] for row in cursor.execute("SELECT cancel_reasons FROM cancellation_reasons").fetchall()]
+
+        def entry(data, status=200):
+            return CatalogEntry(dumps(data, separators=(",", ":")).encode(), status)
+
+        with self._lock:
+            self._ticket_types = {profile: entry(data) for profile, data in ticket_types.items()}
+            self._empty_ticket_types = entry([])
+            self._rejection_reasons = (
+                entry({"rejection_reasons": rejection_reasons}) if rejection_reasons
+                else entry({"error": "Nenhum motivo de reprovação encontrado"}, 404)
+            )
+            self._cancel_reasons = (
+                entry({"cancel_reasons": cancel_reasons}) if cancel_reasons
+                else entry({"error": "Nenhum motivo de cancelamento encontrado"}, 404)
+            )
+            self.version = version
+            self._checked_at = time.monotonic()
+
+        for listener in self._listeners:
+            listener(connection)
+
+    # Recarrega o catálogo se a versão no banco mudou (verificada no máximo a cada check_interval)
+    def refresh(self, connection, dumps):
+        if self.version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        version = connection.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()[0]
+        if version != self.version:
+            self.load(connection, dumps)
+        else:
+            self._checked_at = time.monotonic()
+
+    def ticket_types(self, profile):
+        return self._ticket_types.get(profile, self._empty_ticket_types)
+
+    def rejection_reasons(self):
+        return self._rejection_reasons
+
+    def cancel_reasons(self):
+        return self._cancel_reasons
+
+
+catalog = CatalogCache()
+
+
+# Carrega o catálogo na inicialização
+def init_app(app, pool):
+    catalog.check_interval = app.config.get("CATALOG_CHECK_INTERVAL", 5.0)
+    connection = pool.acquire()
+    try:
+        catalog.load(connection, app.json.dumps)
+    finally:
+        pool.release(connection)
@@ -0,0 +1,208 @@
+#utils/events.py
+import asyncio
+import json
+import queue
+import threading
+from flask import g
+from utils import cache
+from utils.bulk import ticket_numbers_param
+from utils.queues import MANAGER_APPROVER, QUEUE_APPROVAL
+
+# Notificações enviadas pelo canal /events (Server-Sent Events)
+ACTION_ENTER = "enter"
+ACTION_LEAVE = "leave"
+
+# Evento enviado quando o buffer do assinante transbordou: o cliente deve recarregar as filas
+EVENT_RESYNC = "resync"
+
+# Filas em que os chamados informados estão agora (lidas das filas materializadas)
+queue_membership_query = """
+SELECT 'approval', ticket_number, approver_id, manager
+FROM approval_queue
+WHERE ticket_number IN (SELECT value FROM json_each(?))
+UNION ALL
+SELECT 'treatment', ticket_number, treatment_id, ''
+FROM treatment_queue
+WHERE ticket_number IN (SELECT value FROM json_each(?))
+"""
+
+
+# Assinante do canal: recebe apenas as notificações das próprias filas, em um buffer limitado
+class Subscription:
+    def __init__(self, identity, buffer_size=100):
+        self.approver_id = identity.get("approver_id")
+        self.treatment_id = identity.get("treatment_id")
+        self.register = str(identity.get("user"))
+        self._buffer = queue.Queue(maxsize=buffer_size)
+        self.dropped = 0
+
+    # A notificação é da fila de aprovação ou de tratamento deste usuário?
+    def matches(self, change):
+        if change["queue"] == QUEUE_APPROVAL:
+            if not self.approver_id or change["owner_id"] != self.approver_id:
+                return False
+            return self.approver_id != MANAGER_APPROVER or change["manager"] == self.register
+        return bool(self.treatment_id) and change["owner_id"] == self.treatment_id
+
+    def put(self, message):
+        try:
+            self._buffer.put_nowait(message)
+        except queue.Full:
+            # Cliente lento: descarta o buffer e pede uma nova leitura completa das filas
+            self.dropped += 1
+            self._drain()
+            self._buffer.put_nowait({"event": EVENT_RESYNC})
+
+    # Próxima notificação ou None se nada chegou dentro do tempo (envio do heartbeat)
+    def get(self, timeout):
+        try:
+            return self._buffer.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _drain(self):
+        while True:
+            try:
+                self._buffer.get_nowait()
+            except queue.Empty:
+                return
+
+
+# Assinante servido pelo laço asyncio (asgi.py): a publicação vem das threads das requisições
+# e é entregue ao laço com call_soon_threadsafe, sem ocupar uma thread por conexão
+class AsyncSubscription(Subscription):
+    def __init__(self, identity, buffer_size=100, loop=None):
+        super().__init__(identity, buffer_size)
+        self._loop = loop
+        self._buffer = asyncio.Queue(maxsize=buffer_size)
+        self.closed = False
+
+    def put(self, message):
+        try:
+            self._loop.call_soon_threadsafe(self._put_local, message)
+        except RuntimeError:
+            # Laço já encerrado (servidor em desligamento)
+            pass
+
+    def _put_local(self, message):
+        try:
+            self._buffer.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self._drain()
+            self._buffer.put_nowait({"event": EVENT_RESYNC})
+
+    # Encerra a espera de get() quando o cliente desconecta (chamado no próprio laço)
+    def close(self):
+        self.closed = True
+        self._drain()
+        self._buffer.put_nowait(None)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._buffer.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _drain(self):
+        while True:
+            try:
+                self._buffer.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+
+# Pub/sub em memória do processo: cada publicação é copiada para os assinantes interessados
+class Broker:
+    def __init__(self, buffer_size=100, max_subscribers=1000):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    # Retorna a assinatura ou None se o limite de conexões foi atingido
+    def subscribe(self, identity, loop=None):
+        if loop is None:
+            subscription = Subscription(identity, self.buffer_size)
+        else:
+            subscription = AsyncSubscription(identity, self.buffer_size, loop)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, changes):
+        if not changes:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += len(changes)
+
+        for subscription in subscribers:
+            for change in changes:
+                if subscription.matches(change):
+                    subscription.put({"event": "queue", "data": {
+                        "queue": change["queue"], "action": change["action"], "ticket": change["ticket"],
+                    }})
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped": sum(subscription.dropped for subscription in self._subscribers),
+            }
+
+
+broker = Broker()
+
+
+# Somente usuários com fila de aprovação ou de tratamento recebem notificações
+def has_queue(identity):
+    return bool(identity.get("approver_id") or identity.get("treatment_id"))
+
+
+# Filas em que os chamados estão agora: {(fila, chamado, dono, gerente), ...}
+def snapshot(cursor, ticket_numbers):
+    param = ticket_numbers_param(ticket_numbers)
+    cursor.execute(queue_membership_query, (param, param))
+    return {tuple(row) for row in cursor.fetchall()}
+
+
+# Compara as filas antes e depois da alteração e guarda as mudanças para publicar após o commit
+# Chamado no fim do trabalho da transação: uma nova tentativa substitui as mudanças anteriores
+def stage(cursor, ticket_numbers, before):
+    after = snapshot(cursor, ticket_numbers)
+    changes = [
+        {"queue": queue_name, "ticket": ticket_number, "owner_id": owner_id, "manager": manager, "action": action}
+        for action, entries in ((ACTION_LEAVE, before - after), (ACTION_ENTER, after - before))
+        for queue_name, ticket_number, owner_id, manager in sorted(entries)
+    ]
+    g.queue_changes = changes
+    cache.stage(ticket_numbers, before | after)
+
+
+# Publica as mudanças das requisições bem-sucedidas (a transação já foi confirmada)
+def publish_staged(response):
+    changes = g.pop("queue_changes", None)
+    if changes and response.status_code < 400:
+        broker.publish(changes)
+    return response
+
+
+# Formato text/event-stream de uma notificação
+def format_event(message):
+    data = json.dumps(message.get("data", {}), ensure_ascii=False)
+    return f"event: {message['event']}\ndata: {data}\n\n"
+
+
+def init_app(app):
+    broker.buffer_size = app.config.get("EVENTS_BUFFER_SIZE", 100)
+    broker.max_subscribers = app.config.get("EVENTS_MAX_SUBSCRIBERS", 1000)
+    app.after_request(publish_staged)
@@ -0,0 +1,132 @@
+#utils/forms.py
+import json
+import zlib
+
+# Formulários dos chamados gravados uma única vez em JSON compacto (tickets.form_data):
+# - formulários pequenos ficam em texto e vão para a resposta como estão, sem json.loads/json.dumps
+# - a partir de compress_min_size bytes o JSON é comprimido (deflate) com um dicionário por conjunto
+#   de campos (form_schemas, referenciado por tickets.form_schema): os nomes dos campos, que se
+#   repetem em todos os chamados do mesmo tipo, ficam no dicionário e cada chamado guarda só o que muda
+#
+# A leitura (FORM_TEXT / FORM_JSON) devolve sempre o texto JSON, que vai para a resposta sem
+# json.loads/json.dumps; a descompressão só acontece quando o campo form é pedido e o formulário foi comprimido
+#
+# form_text não aparece nos gatilhos de tickets (qualquer conexão grava na tabela): o índice de busca
+# dos formulários comprimidos é gravado pelo app com o texto de encode (search.index_forms)
+
+# Dicionário dos formulários que não são objetos JSON
+NON_OBJECT_DICTIONARY = b"null"
+
+CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS form_schemas (
+        id INTEGER PRIMARY KEY,
+        dictionary BLOB NOT NULL UNIQUE
+    )
+    """,
+]
+
+# Tamanho (bytes do JSON compacto) a partir do qual o formulário é comprimido
+compress_min_size = 256
+
+# Texto JSON do formulário de um chamado (expressão SQL; NULL sem formulário)
+FORM_TEXT = """CASE WHEN typeof({row}.form_data) = 'blob'
+    THEN form_text((SELECT dictionary FROM form_schemas WHERE id = {row}.form_schema), {row}.form_data)
+    ELSE {row}.form_data END"""
+
+# Formulário como valor JSON dentro de json_object (objeto vazio sem formulário)
+FORM_JSON = "json(coalesce(" + FORM_TEXT + ", '{{}}'))"
+
+select_schema_query = "SELECT id FROM form_schemas WHERE dictionary = ?"
+
+insert_schema_query = """
+INSERT INTO form_schemas (dictionary) VALUES (?)
+ON CONFLICT (dictionary) DO NOTHING
+"""
+
+# Esquemas já gravados (linhas de form_schemas nunca mudam nem são apagadas)
+_schema_ids = {}
+
+
+# JSON compacto em UTF-8, como as respostas (json_provider)
+def compact(form):
+    return json.dumps(form, ensure_ascii=False, separators=(",", ":"))
+
+
+# Dicionário de compressão do formulário: os campos, na ordem enviada, com valores vazios
+def schema_dictionary(form):
+    if not isinstance(form, dict):
+        return NON_OBJECT_DICTIONARY
+    return compact({field: "" for field in form}).encode()
+
+
+def compress(text, dictionary):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    return compressor.compress(text.encode()) + compressor.flush()
+
+
+# Função SQL form_text(dicionário, dados): texto JSON do formulário comprimido
+def form_text(dictionary, data):
+    if dictionary is None or data is None:
+        return None
+    decompressor = zlib.decompressobj(-15, dictionary)
+    return (decompressor.decompress(data) + decompressor.flush()).decode()
+
+
+# Registra form_text na conexão (consultas das rotas que leem form_data comprimido)
+def register(connection):
+    connection.create_function("form_text", 2, form_text, deterministic=True)
+
+
+# Id do esquema do dicionário, criado se ainda não existir (dentro da transação de escrita)
+def schema_id(cursor, dictionary):
+    cached = _schema_ids.get(dictionary)
+    if cached is not None:
+        return cached
+    row = cursor.execute(select_schema_query, (dictionary,)).fetchone()
+    if row is not None:
+        # Só esquemas já confirmados entram no cache (um INSERT pode ser desfeito com a transação)
+        _schema_ids[dictionary] = row[0]
+        return row[0]
+    cursor.execute(insert_schema_query, (dictionary,))
+    return cursor.execute(select_schema_query, (dictionary,)).fetchone()[0]
+
+
+# Texto JSON (índice de busca) e valores das colunas form_schema e form_data do formulário enviado
+def encode(cursor, form):
+    text = compact(form)
+    if len(text) < compress_min_size:
+        return text, None, text
+    dictionary = schema_dictionary(form)
+    return text, schema_id(cursor, dictionary), compress(text, dictionary)
+
+
+# Migração: comprime o form (texto JSON) dos chamados existentes em blocos
+def backfill(connection, batch_size=5000):
+    last = 0
+    while True:
+        rows = connection.execute(
+            "SELECT ticket_number, form FROM tickets WHERE ticket_number > ? ORDER BY ticket_number LIMIT ?",
+            (last, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        updates = []
+        for ticket_number, text in rows:
+            if text is None:
+                updates.append((None, None, ticket_number))
+                continue
+            try:
+                form = json.loads(text)
+            except ValueError:
+                # Texto que não é JSON fica preservado como string JSON
+                form = text
+            _, form_schema, form_data = encode(connection, form)
+            updates.append((form_schema, form_data, ticket_number))
+        connection.executemany("UPDATE tickets SET form_schema = ?, form_data = ? WHERE ticket_number = ?", updates)
+        last = rows[-1][0]
+
+
+def init_app(app):
+    global compress_min_size
+    compress_min_size = app.config.get("FORM_COMPRESS_MIN_SIZE", 256)
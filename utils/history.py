@@ -0,0 +1,126 @@
+#utils/history.py
+import re
+from utils import timestamps
+
+# Tipos de evento do histórico dos chamados
+EVENT_OPEN = "open"
+EVENT_APPROVAL = "approval"
+EVENT_REJECTION = "rejection"
+EVENT_OBSERVATION = "observation"
+EVENT_CANCEL = "cancel"
+
+# Eventos que compõem o texto de observações do tratamento
+OBSERVATION_EVENTS = (EVENT_OBSERVATION, EVENT_CANCEL)
+
+# Histórico somente de inserção: um registro por abertura, aprovação, reprovação, observação e cancelamento
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS ticket_events (
+    id INTEGER PRIMARY KEY,
+    ticket_number INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    actor_id INTEGER,
+    user INTEGER,
+    profile TEXT,
+    message TEXT,
+    created TEXT NOT NULL,
+    created_at TEXT
+)
+"""
+
+CREATE_INDEX = "CREATE INDEX IF NOT EXISTS idx_ticket_events_ticket ON ticket_events (ticket_number, id)"
+
+insert_event_query = """
+INSERT INTO ticket_events (ticket_number, event_type, actor_id, user, profile, message, created, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+observations_query = f"""
+SELECT actor_id, user, profile, message, created
+FROM ticket_events
+WHERE ticket_number = ? AND event_type IN ({", ".join("?" for _ in OBSERVATION_EVENTS)})
+ORDER BY id
+"""
+
+# Linha do antigo treatment_observation: "[data] Tratador <id> <usuário> <perfil>: <texto>"
+OBSERVATION_LINE = re.compile(r"^\[(?P<created>[^\]]+)\] Tratador (?P<actor_id>\S+) (?P<user>\S+) (?P<profile>\S+): (?P<message>.*)$")
+
+
+# Linha de evento pronta para insert_event_query
+def event(ticket_number, event_type, stamp, actor_id=None, user=None, profile=None, message=None):
+    return (ticket_number, event_type, actor_id, user, profile, message, stamp.display, stamp.iso)
+
+
+# Grava os eventos na mesma transação da alteração do chamado
+def record(cursor, events):
+    cursor.executemany(insert_event_query, events)
+
+
+# Linha de observação no mesmo formato exibido antes do histórico
+def format_observation(actor_id, user, profile, message, created):
+    return f"[{created}] Tratador {actor_id} {user} {profile}: {message}"
+
+
+# Monta o texto de observações do chamado a partir do histórico (None se não houver)
+def observation_text(cursor, ticket_number):
+    cursor.execute(observations_query, (ticket_number, *OBSERVATION_EVENTS))
+    lines = [format_observation(*row) for row in cursor.fetchall()]
+    return "\n".join(lines) or None
+
+
+# Identificadores gravados no texto antigo voltam a ser inteiros
+def as_int(value):
+    return int(value) if value.isdigit() else value
+
+
+# Converte treatment_observation e tickets_approvals dos chamados existentes em eventos (passo da migração)
+def backfill(connection):
+    events = []
+
+    for ticket_number, user, ticket_open_date_time, opened_at in connection.execute(
+        "SELECT ticket_number, user, ticket_open_date_time, opened_at FROM tickets"
+    ):
+        events.append((ticket_number, EVENT_OPEN, None, user, None, None, ticket_open_date_time, opened_at))
+
+    approvals = connection.execute("""
+        SELECT tickets_approvals.ticket_number, approver_id, approver_profile, date_time_approval, approved_at,
+               rejected_id, repprover_profile, date_time_rejection, rejected_at, tickets.rejection_reason
+        FROM tickets_approvals
+        JOIN tickets ON tickets.ticket_number = tickets_approvals.ticket_number
+    """).fetchall()
+    for (ticket_number, approver_id, approver_profile, date_time_approval, approved_at,
+         rejected_id, repprover_profile, date_time_rejection, rejected_at, rejection_reason) in approvals:
+        if approver_id is not None:
+            events.append((ticket_number, EVENT_APPROVAL, approver_id, None, approver_profile, None,
+                           date_time_approval or "", approved_at))
+        if rejected_id is not None:
+            events.append((ticket_number, EVENT_REJECTION, rejected_id, None, repprover_profile, rejection_reason,
+                           date_time_rejection or "", rejected_at))
+
+    tickets = connection.execute("""
+        SELECT ticket_number, treatment_observation, cancellation_reason
+        FROM tickets
+        WHERE treatment_observation <> ''
+    """).fetchall()
+    for ticket_number, observation, cancellation_reason in tickets:
+        observations = []
+        for line in observation.splitlines():
+            parsed = OBSERVATION_LINE.match(line)
+            if parsed:
+                observations.append([
+                    ticket_number, EVENT_OBSERVATION, as_int(parsed["actor_id"]), as_int(parsed["user"]), parsed["profile"],
+                    parsed["message"], parsed["created"], timestamps.to_iso(parsed["created"]),
+                ])
+            elif observations:
+                # Continuação de uma observação com quebra de linha
+                observations[-1][5] += "\n" + line
+            elif line.strip():
+                # Texto fora do formato padrão é mantido como observação sem autor
+                observations.append([ticket_number, EVENT_OBSERVATION, None, None, None, line, "", None])
+        # O cancelamento era gravado como a última observação, com o motivo do cancelamento
+        if observations and cancellation_reason and observations[-1][5] == cancellation_reason:
+            observations[-1][1] = EVENT_CANCEL
+        events.extend(tuple(item) for item in observations)
+
+    # Inseridos em ordem cronológica para que o id siga a ordem do histórico
+    events.sort(key=lambda item: (item[7] or "", item[0]))
+    connection.executemany(insert_event_query, events)
@@ -0,0 +1,193 @@
+#utils/instrumentation.py
+import functools
+import logging
+import time
+from flask import g, request
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Rotas sem endpoint (404) ficam agrupadas para não criar uma série por caminho
+UNMATCHED_ENDPOINT = "unmatched"
+
+# Instrumentação ativa (METRICS_ENABLED); desligada, get_connection entrega a conexão sem o invólucro
+enabled = True
+slow_threshold = 0.1
+
+
+# Um comando SQL executado na requisição: tempo de execução + leitura das linhas
+class Statement:
+    __slots__ = ("operation", "sql", "duration", "rows")
+
+    def __init__(self, sql, duration, rows):
+        self.operation = operation(sql)
+        self.sql = sql
+        self.duration = duration
+        self.rows = rows
+
+
+# Tipo do comando (SELECT, INSERT, UPDATE, DELETE, BEGIN...), usado como rótulo das métricas
+# Os comandos das rotas são constantes do módulo: o resultado fica em cache por texto
+@functools.lru_cache(maxsize=1024)
+def operation(sql):
+    words = sql.lstrip().split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+# Cursor que mede cada comando: no SQLite as linhas são produzidas durante a leitura,
+# então o tempo dos fetch* é somado ao comando que as gerou
+class InstrumentedCursor:
+    __slots__ = ("_cursor", "_statements", "_current")
+
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+        self._current = None
+
+    def _executed(self, sql, started):
+        statement = Statement(sql, time.perf_counter() - started, max(self._cursor.rowcount, 0))
+        self._statements.append(statement)
+        self._current = statement
+
+    def _fetched(self, started, rows):
+        if self._current is not None:
+            self._current.duration += time.perf_counter() - started
+            self._current.rows += rows
+
+    def execute(self, sql, *parameters):
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(sql, *parameters)
+        finally:
+            self._executed(sql, started)
+        return self
+
+    def executemany(self, sql, parameters):
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(sql, parameters)
+        finally:
+            self._executed(sql, started)
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *size):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(*size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# Conexão do pool vista pelas rotas: cursores instrumentados e tempo do commit
+class InstrumentedConnection:
+    __slots__ = ("connection", "statements")
+
+    def __init__(self, connection, statements):
+        self.connection = connection
+        self.statements = statements
+
+    def cursor(self):
+        return InstrumentedCursor(self.connection.cursor(), self.statements)
+
+    def execute(self, sql, *parameters):
+        return self.cursor().execute(sql, *parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            self.connection.commit()
+        finally:
+            self.statements.append(Statement("COMMIT", time.perf_counter() - started, 0))
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+# Envolve a conexão emprestada do pool; os comandos ficam em g até o fim da requisição
+def wrap(connection):
+    if not enabled:
+        return connection
+    statements = g.setdefault("sql_statements", [])
+    return InstrumentedConnection(connection, statements)
+
+
+def unwrap(connection):
+    return connection.connection if isinstance(connection, InstrumentedConnection) else connection
+
+
+def endpoint_label():
+    return request.endpoint or UNMATCHED_ENDPOINT
+
+
+def start_request():
+    g.request_started = time.perf_counter()
+
+
+# Tempo da rota (sem o envio de respostas em stream) e resumo no cabeçalho Server-Timing
+def finish_request(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = endpoint_label()
+    metrics.request_duration.observe((endpoint, request.method), elapsed)
+    metrics.requests_total.inc((endpoint, request.method, str(response.status_code)))
+
+    statements = g.get("sql_statements") or []
+    database_time = sum(statement.duration for statement in statements)
+    response.headers["Server-Timing"] = (
+        f'app;dur={elapsed * 1000:.2f}, db;dur={database_time * 1000:.2f};desc="{len(statements)} sql"'
+    )
+    return response
+
+
+# Comandos SQL da requisição (inclusive os executados durante o stream da resposta)
+def record_statements(exception=None):
+    statements = g.pop("sql_statements", None)
+    if statements is None:
+        return
+    endpoint = endpoint_label()
+    metrics.request_sql_statements.observe((endpoint,), len(statements))
+    for statement in statements:
+        labels = (endpoint, statement.operation)
+        metrics.sql_duration.observe(labels, statement.duration)
+        metrics.sql_rows.observe(labels, statement.rows)
+        if statement.duration >= slow_threshold:
+            metrics.slow_statements_total.inc(labels)
+            logger.warning("Consulta SQL lenta", extra={
+                "sql": " ".join(statement.sql.split()),
+                "duration_ms": round(statement.duration * 1000, 3),
+                "rows": statement.rows,
+            })
+
+
+def init_app(app):
+    global enabled, slow_threshold
+    enabled = app.config.get("METRICS_ENABLED", True)
+    slow_threshold = app.config.get("SQL_SLOW_THRESHOLD", 0.1)
+    if not enabled:
+        return
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.teardown_request(record_statements)
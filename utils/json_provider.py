@@ -0,0 +1,53 @@
+#utils/json_provider.py
+import datetime
+import decimal
+import orjson
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+# Serialização JSON do app (jsonify, request.get_json, catálogo) com orjson em vez do json da biblioteca padrão
+# - saída sempre compacta e em UTF-8 (sem escapes \uXXXX), inclusive em modo debug
+# - chaves ordenadas, como no provedor padrão do Flask
+# - JSON já pronto (linhas montadas pelo SQLite, formulários dos chamados) entra como fragmento,
+#   copiado para a saída sem ser decodificado
+
+
+# JSON já codificado, inserido como está na resposta
+def fragment(text):
+    return orjson.Fragment(text)
+
+
+# Tipos que o orjson não serializa, no mesmo formato do provedor padrão do Flask
+def _default(value):
+    if isinstance(value, datetime.date):
+        return http_date(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ORJSONProvider(JSONProvider):
+    sort_keys = True
+    mimetype = "application/json"
+
+    def _options(self, sort_keys):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return options | orjson.OPT_SORT_KEYS if sort_keys else options
+
+    # Aceita os argumentos do json.dumps; só sort_keys muda a saída
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._options(kwargs.get("sort_keys", self.sort_keys))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._options(self.sort_keys) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_app(app):
+    app.json = ORJSONProvider(app)
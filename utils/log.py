@@ -0,0 +1,69 @@
+#utils/log.py
+import json
+import logging
+import sys
+from flask import g, has_request_context, request
+
+# Formatos de saída: texto (desenvolvimento) ou uma linha JSON por registro (coletores de log)
+LOG_FORMATS = ("text", "json")
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(endpoint)s] %(message)s"
+
+# Atributos padrão do LogRecord; os demais vieram de extra={...} e são campos estruturados
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "endpoint", "user"}
+
+
+# Anexa a rota e o usuário da requisição atual a cada registro
+class RequestContextFilter(logging.Filter):
+    def filter(self, record):
+        if has_request_context():
+            record.endpoint = request.endpoint or request.path
+            identity = g.get("identity")
+            record.user = identity.get("user") if identity else None
+        else:
+            record.endpoint = "-"
+            record.user = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "endpoint": record.endpoint,
+            "user": record.user,
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in STANDARD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = super().format(record)
+        fields = {key: value for key, value in vars(record).items() if key not in STANDARD_ATTRIBUTES}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+# Configura o log da aplicação (stderr) com o nível de LOG_LEVEL e o formato de LOG_FORMAT
+def init_app(app):
+    log_format = app.config.get("LOG_FORMAT", "text")
+    if log_format not in LOG_FORMATS:
+        raise RuntimeError(f"LOG_FORMAT inválido: {log_format} (aceitos: {', '.join(LOG_FORMATS)})")
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(RequestContextFilter())
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    # Recarregar o app (testes, flask shell) não duplica o handler
+    for existing in [h for h in root.handlers if getattr(h, "servicedesk", False)]:
+        root.removeHandler(existing)
+    handler.servicedesk = True
+    root.addHandler(handler)
+    root.setLevel(app.config.get("LOG_LEVEL", "INFO").upper())
@@ -0,0 +1,145 @@
+#utils/metrics.py
+import bisect
+import threading
+
+# Métricas do processo no formato de texto do Prometheus (GET /metrics)
+# Com vários workers (serve.py) cada processo tem as próprias séries: o Prometheus
+# deve coletar cada worker ou somar as séries por instância
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites dos histogramas: latência em segundos e quantidade de linhas
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value):
+    if isinstance(value, float) and value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, description, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [contagens por faixa..., soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            # As faixas do Prometheus são cumulativas (le = menor ou igual)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = format_labels(self.labelnames, labels, [f'le="{format_value(float(bound))}"'])
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(values[-2])}"
+            yield f"{self.name}_count{format_labels(self.labelnames, labels)} {values[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, description, labelnames=()):
+        metric = Counter(name, description, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, description, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, description, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Valores instantâneos (pool, fila de escrita...) lidos no momento da coleta: {nome: valor}
+def render_gauges(prefix, description, values):
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        name = f"{prefix}_{key}"
+        lines.append(f"# HELP {name} {description}: {key}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {format_value(value)}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+registry = Registry()
+
+# Requisições HTTP por rota
+request_duration = registry.histogram(
+    "servicedesk_request_duration_seconds", "Tempo de resposta das requisições", ("endpoint", "method"),
+)
+requests_total = registry.counter(
+    "servicedesk_requests_total", "Requisições atendidas", ("endpoint", "method", "status"),
+)
+
+# Consultas SQL atribuídas à rota que as executou
+sql_duration = registry.histogram(
+    "servicedesk_sql_duration_seconds", "Tempo de execução e leitura de cada comando SQL", ("endpoint", "operation"),
+)
+sql_rows = registry.histogram(
+    "servicedesk_sql_rows", "Linhas lidas ou alteradas por comando SQL", ("endpoint", "operation"), ROW_BUCKETS,
+)
+request_sql_statements = registry.histogram(
+    "servicedesk_request_sql_statements", "Comandos SQL por requisição", ("endpoint",), COUNT_BUCKETS,
+)
+slow_statements_total = registry.counter(
+    "servicedesk_sql_slow_statements_total", "Comandos SQL acima de SQL_SLOW_THRESHOLD", ("endpoint", "operation"),
+)
@@ -0,0 +1,219 @@
+#utils/org.py
+import json
+import threading
+from collections import OrderedDict
+
+# Hierarquia de gestores em tabela de fechamento (closure table): uma linha para cada par
+# (gestor, subordinado) em qualquer nível, inclusive a própria pessoa (depth 0)
+#
+# O vínculo é pela matrícula (general_data.manager_register). A coluna manager continua
+# com o nome vindo do RH; a matrícula é resolvida pelo nome somente quando ele é único,
+# e pode ser informada diretamente pela carga do RH quando houver homônimos
+#
+# Os gatilhos em general_data mantêm org_closure a cada inclusão, troca de gestor e
+# exclusão; a lista de subordinados de cada gerente fica em cache (ReportsCache) enquanto
+# org_version não muda, e os gatilhos de queues.MANAGER_TRIGGERS levam as aprovações pendentes
+# para o novo gestor direto
+
+# Limite de níveis na reconstrução (protege contra ciclos nos dados existentes)
+ORG_MAX_DEPTH = 64
+
+CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS org_closure (
+        ancestor INTEGER NOT NULL,
+        descendant INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY (ancestor, descendant)
+    ) WITHOUT ROWID
+    """,
+    # Gestores de uma pessoa (gestor direto: depth = 1) e movimentação de subárvores
+    "CREATE INDEX IF NOT EXISTS idx_org_closure_descendant ON org_closure (descendant, depth, ancestor)",
+    "CREATE INDEX IF NOT EXISTS idx_general_data_manager_register ON general_data (manager_register)",
+]
+
+# Matrícula da pessoa com o nome informado, somente se não houver homônimos (expressão SQL)
+RESOLVE_MANAGER = """(
+    SELECT min(named.register) FROM general_data AS named WHERE named.name = {name} HAVING count(*) = 1
+)"""
+
+# Matrícula do gestor direto do solicitante, como texto ('' sem gestor) (expressão SQL)
+DIRECT_MANAGER = """coalesce((
+    SELECT CAST(ancestor AS TEXT) FROM org_closure WHERE descendant = {row}.user AND depth = 1
+), '')"""
+
+# Subordinados em qualquer nível, incluindo o próprio gestor
+REPORTS = "SELECT descendant FROM org_closure WHERE ancestor = ?"
+
+# Versão da hierarquia: incrementada a cada alteração em org_closure (valida o cache por gestor)
+CREATE_VERSION_TABLE = [
+    """
+    CREATE TABLE IF NOT EXISTS org_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO org_version (id, version) VALUES (1, 1)",
+]
+
+VERSION_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS org_closure_version_{event.lower()} AFTER {event} ON org_closure BEGIN
+        UPDATE org_version SET version = version + 1 WHERE id = 1;
+    END
+    """
+    for event in ("INSERT", "DELETE")
+]
+
+version_query = "SELECT version FROM org_version WHERE id = 1"
+
+
+def current_version(cursor):
+    return cursor.execute(version_query).fetchone()[0]
+
+# A partir deste tamanho de equipe a listagem percorre os chamados na ordem e testa o conjunto
+# de subordinados, em vez de buscar e ordenar todos os chamados de cada um deles
+large_department = 500
+
+# Quem apontava para o nome da pessoa sem matrícula resolvida passa a apontar para ela
+ADOPT_REPORTS = f"""
+        UPDATE general_data SET manager_register = new.register
+        WHERE manager = new.name AND manager_register IS NULL AND register <> new.register
+          AND {RESOLVE_MANAGER.format(name="new.name")} = new.register;
+"""
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS general_data_org_insert AFTER INSERT ON general_data BEGIN
+        INSERT INTO org_closure (ancestor, descendant, depth) VALUES (new.register, new.register, 0);
+        -- Gestor informado pela matrícula
+        INSERT INTO org_closure (ancestor, descendant, depth)
+        SELECT ancestor, new.register, depth + 1 FROM org_closure WHERE descendant = new.manager_register;
+        -- Gestor informado só pelo nome (o vínculo é feito pelo gatilho de troca de gestor)
+        UPDATE general_data SET manager_register = {RESOLVE_MANAGER.format(name="new.manager")}
+        WHERE register = new.register AND manager_register IS NULL;
+        {ADOPT_REPORTS}
+    END
+    """,
+    # Troca de gestor: a subárvore da pessoa sai dos gestores antigos e entra nos novos
+    """
+    CREATE TRIGGER IF NOT EXISTS general_data_org_move AFTER UPDATE OF manager_register ON general_data
+    WHEN old.manager_register IS NOT new.manager_register BEGIN
+        SELECT RAISE(ABORT, 'Hierarquia inválida: o gestor é subordinado do colaborador')
+        WHERE EXISTS (SELECT 1 FROM org_closure WHERE ancestor = new.register AND descendant = new.manager_register);
+        DELETE FROM org_closure
+        WHERE descendant IN (SELECT descendant FROM org_closure WHERE ancestor = new.register)
+          AND ancestor IN (SELECT ancestor FROM org_closure WHERE descendant = new.register AND depth > 0);
+        INSERT INTO org_closure (ancestor, descendant, depth)
+        SELECT above.ancestor, below.descendant, above.depth + below.depth + 1
+        FROM org_closure AS above, org_closure AS below
+        WHERE above.descendant = new.manager_register AND below.ancestor = new.register;
+    END
+    """,
+    # Troca do nome do gestor sem a matrícula na mesma alteração: resolve pelo novo nome
+    f"""
+    CREATE TRIGGER IF NOT EXISTS general_data_org_manager AFTER UPDATE OF manager ON general_data
+    WHEN old.manager IS NOT new.manager AND old.manager_register IS new.manager_register BEGIN
+        UPDATE general_data SET manager_register = {RESOLVE_MANAGER.format(name="new.manager")}
+        WHERE register = new.register;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS general_data_org_name AFTER UPDATE OF name ON general_data
+    WHEN old.name IS NOT new.name BEGIN
+        {ADOPT_REPORTS}
+    END
+    """,
+    # Exclusão: os subordinados diretos ficam sem gestor até a próxima carga do RH
+    """
+    CREATE TRIGGER IF NOT EXISTS general_data_org_delete AFTER DELETE ON general_data BEGIN
+        UPDATE general_data SET manager_register = NULL WHERE manager_register = old.register;
+        DELETE FROM org_closure WHERE descendant = old.register OR ancestor = old.register;
+    END
+    """,
+]
+
+# Cadeia de gestores de cada pessoa a partir de manager_register
+chain_query = f"""
+WITH RECURSIVE chain (ancestor, descendant, depth) AS (
+    SELECT register, register, 0 FROM general_data
+    UNION ALL
+    SELECT person.manager_register, chain.descendant, chain.depth + 1
+    FROM chain JOIN general_data AS person ON person.register = chain.ancestor
+    WHERE person.manager_register IS NOT NULL AND chain.depth < {ORG_MAX_DEPTH}
+)
+"""
+
+REBUILD = [
+    # Matrícula resolvida pelo nome só onde falta ou não corresponde mais ao nome do gestor
+    f"""
+    UPDATE general_data SET manager_register = {RESOLVE_MANAGER.format(name="general_data.manager")}
+    WHERE manager_register IS NULL OR NOT EXISTS (
+        SELECT 1 FROM general_data AS current
+        WHERE current.register = general_data.manager_register AND current.name = general_data.manager
+    )
+    """,
+    # Ciclos nos dados do RH (A gerido por B e B por A): as pessoas do ciclo ficam sem gestor
+    f"""
+    UPDATE general_data SET manager_register = NULL
+    WHERE register IN ({chain_query} SELECT descendant FROM chain WHERE ancestor = descendant AND depth > 0)
+    """,
+    "DELETE FROM org_closure",
+    f"""
+    INSERT INTO org_closure (ancestor, descendant, depth)
+    {chain_query} SELECT ancestor, descendant, depth FROM chain
+    """,
+]
+
+
+# Recalcula matrículas dos gestores e a hierarquia completa (migração e cargas em massa do RH)
+def rebuild(connection):
+    for step in REBUILD:
+        connection.execute(step)
+
+
+# Subordinados de cada gestor em memória (conjunto e JSON para o filtro SQL), válidos enquanto
+# org_version não muda: a cada uso só a versão é lida do banco, em vez de percorrer org_closure
+class ReportsCache:
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # gestor -> (versão, subordinados, JSON dos subordinados)
+        self._lock = threading.Lock()
+
+    def get(self, cursor, register):
+        version = current_version(cursor)
+        with self._lock:
+            entry = self._entries.get(register)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(register)
+                return entry[1], entry[2]
+
+        reports = frozenset(row[0] for row in cursor.execute(REPORTS, (register,)).fetchall())
+        reports_json = json.dumps(sorted(reports))
+        with self._lock:
+            self._entries[register] = (version, reports, reports_json)
+            self._entries.move_to_end(register)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return reports, reports_json
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+reports_cache = ReportsCache()
+
+
+# Filtro dos chamados visíveis ao gestor: ele e os subordinados em qualquer nível (lista em cache)
+# Em equipes grandes o índice por solicitante é desligado (+user) e a busca segue o número do chamado
+def reports_filter(cursor, register):
+    reports, reports_json = reports_cache.get(cursor, register)
+    column = "+user" if len(reports) > large_department else "user"
+    return f"{column} IN (SELECT value FROM json_each(?))", [reports_json]
+
+
+def init_app(app):
+    global large_department
+    large_department = app.config.get("ORG_LARGE_DEPARTMENT", 500)
+    reports_cache.max_size = app.config.get("ORG_CACHE_SIZE", 1024)
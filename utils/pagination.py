@@ -0,0 +1,163 @@
+#utils/pagination.py
+import base64
+import json
+from flask import current_app as app, request
+from utils import timestamps
+from utils.json_provider import fragment
+
+
+# Erro de parâmetros de paginação/projeção inválidos
+class PaginationError(ValueError):
+    pass
+
+
+# Cursor opaco: JSON com a última chave retornada, codificado em base64
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise PaginationError("Cursor inválido")
+    if not isinstance(values, list):
+        raise PaginationError("Cursor inválido")
+    return values
+
+
+# Lê ?limit= e ?cursor= da requisição
+def parse_page():
+    default_size = app.config.get("PAGE_SIZE_DEFAULT", 100)
+    max_size = app.config.get("PAGE_SIZE_MAX", 1000)
+
+    try:
+        limit = int(request.args.get("limit", default_size))
+    except ValueError:
+        raise PaginationError("Parâmetro limit inválido")
+    if limit < 1:
+        raise PaginationError("Parâmetro limit inválido")
+    limit = min(limit, max_size)
+
+    cursor = request.args.get("cursor")
+    after = decode_cursor(cursor) if cursor else None
+    return limit, after
+
+
+# Lê ?fields= e valida contra as colunas disponíveis no endpoint
+def parse_fields(columns):
+    fields = request.args.get("fields")
+    if not fields:
+        return list(columns)
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in columns]
+    if unknown or not requested:
+        raise PaginationError(f"Campos inválidos: {', '.join(unknown)}")
+    return requested
+
+
+# Filtros de período das listagens (parâmetro -> coluna ISO e comparação)
+PERIOD_FILTERS = {
+    "opened_from": ("tickets.opened_at", ">="),
+    "opened_to": ("tickets.opened_at", "<="),
+    "closed_from": ("tickets.closed_at", ">="),
+    "closed_to": ("tickets.closed_at", "<="),
+}
+
+# Ordenações por data das listagens (?order=opened_at ou ?order=-opened_at para decrescente)
+ORDER_COLUMNS = {
+    "opened_at": "tickets.opened_at",
+    "closed_at": "tickets.closed_at",
+}
+
+
+# Lê ?opened_from=, ?opened_to=, ?closed_from= e ?closed_to= como condições SQL
+def parse_period():
+    bounds = {}
+    for name, (_, comparison) in PERIOD_FILTERS.items():
+        value = request.args.get(name)
+        if not value:
+            continue
+        try:
+            bounds[name] = timestamps.parse_bound(value, end=comparison == "<=")
+        except ValueError:
+            raise PaginationError(f"Parâmetro {name} inválido")
+    return period_filter(bounds)
+
+
+# Condições SQL dos limites de período já convertidos para ISO ({parâmetro: limite})
+def period_filter(bounds):
+    conditions = []
+    params = []
+    for name, (column, comparison) in PERIOD_FILTERS.items():
+        if name in bounds:
+            conditions.append(f"{column} {comparison} ?")
+            params.append(bounds[name])
+    return conditions, params
+
+
+# Lê ?order= e retorna (coluna, decrescente) ou None para a ordem padrão por ticket_number
+def parse_order():
+    order = request.args.get("order")
+    if not order:
+        return None
+    column = ORDER_COLUMNS.get(order.lstrip("-"))
+    if not column:
+        raise PaginationError("Parâmetro order inválido")
+    return column, order.startswith("-")
+
+
+# Keyset da ordenação: por chave (padrão) ou por (data, chave), usando o índice da coluna de data
+# Retorna (colunas extras da projeção, condições, parâmetros, ORDER BY, função do cursor)
+def keyset_order(order, after, key="ticket_number"):
+    if order is None:
+        conditions = [f"{key} > ?"] if after else []
+        params = [after[-1]] if after else []
+        return "", conditions, params, key, lambda row: [row[0]]
+
+    column, descending = order
+    direction = " DESC" if descending else ""
+    conditions = [f"{column} IS NOT NULL"]
+    params = []
+    if after:
+        if len(after) != 2:
+            raise PaginationError("Cursor inválido")
+        conditions.append(f"({column}, {key}) {'<' if descending else '>'} (?, ?)")
+        params.extend(after)
+    return (
+        f", {column} AS order_key",
+        conditions,
+        params,
+        f"{column}{direction}, {key}{direction}",
+        lambda row: [row["order_key"], row[0]],
+    )
+
+
+# Colunas SQL da projeção: a chave do cursor e a linha já montada em JSON pelo SQLite (json_object)
+# Os campos entram em ordem alfabética, como as chaves ordenadas das demais respostas
+def select_list(columns, fields, key="ticket_number"):
+    members = ", ".join(f"'{field}', {columns[field]}" for field in sorted(fields))
+    return f"{key}, json_object({members}) AS row_json"
+
+
+# Linhas da projeção (select_list) como fragmentos JSON, sem dicionários intermediários
+def rows_to_json(rows):
+    return [fragment(row[1]) for row in rows]
+
+
+# Recorta a página (buscada com limit + 1 linhas) e gera o próximo cursor
+def paginate(rows, limit, cursor_values=lambda row: [row[0]]):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(cursor_values(rows[-1]))
+    return rows, None
+
+
+# Anexa o cursor da próxima página ao cabeçalho da resposta
+def with_next_cursor(response, next_cursor):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
@@ -0,0 +1,101 @@
+#utils/passwords.py
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash
+
+
+# Erro quando a fila de verificação de senhas está cheia
+class VerifierBusy(Exception):
+    pass
+
+
+# Verificação de senhas em um pool de threads limitado, com cache das verificações bem-sucedidas
+class PasswordVerifier:
+    def __init__(self, workers=4, max_pending=32, timeout=10.0, cache_size=1024, cache_ttl=300.0):
+        self.workers = workers
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._cache = OrderedDict()  # chave HMAC -> expiração
+        self._lock = threading.Lock()
+        self._secret = b""
+
+    def configure(self, secret, workers, max_pending, timeout, cache_size, cache_ttl):
+        self._secret = secret.encode() if isinstance(secret, str) else (secret or b"")
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._slots = threading.BoundedSemaphore(max_pending)
+        if workers != self.workers:
+            self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+            self.workers = workers
+
+    def _cache_key(self, password_hash, password):
+        # A senha nunca fica em memória: apenas um HMAC com a chave secreta da aplicação
+        message = password_hash.encode() + b"\0" + password.encode()
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def _cached(self, key):
+        with self._lock:
+            expires = self._cache.get(key)
+            if expires is None:
+                return False
+            if expires <= time.monotonic():
+                del self._cache[key]
+                return False
+            self._cache.move_to_end(key)
+            return True
+
+    def _remember(self, key):
+        with self._lock:
+            self._cache[key] = time.monotonic() + self.cache_ttl
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def verify(self, password_hash, password):
+        key = self._cache_key(password_hash, password)
+        if self._cached(key):
+            return True
+
+        # Limita quantas verificações podem aguardar ou rodar no pool ao mesmo tempo
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise VerifierBusy()
+        try:
+            future = self._executor.submit(check_password_hash, password_hash, password)
+        except BaseException:
+            slots.release()
+            raise
+        # A vaga só é devolvida quando o hash termina, mesmo que a espera abaixo esgote o tempo
+        future.add_done_callback(lambda _: slots.release())
+        valid = future.result(timeout=self.timeout)
+
+        if valid:
+            self._remember(key)
+        return valid
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+password_verifier = PasswordVerifier()
+
+
+def init_app(app):
+    password_verifier.configure(
+        secret=app.config.get("SECRET_KEY"),
+        workers=app.config.get("LOGIN_HASH_WORKERS", 4),
+        max_pending=app.config.get("LOGIN_HASH_MAX_PENDING", 32),
+        timeout=app.config.get("LOGIN_HASH_TIMEOUT", 10.0),
+        cache_size=app.config.get("LOGIN_HASH_CACHE_SIZE", 1024),
+        cache_ttl=app.config.get("LOGIN_HASH_CACHE_TTL", 300.0),
+    )
@@ -0,0 +1,73 @@
+#utils/profiler.py
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from flask import g, request
+from utils.instrumentation import endpoint_label
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalho que liga o profiler na requisição (X-Profile: 1) e cabeçalho com o arquivo gerado
+PROFILE_HEADER = "X-Profile"
+PROFILE_FILE_HEADER = "X-Profile-File"
+
+
+# Profiler por requisição (cProfile), ligado pelo cabeçalho X-Profile quando PROFILER_ENABLED
+# - Um perfil por vez no processo: requisições simultâneas com o cabeçalho seguem sem perfil
+# - O perfil cobre a rota e o stream da resposta; o resultado vai para PROFILER_DIR
+#   (abrir com python -m pstats <arquivo> ou snakeviz) e as funções mais caras para o log
+class RequestProfiler:
+    def __init__(self, directory="profiles", top=20):
+        self.directory = directory
+        self.top = top
+        self._lock = threading.Lock()
+
+    def start(self):
+        if request.headers.get(PROFILE_HEADER) not in ("1", "true"):
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        profile = cProfile.Profile()
+        g.profile = profile
+        g.profile_file = os.path.join(
+            self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{endpoint_label()}.prof",
+        )
+        profile.enable()
+
+    # O nome do arquivo sai no cabeçalho; o perfil é gravado ao fim da requisição
+    def annotate(self, response):
+        if "profile" in g:
+            response.headers[PROFILE_FILE_HEADER] = os.path.basename(g.profile_file)
+        return response
+
+    def stop(self, exception=None):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+        try:
+            profile.disable()
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(g.profile_file)
+
+            summary = io.StringIO()
+            pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(self.top)
+            logger.info("Perfil da requisição gravado", extra={"file": g.profile_file, "profile": summary.getvalue()})
+        finally:
+            self._lock.release()
+
+
+profiler = RequestProfiler()
+
+
+def init_app(app):
+    if not app.config.get("PROFILER_ENABLED", False):
+        return
+    profiler.directory = app.config.get("PROFILER_DIR", "profiles")
+    profiler.top = app.config.get("PROFILER_TOP", 20)
+    app.before_request(profiler.start)
+    app.after_request(profiler.annotate)
+    app.teardown_request(profiler.stop)
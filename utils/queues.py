@@ -0,0 +1,200 @@
+#utils/queues.py
+from utils import org
+
+# Filas de trabalho mantidas por gatilhos a partir da tabela tickets:
+# approval_queue (próximo aprovador/gerente) e treatment_queue (próximo tratador),
+# com contadores por fila em queue_counts para os indicadores do front-end
+QUEUE_APPROVAL = "approval"
+QUEUE_TREATMENT = "treatment"
+
+# Aprovador 1 (gerente) só vê os chamados da sua equipe: as filas guardam o gerente do chamado
+MANAGER_APPROVER = 1
+
+# Gerente do chamado na fila de aprovação: o nome gravado no chamado (filas originais)
+# ou a matrícula do gestor direto do solicitante na hierarquia (org_closure)
+MANAGER_BY_NAME = "coalesce({row}.manager, '')"
+MANAGER_BY_REGISTER = org.DIRECT_MANAGER
+
+CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS approval_queue (
+        ticket_number INTEGER PRIMARY KEY,
+        approver_id INTEGER NOT NULL,
+        manager TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_approval_queue_approver ON approval_queue (approver_id, manager, ticket_number)",
+    """
+    CREATE TABLE IF NOT EXISTS treatment_queue (
+        ticket_number INTEGER PRIMARY KEY,
+        treatment_id INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_treatment_queue_treatment ON treatment_queue (treatment_id, ticket_number)",
+    """
+    CREATE TABLE IF NOT EXISTS queue_counts (
+        queue TEXT NOT NULL,
+        owner_id INTEGER NOT NULL,
+        manager TEXT NOT NULL DEFAULT '',
+        total INTEGER NOT NULL,
+        PRIMARY KEY (queue, owner_id, manager)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+# Gatilhos que mantêm os contadores a cada entrada/saída das filas
+def count_triggers(queue, table, owner_column, manager_column=None):
+    manager = f"new.{manager_column}" if manager_column else "''"
+    old_manager = f"old.{manager_column}" if manager_column else "''"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO queue_counts (queue, owner_id, manager, total)
+            VALUES ('{queue}', new.{owner_column}, {manager}, 1)
+            ON CONFLICT (queue, owner_id, manager) DO UPDATE SET total = total + 1;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table} BEGIN
+            UPDATE queue_counts SET total = total - 1
+            WHERE queue = '{queue}' AND owner_id = old.{owner_column} AND manager = {old_manager};
+        END
+        """,
+    ]
+
+
+COUNT_TRIGGERS = (
+    count_triggers(QUEUE_APPROVAL, "approval_queue", "approver_id", "manager")
+    + count_triggers(QUEUE_TREATMENT, "treatment_queue", "treatment_id")
+)
+
+# Chamados com trabalho pendente (0 ou vazio = sem próximo aprovador/tratador)
+PENDING_APPROVAL = "{row}.next_approver IS NOT NULL AND {row}.next_approver NOT IN ('0', '')"
+PENDING_TREATMENT = "{row}.next_treatment IS NOT NULL AND {row}.next_treatment <> 0"
+
+# Carga inicial das filas a partir dos chamados existentes (os contadores são mantidos pelos gatilhos)
+def approval_backfill(manager):
+    return f"""
+    INSERT INTO approval_queue (ticket_number, approver_id, manager)
+    SELECT ticket_number, next_approver, {manager.format(row="t")} FROM tickets AS t
+    WHERE {PENDING_APPROVAL.format(row="t")}
+    """
+
+
+TREATMENT_BACKFILL = f"""
+    INSERT INTO treatment_queue (ticket_number, treatment_id)
+    SELECT ticket_number, next_treatment FROM tickets AS t
+    WHERE {PENDING_TREATMENT.format(row="t")}
+    """
+
+# Carga da migração 8 (gerente pelo nome gravado no chamado)
+BACKFILL = [approval_backfill(MANAGER_BY_NAME), TREATMENT_BACKFILL]
+
+
+# Recarga da fila de aprovação com o gestor direto atual (migrações 10 e 12; os contadores vêm dos gatilhos)
+APPROVAL_REBUILD = [
+    "DELETE FROM approval_queue",
+    f"DELETE FROM queue_counts WHERE queue = '{QUEUE_APPROVAL}'",
+    approval_backfill(MANAGER_BY_REGISTER),
+]
+
+
+# Gatilhos em tickets que gravam o gerente na fila de aprovação (recriados quando ele muda de chave)
+def entry_triggers(manager):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tickets_queue_insert AFTER INSERT ON tickets BEGIN
+            INSERT INTO approval_queue (ticket_number, approver_id, manager)
+            SELECT new.ticket_number, new.next_approver, {manager.format(row="new")}
+            WHERE {PENDING_APPROVAL.format(row="new")};
+            INSERT INTO treatment_queue (ticket_number, treatment_id)
+            SELECT new.ticket_number, new.next_treatment
+            WHERE {PENDING_TREATMENT.format(row="new")};
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tickets_queue_approval_update
+        AFTER UPDATE OF next_approver, manager ON tickets BEGIN
+            DELETE FROM approval_queue WHERE ticket_number = old.ticket_number;
+            INSERT INTO approval_queue (ticket_number, approver_id, manager)
+            SELECT new.ticket_number, new.next_approver, {manager.format(row="new")}
+            WHERE {PENDING_APPROVAL.format(row="new")};
+        END
+        """,
+    ]
+
+
+# Gatilhos em tickets: cada alteração do próximo passo move o chamado entre as filas
+# (migração 8; a 10 recria os de entrada na fila de aprovação com a matrícula do gestor)
+TICKET_TRIGGERS = entry_triggers(MANAGER_BY_NAME) + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_queue_treatment_update
+    AFTER UPDATE OF next_treatment ON tickets BEGIN
+        DELETE FROM treatment_queue WHERE ticket_number = old.ticket_number;
+        INSERT INTO treatment_queue (ticket_number, treatment_id)
+        SELECT new.ticket_number, new.next_treatment
+        WHERE {PENDING_TREATMENT.format(row="new")};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tickets_queue_delete AFTER DELETE ON tickets BEGIN
+        DELETE FROM approval_queue WHERE ticket_number = old.ticket_number;
+        DELETE FROM treatment_queue WHERE ticket_number = old.ticket_number;
+    END
+    """,
+]
+
+# Pendências de aprovação do solicitante regravadas com o gestor direto atual
+def manager_resync(person):
+    return f"""
+            DELETE FROM approval_queue
+            WHERE ticket_number IN (SELECT ticket_number FROM tickets WHERE user = {person});
+            INSERT INTO approval_queue (ticket_number, approver_id, manager)
+            SELECT ticket_number, next_approver, {MANAGER_BY_REGISTER.format(row="t")} FROM tickets AS t
+            WHERE t.user = {person} AND {PENDING_APPROVAL.format(row="t")};
+    """
+
+
+# Troca de gestor direto (carga do RH): a pessoa ganha ou perde a linha de depth = 1 em org_closure
+# e as aprovações pendentes dos chamados dela passam para o novo gestor (com os contadores)
+# Os gatilhos ficam em org_closure, e não em general_data, para ler a hierarquia já atualizada
+MANAGER_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS org_closure_queue_insert AFTER INSERT ON org_closure
+    WHEN new.depth = 1 BEGIN
+        {manager_resync("new.descendant")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS org_closure_queue_delete AFTER DELETE ON org_closure
+    WHEN old.depth = 1 BEGIN
+        {manager_resync("old.descendant")}
+    END
+    """,
+]
+
+approval_count_query = f"""
+SELECT coalesce(sum(total), 0) FROM queue_counts
+WHERE queue = '{QUEUE_APPROVAL}' AND owner_id = ? AND (? IS NULL OR manager = ?)
+"""
+
+treatment_count_query = f"""
+SELECT coalesce(sum(total), 0) FROM queue_counts
+WHERE queue = '{QUEUE_TREATMENT}' AND owner_id = ?
+"""
+
+
+# Quantidade de chamados na fila de aprovação do usuário (somente queue_counts)
+def approval_count(cursor, approver_id, manager):
+    if not approver_id:
+        return 0
+    manager = manager if approver_id == MANAGER_APPROVER else None
+    return cursor.execute(approval_count_query, (approver_id, manager, manager)).fetchone()[0]
+
+
+# Quantidade de chamados na fila de tratamento do usuário (somente queue_counts)
+def treatment_count(cursor, treatment_id):
+    if not treatment_id:
+        return 0
+    return cursor.execute(treatment_count_query, (treatment_id,)).fetchone()[0]
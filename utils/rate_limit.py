@@ -0,0 +1,53 @@
+#utils/rate_limit.py
+import threading
+import time
+from collections import OrderedDict
+
+
+# Limite de tentativas por chave (ex.: usuário) em uma janela fixa de tempo
+class RateLimiter:
+    def __init__(self, limit=10, window=60.0, max_keys=10000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # chave -> (início da janela, tentativas), na ordem de início das janelas (as vencidas ficam no começo)
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        # Retorna 0 se a tentativa é permitida, senão os segundos até a janela reabrir
+        now = time.monotonic()
+        with self._lock:
+            current = self._windows.get(key)
+            if current is None or now - current[0] >= self.window:
+                # Nova janela para a chave: vai para o fim da ordem
+                self._windows.pop(key, None)
+                self._expire(now)
+                # Tamanho máximo mesmo dentro da janela (muitas chaves diferentes, ex.: usuários inventados):
+                # só janelas vencidas são descartadas; sem espaço, a chave nova espera a mais antiga vencer
+                # (descartar uma janela em curso zeraria o contador de outro usuário)
+                if len(self._windows) >= self.max_keys:
+                    return self._retry_after(now, next(iter(self._windows.values()))[0])
+                current = (now, 0)
+
+            started, count = current
+            if count >= self.limit:
+                return self._retry_after(now, started)
+
+            self._windows[key] = (started, count + 1)
+            return 0
+
+    # Descarta as janelas vencidas (início da ordem)
+    def _expire(self, now):
+        while self._windows:
+            started, _ = next(iter(self._windows.values()))
+            if now - started < self.window:
+                return
+            self._windows.popitem(last=False)
+
+    def _retry_after(self, now, started):
+        return max(1, int(self.window - (now - started)) + 1)
+
+    def reset(self, key):
+        with self._lock:
+            self._windows.pop(key, None)
@@ -0,0 +1,169 @@
+#utils/search.py
+import re
+import click
+from utils import forms, history
+
+# Índice de texto completo dos chamados (rowid = ticket_number)
+# remove_diacritics permite buscar "manutencao" e encontrar "Manutenção"
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+    ticket_type,
+    submotive,
+    motive_submotive,
+    form_values,
+    observations,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+# Valores do formulário (JSON) achatados em um único texto
+FORM_VALUES = """
+CASE WHEN json_valid({form}) THEN (
+    SELECT group_concat(value, ' ') FROM json_tree({form}) WHERE type NOT IN ('object', 'array')
+) END
+"""
+
+# Gatilhos que mantêm o índice sincronizado com a tabela tickets
+CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_fts_insert AFTER INSERT ON tickets BEGIN
+        INSERT INTO tickets_fts (rowid, ticket_type, submotive, motive_submotive, form_values, observations)
+        VALUES (new.ticket_number, new.ticket_type, new.submotive, new.motive_submotive,
+                {FORM_VALUES.format(form="new.form")}, new.treatment_observation);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_fts_update
+    AFTER UPDATE OF ticket_type, submotive, motive_submotive, form, treatment_observation ON tickets BEGIN
+        UPDATE tickets_fts
+        SET ticket_type = new.ticket_type,
+            submotive = new.submotive,
+            motive_submotive = new.motive_submotive,
+            form_values = {FORM_VALUES.format(form="new.form")},
+            observations = new.treatment_observation
+        WHERE rowid = old.ticket_number;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tickets_fts_delete AFTER DELETE ON tickets BEGIN
+        DELETE FROM tickets_fts WHERE rowid = old.ticket_number;
+    END
+    """,
+]
+
+
+# Observações a partir do histórico de eventos (substitui treatment_observation)
+EVENT_OBSERVATIONS = f"""(
+    SELECT group_concat(message, ' ') FROM ticket_events
+    WHERE ticket_events.ticket_number = tickets.ticket_number
+      AND ticket_events.event_type IN ({", ".join(f"'{event}'" for event in history.OBSERVATION_EVENTS)})
+)"""
+
+# Gatilhos do índice após a criação do histórico: as observações vêm de ticket_events
+EVENT_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS tickets_fts_update",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_fts_update
+    AFTER UPDATE OF ticket_type, submotive, motive_submotive, form ON tickets BEGIN
+        UPDATE tickets_fts
+        SET ticket_type = new.ticket_type,
+            submotive = new.submotive,
+            motive_submotive = new.motive_submotive,
+            form_values = {FORM_VALUES.format(form="new.form")}
+        WHERE rowid = old.ticket_number;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ticket_events_fts_insert AFTER INSERT ON ticket_events
+    WHEN new.event_type IN ({", ".join(f"'{event}'" for event in history.OBSERVATION_EVENTS)}) BEGIN
+        UPDATE tickets_fts
+        SET observations = trim(coalesce(observations, '') || ' ' || new.message)
+        WHERE rowid = new.ticket_number;
+    END
+    """,
+]
+
+
+# Gatilhos do índice com o formulário compacto (utils/forms), só com SQL nativo: qualquer conexão
+# (scripts, sqlite3, backups) grava em tickets. Formulários em texto são indexados pelos gatilhos;
+# os comprimidos são indexados pelo app na mesma transação (index_forms), já que descomprimir
+# exige form_text, registrada só nas conexões do app
+FORM_DATA_VALUES = f"""
+CASE WHEN typeof(new.form_data) = 'text' THEN {FORM_VALUES.format(form="new.form_data")} END
+"""
+
+FORM_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_fts_insert AFTER INSERT ON tickets BEGIN
+        INSERT INTO tickets_fts (rowid, ticket_type, submotive, motive_submotive, form_values, observations)
+        VALUES (new.ticket_number, new.ticket_type, new.submotive, new.motive_submotive,
+                {FORM_DATA_VALUES}, new.treatment_observation);
+    END
+    """,
+    # Um formulário comprimido que não mudou mantém as palavras já indexadas
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tickets_fts_update
+    AFTER UPDATE OF ticket_type, submotive, motive_submotive, form_schema, form_data ON tickets BEGIN
+        UPDATE tickets_fts
+        SET ticket_type = new.ticket_type,
+            submotive = new.submotive,
+            motive_submotive = new.motive_submotive,
+            form_values = CASE
+                WHEN typeof(new.form_data) = 'blob' AND new.form_data IS old.form_data
+                     AND new.form_schema IS old.form_schema THEN form_values
+                ELSE {FORM_DATA_VALUES} END
+        WHERE rowid = old.ticket_number;
+    END
+    """,
+]
+
+# Palavras de um formulário comprimido no índice (texto JSON vindo de forms.encode)
+index_form_query = f"""
+UPDATE tickets_fts SET form_values = {FORM_VALUES.format(form=":form")} WHERE rowid = :ticket_number
+"""
+
+
+# Indexa os formulários comprimidos dos chamados gravados: [(ticket_number, texto JSON)]
+def index_forms(cursor, ticket_forms):
+    cursor.executemany(index_form_query, [{"ticket_number": ticket_number, "form": text} for ticket_number, text in ticket_forms])
+
+
+# Reconstrói o índice a partir dos chamados existentes
+# (form: coluna ou expressão com o texto JSON do formulário, conforme a versão do banco)
+def rebuild_index(connection, observations="treatment_observation", form="form"):
+    connection.execute("DELETE FROM tickets_fts")
+    connection.execute(f"""
+        INSERT INTO tickets_fts (rowid, ticket_type, submotive, motive_submotive, form_values, observations)
+        SELECT ticket_number, ticket_type, submotive, motive_submotive,
+               {FORM_VALUES.format(form=form)}, {observations}
+        FROM tickets
+    """)
+
+
+# Reconstrói o índice com as observações do histórico de eventos
+def rebuild_event_index(connection, form="form"):
+    rebuild_index(connection, EVENT_OBSERVATIONS, form)
+
+
+# Converte o termo digitado em uma consulta FTS5 de prefixos ("hard manut" -> "hard"* "manut"*)
+def match_query(term):
+    words = re.findall(r"\w+", term)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+# Comando de linha de comando para reconstruir o índice (flask --app app rebuild-search-index)
+def init_app(app, pool):
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_command():
+        """Reconstrói o índice de busca dos chamados."""
+        connection = pool.acquire()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            rebuild_event_index(connection, forms.FORM_TEXT.format(row="tickets"))
+            connection.commit()
+            total = connection.execute("SELECT count(*) FROM tickets_fts").fetchone()[0]
+        finally:
+            pool.release(connection)
+        click.echo(f"Índice de busca reconstruído com {total} chamados")
@@ -0,0 +1,74 @@
+#utils/timestamps.py
+import datetime
+from collections import namedtuple
+
+# Formato exibido pelo front-end (colunas *_date_time) e formato ISO-8601 ordenável (colunas *_at)
+DISPLAY_FORMAT = "%d/%m/%Y %H:%M:%S"
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Formatos encontrados nos registros antigos
+LEGACY_FORMATS = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M")
+
+# Formatos aceitos nos filtros de período (?opened_from=2025-01-21 ou 2025-01-21T10:30)
+FILTER_FORMATS = ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M")
+
+# Colunas ISO preenchidas a partir das colunas em texto: (tabela, coluna texto, coluna ISO)
+ISO_COLUMNS = [
+    ("tickets", "ticket_open_date_time", "opened_at"),
+    ("tickets", "close_date_time", "closed_at"),
+    ("tickets_approvals", "date_time_approval", "approved_at"),
+    ("tickets_approvals", "date_time_rejection", "rejected_at"),
+]
+
+# Mesmo instante nos dois formatos gravados
+Timestamp = namedtuple("Timestamp", ["display", "iso"])
+
+
+def now():
+    current = datetime.datetime.now().replace(microsecond=0)
+    return Timestamp(current.strftime(DISPLAY_FORMAT), current.strftime(ISO_FORMAT))
+
+
+# Converte um valor gravado no formato antigo para ISO (None se vazio ou irreconhecível)
+def to_iso(value):
+    if not value:
+        return None
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.datetime.strptime(value.strip(), fmt).strftime(ISO_FORMAT)
+        except ValueError:
+            continue
+    return None
+
+
+# Limite de um filtro de período; uma data sem hora cobre o dia inteiro quando end=True
+def parse_bound(value, end=False):
+    value = value.strip()
+    try:
+        day = datetime.datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        pass
+    else:
+        if end:
+            day = day.replace(hour=23, minute=59, second=59)
+        return day.strftime(ISO_FORMAT)
+
+    for fmt in FILTER_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).strftime(ISO_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: {value}")
+
+
+# Preenche as colunas ISO dos registros existentes (passo da migração)
+def backfill(connection):
+    for table, text_column, iso_column in ISO_COLUMNS:
+        rows = connection.execute(
+            f"SELECT rowid, {text_column} FROM {table} WHERE {iso_column} IS NULL AND {text_column} <> ''"
+        ).fetchall()
+        converted = [(to_iso(value), rowid) for rowid, value in rows]
+        connection.executemany(
+            f"UPDATE {table} SET {iso_column} = ? WHERE rowid = ?",
+            [(iso, rowid) for iso, rowid in converted if iso],
+        )
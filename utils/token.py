@@ -1,14 +1,64 @@
 #utils/token.py
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
 import jwt
-from flask import current_app as app
+from flask import current_app as app, g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+
+# Cache LRU das identidades já verificadas, indexado pelo hash do token
+class TokenCache:
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # digest -> (identidade, exp)
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+
+            identity, exp = entry
+            # Remove o token assim que ele expira
+            if exp is not None and exp <= time.time():
+                del self._entries[digest]
+                return None
+
+            self._entries.move_to_end(digest)
+            return identity
+
+    def put(self, digest, identity, exp):
+        with self._lock:
+            self._entries[digest] = (identity, exp)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
 
 def decode_token(token):
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    identity = token_cache.get(digest)
+    if identity is not None:
+        return dict(identity)
+
     try:
         # Usando a chave secreta diretamente de app.config
         decoded = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-        
-        # Retornar um dicionário com os dados do token
-        return {
+
+        # Dicionário com os dados do token
+        identity = {
             # GeneralData
             "user": int(decoded.get("user")),
             "position": decoded.get("position"),
@@ -19,7 +69,55 @@ def decode_token(token):
             "approver_id": decoded.get("approver_id"),
             "treatment_id": decoded.get("treatment_id"),
         }
-    
+
     except jwt.InvalidTokenError:
-        print("Token inválido ou erro na decodificação")
-        return None
\ No newline at end of file
+        logger.info("Token inválido ou erro na decodificação")
+        return None
+
+    token_cache.put(digest, identity, decoded.get("exp"))
+    return dict(identity)
+
+
+# Marca uma rota como pública (sem autenticação)
+def public_endpoint(view):
+    view.public = True
+    return view
+
+
+# Permite o token na query string (?token=), para clientes que não enviam cabeçalhos (EventSource)
+def query_token_endpoint(view):
+    view.query_token = True
+    return view
+
+
+# Autentica a requisição uma única vez e guarda a identidade em flask.g
+def authenticate():
+    # Requisições de preflight do CORS não carregam o token
+    if request.method == "OPTIONS":
+        return None
+
+    view = app.view_functions.get(request.endpoint)
+    if view is None or getattr(view, "public", False):
+        return None
+
+    # Obter o token no cabeçalho
+    token = request.headers.get("Authorization")
+    if not token and getattr(view, "query_token", False):
+        token = request.args.get("token")
+    if not token:
+        return jsonify({"error": "Token não fornecido"}), 401
+
+    # Limpar o token do formato 'Bearer' e decodificar
+    token = token.replace("Bearer ", "")
+    identity = decode_token(token)
+
+    if not identity:
+        return jsonify({"error": "Token inválido ou expirado"}), 401
+
+    g.identity = identity
+    return None
+
+
+def init_app(app):
+    token_cache.max_size = app.config.get("TOKEN_CACHE_SIZE", 4096)
+    app.before_request(authenticate)
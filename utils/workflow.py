@@ -0,0 +1,195 @@
+#utils/workflow.py
+import json
+import threading
+from collections import namedtuple
+from flask import jsonify
+
+# Status finais e de abertura dos chamados
+STATUS_OPEN = "Aberto"
+STATUS_APPROVED = "Aprovado"
+STATUS_REJECTED = "Reprovado"
+STATUS_DONE = "Concluído"
+STATUS_CANCELED = "Cancelado"
+
+# Resultado de uma transição: novos valores de next_approver, ticket_status e next_treatment
+Transition = namedtuple("Transition", ["next_approver", "ticket_status", "next_treatment"])
+
+# Resultado do tratamento: próximo tratador e se o chamado foi encerrado
+TreatmentStep = namedtuple("TreatmentStep", ["next_treatment", "closes"])
+
+
+class WorkflowError(Exception):
+    pass
+
+
+# Conflito de concorrência: o chamado mudou desde a leitura ou não está no estado esperado (HTTP 409)
+class TransitionConflict(Exception):
+    def __init__(self, ticket_number, message="Chamado alterado por outra requisição"):
+        super().__init__(message)
+        self.ticket_number = ticket_number
+
+
+# Estado atual do chamado devolvido junto com o 409
+current_state_query = """
+SELECT ticket_number, ticket_status, next_approver, next_treatment, version
+FROM tickets
+WHERE ticket_number = ?
+"""
+
+
+def current_state(cursor, ticket_number):
+    row = cursor.execute(current_state_query, (ticket_number,)).fetchone()
+    return dict(row) if row else None
+
+
+# Versão enviada pelo cliente (opcional) precisa ser a versão atual do chamado
+def check_version(ticket, expected_version):
+    if expected_version is not None and str(expected_version) != str(ticket["version"]):
+        raise TransitionConflict(ticket["ticket_number"])
+
+
+# O UPDATE com compare-and-swap (WHERE version = ?) precisa ter alterado o chamado
+def check_swapped(cursor, ticket_number):
+    if cursor.rowcount != 1:
+        raise TransitionConflict(ticket_number)
+
+
+def conflict_response(connection, conflict):
+    return jsonify({
+        "error": str(conflict),
+        "current": current_state(connection.cursor(), conflict.ticket_number),
+    }), 409
+
+
+def parse_sequence(sequence):
+    # As sequências são gravadas como listas JSON (ex.: "[1, 3, 2]")
+    values = json.loads(sequence) if sequence else []
+    if not isinstance(values, list):
+        raise WorkflowError(f"Sequência inválida: {sequence}")
+    return tuple(int(value) for value in values)
+
+
+def waiting_status(profile):
+    return f"Aguardando Aprovação - {profile.capitalize()}"
+
+
+# Máquina de estados imutável de um fluxo (sequência de aprovação + sequência de tratamento)
+class Workflow:
+    __slots__ = ("approval_sequence", "treatment_sequence", "opening", "_approvals", "_treatments")
+
+    def __init__(self, approval_sequence, treatment_sequence, approver_profiles):
+        approval_sequence = parse_sequence(approval_sequence)
+        treatment_sequence = parse_sequence(treatment_sequence)
+        first_treatment = treatment_sequence[0] if treatment_sequence else 0
+
+        def entering(approver):
+            # Transição ao chegar no aprovador (0 = sem mais aprovações)
+            if approver == 0:
+                return Transition(0, STATUS_APPROVED, first_treatment)
+            profile = approver_profiles.get(approver)
+            return Transition(approver, waiting_status(profile) if profile else None, 0)
+
+        # Próximo passo de cada aprovador (primeira ocorrência na sequência)
+        approvals = {}
+        for index, approver in enumerate(approval_sequence):
+            following = approval_sequence[index + 1] if index + 1 < len(approval_sequence) else 0
+            approvals.setdefault(approver, entering(following))
+
+        # Próximo passo de cada tratador
+        treatments = {}
+        for index, treatment in enumerate(treatment_sequence):
+            following = treatment_sequence[index + 1] if index + 1 < len(treatment_sequence) else 0
+            treatments.setdefault(treatment, TreatmentStep(following, following == 0))
+
+        # Abertura: primeiro aprovador ou, se não houver aprovação, direto para o tratamento
+        first_approver = approval_sequence[0] if approval_sequence else 0
+        if first_approver == 0:
+            opening = Transition(0, STATUS_OPEN, first_treatment)
+        else:
+            opening = entering(first_approver)
+
+        object.__setattr__(self, "approval_sequence", approval_sequence)
+        object.__setattr__(self, "treatment_sequence", treatment_sequence)
+        object.__setattr__(self, "opening", opening)
+        object.__setattr__(self, "_approvals", approvals)
+        object.__setattr__(self, "_treatments", treatments)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Workflow é imutável")
+
+    # Transição após a aprovação de approver_id (None se ele não está na sequência)
+    def approve(self, approver_id):
+        return self._approvals.get(approver_id)
+
+    # Passo seguinte ao tratamento de treatment_id (None se ele não está na sequência)
+    def treat(self, treatment_id):
+        return self._treatments.get(treatment_id)
+
+    # Reprovação e cancelamento encerram o chamado independentemente da sequência
+    @staticmethod
+    def reject():
+        return Transition(0, STATUS_REJECTED, 0)
+
+    @staticmethod
+    def cancel():
+        return Transition(0, STATUS_CANCELED, 0)
+
+
+# Fluxos compilados: por tipo de chamado (abertura) e por sequência gravada no chamado
+class WorkflowEngine:
+    def __init__(self):
+        self._approver_profiles = {}
+        self._by_ticket_type = {}
+        self._by_sequence = {}
+        self._lock = threading.Lock()
+
+    def load(self, connection):
+        cursor = connection.cursor()
+        approver_profiles = {}
+        for approver_id, profile in cursor.execute("SELECT approver_id, profile FROM profile_config ORDER BY id_profile_config"):
+            approver_profiles.setdefault(approver_id, profile)
+
+        by_sequence = {}
+        by_ticket_type = {}
+        cursor.execute("""
+            SELECT profile, motive_submotive, approval_sequence, treatment_sequence
+            FROM ticket_types
+            ORDER BY id
+        """)
+        for profile, motive_submotive, approval_sequence, treatment_sequence in cursor.fetchall():
+            key = (approval_sequence, treatment_sequence)
+            if key not in by_sequence:
+                by_sequence[key] = Workflow(approval_sequence, treatment_sequence, approver_profiles)
+            by_ticket_type.setdefault((profile, motive_submotive), (key, by_sequence[key]))
+
+        with self._lock:
+            self._approver_profiles = approver_profiles
+            self._by_sequence = by_sequence
+            self._by_ticket_type = by_ticket_type
+
+    # Fluxo usado na abertura: (sequências em texto, Workflow) ou None
+    def for_ticket_type(self, profile, motive_submotive):
+        return self._by_ticket_type.get((profile, motive_submotive))
+
+    # Fluxo de um chamado existente, a partir das sequências gravadas nele
+    def for_sequences(self, approval_sequence, treatment_sequence):
+        key = (approval_sequence, treatment_sequence)
+        workflow = self._by_sequence.get(key)
+        if workflow is None:
+            workflow = Workflow(approval_sequence, treatment_sequence, self._approver_profiles)
+            with self._lock:
+                self._by_sequence[key] = workflow
+        return workflow
+
+
+engine = WorkflowEngine()
+
+
+# Compila os fluxos na inicialização e sempre que o catálogo for recarregado
+def init_app(app, pool, catalog):
+    connection = pool.acquire()
+    try:
+        engine.load(connection)
+    finally:
+        pool.release(connection)
+    catalog.on_reload(engine.load)